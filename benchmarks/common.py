@@ -0,0 +1,147 @@
+"""
+Timing, memory and result-file helpers shared by the benchmark suites
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# Data inputs a local setup may point at; benchmarks always run without them
+_SANDBOX_INPUTS = ("GAZETTEER_PATH", "FUEL_STATIONS_PATH", "RENDER_DOCX_TEMPLATE")
+
+
+def configure_sandbox(ollama_url: Optional[str] = None) -> str:
+    """
+    Point every on-disk cache and store (each *_PATH setting) at a fresh
+    temporary directory and clear optional data inputs.
+
+    Must run before any src.services module is imported, since their
+    singletons read settings at import time.
+    """
+    from src.config import settings
+
+    root = tempfile.mkdtemp(prefix="logisync-bench-")
+    for name, field in type(settings).model_fields.items():
+        if name in _SANDBOX_INPUTS:
+            setattr(settings, name, None)
+        elif name.endswith("_PATH"):
+            # Same file or directory name as the default, e.g. cache/geocode.sqlite3 -> <root>/geocode.sqlite3
+            setattr(settings, name, os.path.join(root, os.path.basename(field.default)))
+    if ollama_url:
+        settings.OLLAMA_BASE_URL = ollama_url
+    return root
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(name: str, latencies: List[float], wall_seconds: float, peak_bytes: int,
+              items: Optional[int] = None, **extra) -> Dict[str, Any]:
+    """One scenario's result row; throughput counts ``items`` (default: calls) per wall second"""
+    ordered = sorted(latencies)
+    items = items if items is not None else len(latencies)
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "throughput_per_second": round(items / wall_seconds, 2) if wall_seconds else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "peak_memory_mb": round(peak_bytes / 2 ** 20, 2),
+        **extra,
+    }
+
+
+def run_sync(name: str, fn: Callable[[], Any], repeat: int, **extra) -> Dict[str, Any]:
+    """Time ``repeat`` sequential calls, then measure peak memory of one more under tracemalloc"""
+    fn()  # warm-up: lazy imports, caches, pool start-up
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    wall = time.perf_counter() - started
+
+    # Separate pass: tracemalloc slows allocation-heavy code several times over
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(name, latencies, wall, peak, **extra)
+
+
+async def run_concurrent(name: str, fn: Callable[[int], Awaitable[Any]], calls: int,
+                         concurrency: int, **extra) -> Dict[str, Any]:
+    """Time ``calls`` invocations of ``fn(i)`` with at most ``concurrency`` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            t = time.perf_counter()
+            await fn(i)
+            latencies.append(time.perf_counter() - t)
+
+    await fn(-1)  # warm-up
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Concurrent scenarios are I/O-bound, so tracing overhead barely moves the timings
+    return summarize(name, latencies, wall, peak, concurrency=concurrency, **extra)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(results: Dict[str, List[Dict[str, Any]]], path: Optional[str] = None) -> str:
+    """
+    Save suites' rows as JSON, by default to results/<commit>.json. Suites
+    already in the file from another run on the same commit are kept.
+    """
+    commit = git_commit()
+    path = path or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    suites: Dict[str, List[Dict[str, Any]]] = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous.get("commit") == commit:
+            suites = previous.get("suites", {})
+    with open(path, "w") as f:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "suites": {**suites, **results},
+        }, f, indent=2)
+    return path
+
+
+def print_table(suite: str, rows: List[Dict[str, Any]]):
+    print(f"\n== {suite} ==")
+    print(f"{'scenario':<44}{'calls':>7}{'ops/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>9}")
+    for row in rows:
+        print(f"{row['scenario']:<44}{row['calls']:>7}{row['throughput_per_second']:>11}"
+              f"{row['p50_ms']:>10}{row['p99_ms']:>10}{row['peak_memory_mb']:>9}")
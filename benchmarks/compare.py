@@ -0,0 +1,54 @@
+"""
+Compare two benchmark result files scenario by scenario
+
+    python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import json
+
+METRICS = {"throughput_per_second": "ops/s", "p50_ms": "p50", "p99_ms": "p99", "peak_memory_mb": "peak MB"}
+
+
+def load(path: str):
+    with open(path) as f:
+        data = json.load(f)
+    rows = {row["scenario"]: row for suite in data["suites"].values() for row in suite}
+    return data["commit"], rows
+
+
+def change(old, new) -> str:
+    if old in (None, 0) or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="flag p99 increases / throughput drops beyond this percentage")
+    args = parser.parse_args()
+
+    base_commit, base = load(args.baseline)
+    cand_commit, cand = load(args.candidate)
+    print(f"{base_commit} -> {cand_commit}")
+    print(f"{'scenario':<44}" + "".join(f"{label:>10}" for label in METRICS.values()))
+    regressions = 0
+    for name in sorted(base.keys() & cand.keys()):
+        old, new = base[name], cand[name]
+        cells = "".join(f"{change(old[m], new[m]):>10}" for m in METRICS)
+        slower = (old["p99_ms"] and (new["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100 > args.threshold)
+        fewer = (old["throughput_per_second"] and
+                 (old["throughput_per_second"] - new["throughput_per_second"]) / old["throughput_per_second"] * 100
+                 > args.threshold)
+        flag = "  <-- regression" if slower or fewer else ""
+        regressions += bool(flag)
+        print(f"{name:<44}{cells}{flag}")
+    for name in sorted(base.keys() ^ cand.keys()):
+        print(f"{name:<44}  only in {'baseline' if name in base else 'candidate'}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
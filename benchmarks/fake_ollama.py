@@ -0,0 +1,102 @@
+"""
+Local stand-in for the Ollama HTTP API with configurable latency
+
+    python -m benchmarks.fake_ollama --port 11500 --latency-ms 200 --token-ms 5
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeOllama:
+    """
+    Answers POST /api/generate like Ollama, from a background thread.
+
+    Each generation waits ``latency`` seconds before the first token and
+    ``token_latency`` between tokens, and returns ``tokens`` words.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.2, token_latency: float = 0.0, tokens: int = 60):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                fake.requests += 1
+                words = [f"word{i} " for i in range(fake.tokens)]
+                time.sleep(fake.latency)
+                if not body.get("stream", True):
+                    time.sleep(fake.token_latency * fake.tokens)
+                    payload = json.dumps({"response": "".join(words), "done": True}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(fake.token_latency)
+                    self._chunk({"response": word, "done": False})
+                self._chunk({"response": "", "done": True, "eval_count": fake.tokens,
+                             "eval_duration": int(fake.token_latency * fake.tokens * 1e9)})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, message):
+                line = json.dumps(message).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+    fake = FakeOllama(args.port, args.latency_ms / 1000, args.token_ms / 1000, args.tokens)
+    print(f"Fake Ollama listening on {fake.url}")
+    fake.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Pages/sec and peak memory of streaming FMCSA rendering
+
+    python -m benchmarks.fmcsa_streaming --records 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from .common import configure_sandbox, summarize, write_results
+
+HEADER = {"carrier_name": "Benchmark Freight", "usdot_number": "1234567"}
+
+
+def operational_records(count: int, seed: int = 0):
+    """Synthetic multi-truck history, generated lazily"""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "date": (start + timedelta(days=i // 40)).isoformat(),
+            "miles_driven": rng.randint(50, 700),
+            "hours_of_service": round(rng.uniform(1, 11), 1),
+            "violations": rng.choice((0, 0, 0, 0, 1)),
+        }
+
+
+def measure(name: str, render, count: int, workdir: str) -> dict:
+    """One render timed, one under tracemalloc; throughput is pages per second"""
+    path = os.path.join(tempfile.mkdtemp(dir=workdir), "fmcsa.pdf")
+    started = time.perf_counter()
+    render(path, count)
+    seconds = time.perf_counter() - started
+    # Separate pass: tracemalloc slows allocation-heavy code several times over
+    tracemalloc.start()
+    render(path, count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(path, "rb") as f:
+        pages = f.read().count(b"/Type /Page\n")
+    return summarize(f"fmcsa/{name}/{count}", [seconds], seconds, peak, items=pages,
+                     records=count, pages=pages, file_mb=round(os.path.getsize(path) / 2 ** 20, 2))
+
+
+def streaming(path: str, count: int):
+    from src.services.renderer import render_fmcsa_report_streaming
+
+    render_fmcsa_report_streaming(HEADER, operational_records(count), path)
+
+
+def flowables(path: str, count: int):
+    from src.services.renderer import render_fmcsa_report
+
+    # The paragraph-per-record layout, for comparison on small histories
+    render_fmcsa_report({**HEADER, "operational_records": list(operational_records(count))}, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--compare-up-to", type=int, default=400,
+                        help="also time the paragraph layout for counts up to this")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+    # Before the renderer is imported: documents and caches go to a temp dir
+    workdir = configure_sandbox()
+
+    rows = []
+    print(f"{'mode':<10}{'records':>9}{'pages':>8}{'seconds':>9}{'pages/s':>9}{'peak MB':>9}{'file MB':>9}")
+    for count in args.records:
+        modes = [("streaming", streaming)]
+        if count <= args.compare_up_to:
+            modes.append(("flowables", flowables))
+        for name, render in modes:
+            r = measure(name, render, count, workdir)
+            rows.append(r)
+            print(f"{name:<10}{r['records']:>9}{r['pages']:>8}{r['p50_ms'] / 1000:>9.3f}"
+                  f"{r['throughput_per_second']:>9}{r['peak_memory_mb']:>9}{r['file_mb']:>9}")
+
+    print(f"\nResults written to {write_results({'fmcsa_streaming': rows}, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Ollama client, request coalescing and customer notifications against the fake Ollama server
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .common import percentile, run_concurrent
+
+
+def delivery(i: int) -> Dict[str, Any]:
+    return {
+        "delivery_date": datetime(2024, 5, 1).date(),
+        "time_window": "09:00 - 12:00",
+        "tracking_number": f"TRK{i:06d}",
+        "tracking_url": f"https://logisync.com/track/{i}",
+        "delay_reason": None,
+        "new_delivery_time": None,
+        "delivery_time": None,
+        "pod_reference": None,
+    }
+
+
+def customer(i: int) -> Dict[str, Any]:
+    return {"customer_name": f"Customer {i}", "email": f"c{i}@example.com", "phone": "555-0100",
+            "communication_preferences": {}}
+
+
+def run(calls: int = 200, concurrency: int = 32) -> List[Dict[str, Any]]:
+    return asyncio.run(_run(calls, concurrency))
+
+
+async def _run(calls: int, concurrency: int) -> List[Dict[str, Any]]:
+    from src.services.document_generator import DocumentGenerator
+    from src.services.ollama_client import ollama
+    from src.services.request_coalescer import coalescer
+
+    generator = DocumentGenerator()
+    await ollama.start()
+    rows = []
+    try:
+        rows.append(await run_concurrent(
+            "ollama/generate_text/unique",
+            lambda i: ollama.generate_text(f"Benchmark prompt {i}"),
+            calls, concurrency, max_in_flight=ollama.max_in_flight
+        ))
+
+        ttfts: List[float] = []
+
+        async def stream(i: int):
+            metrics: Dict[str, Any] = {}
+            async for _ in ollama.stream_text(f"Benchmark stream {i}", metrics=metrics):
+                pass
+            ttfts.append(metrics["time_to_first_token"])
+
+        row = await run_concurrent("ollama/stream_text/unique", stream, calls, concurrency)
+        ordered = sorted(ttfts)
+        row.update(ttft_p50_ms=round(percentile(ordered, 0.5) * 1000, 3),
+                   ttft_p99_ms=round(percentile(ordered, 0.99) * 1000, 3))
+        rows.append(row)
+
+        before = coalescer.stats()["upstream_calls"]
+        row = await run_concurrent(
+            "coalescer/generate_text/10_distinct",
+            lambda i: coalescer.generate_text(f"Shared prompt {i % 10}"),
+            calls, concurrency
+        )
+        row["upstream_calls"] = coalescer.stats()["upstream_calls"] - before
+        rows.append(row)
+
+        rows.append(await run_concurrent(
+            "notification/personalized/cache_miss",
+            lambda i: generator.generate_customer_notification(
+                "delivery_confirmation", delivery(i), customer(i), use_cache=False),
+            calls, concurrency
+        ))
+        rows.append(await run_concurrent(
+            "notification/personalized/cache_hit",
+            lambda i: generator.generate_customer_notification(
+                "delivery_confirmation", delivery(1), customer(1)),
+            calls * 10, concurrency
+        ))
+        rows.append(await run_concurrent(
+            "notification/template_only",
+            lambda i: generator.generate_customer_notification(
+                "delivery_confirmation", delivery(i), customer(i), personalize=False),
+            calls * 10, concurrency
+        ))
+    finally:
+        await ollama.close()
+    return rows
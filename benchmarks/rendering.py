@@ -0,0 +1,116 @@
+"""
+PDF / DOCX rendering of synthetic compliance payloads of increasing size
+"""
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from .common import run_concurrent, run_sync
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+def compliance_payload(report_type: str, size: int, nonce: int = 0) -> Dict[str, Any]:
+    """A report of the given type with ``size`` table rows / records"""
+    if report_type == "FMCSA":
+        return {
+            "carrier_name": f"Benchmark Freight {nonce}",
+            "usdot_number": "1234567",
+            "operational_records": [
+                {"date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "miles_driven": 200 + i % 400,
+                 "hours_of_service": 8.5, "violations": i % 7 == 0}
+                for i in range(size)
+            ],
+        }
+    if report_type == "safety_inspection":
+        return {
+            "inspector_name": f"Inspector {nonce}",
+            "inspection_date": "2024-05-01",
+            "location": "Benchmark Yard",
+            "inspection_items": {
+                f"Category {c}": [{"item": f"Check {c}.{i}", "status": "pass", "notes": "Within limits"}
+                                  for i in range(size // 5 or 1)]
+                for c in range(5)
+            },
+        }
+    if report_type == "environmental":
+        return {
+            "executive_summary": f"Fleet emissions review {nonce}. " * 20,
+            "emissions_data": {f"vehicle_{i}": round(i * 0.37, 2) for i in range(size)},
+            "recommendations": [f"Recommendation {i}: retrofit idle reduction" for i in range(size // 10 or 1)],
+        }
+    if report_type == "driver_qualification":
+        return {
+            "driver_name": f"Driver {nonce}",
+            "license_number": "D1234567",
+            "license_class": "A",
+            "qualification_items": [
+                {"requirement": f"Requirement {i}", "status": "complete", "date": "2024-01-01", "expiry": "2026-01-01"}
+                for i in range(size)
+            ],
+            "violations": [
+                {"date": "2023-06-01", "type": "Speeding", "description": "10 over", "resolution": "Training"}
+                for _ in range(size // 10)
+            ],
+        }
+    raise ValueError(f"Unsupported report type: {report_type}")
+
+
+def route_payload(size: int, nonce: int = 0) -> Dict[str, Any]:
+    return {
+        "route_name": f"Route_bench_{nonce}",
+        "start_location": "Stop 0",
+        "end_location": f"Stop {size - 1}",
+        "total_distance": size * 42.0,
+        "optimized_route": [{"location": f"Stop {i}", "arrival_time": "2024-05-01T08:00:00", "cargo_handling": {}}
+                            for i in range(size)],
+        "fuel_stops": [{"location": f"Stop {i}", "distance_from_start": i * 42.0} for i in range(0, size, 12)],
+        "compliance_checkpoints": [{"location": f"Stop {i}", "type": "rest_break", "duration_minutes": 45}
+                                   for i in range(0, size, 9)],
+    }
+
+
+def run(sizes=DEFAULT_SIZES, pool_calls: int = 40) -> List[Dict[str, Any]]:
+    import asyncio
+
+    from src.services import renderer
+    from src.services.document_generator import COMPLIANCE_REPORT_TYPES, DocumentGenerator
+    from src.services.executors import stages
+
+    out_dir = tempfile.mkdtemp(prefix="logisync-render-")
+    rows = []
+
+    # Single renders in this process: cost of the renderer itself
+    for kind in COMPLIANCE_REPORT_TYPES + ("route_plan",):
+        fmt = renderer.RENDERERS[kind][0]
+        for size in sizes:
+            data = route_payload(size) if kind == "route_plan" else compliance_payload(kind, size)
+            path = os.path.join(out_dir, f"{kind}_{size}.{fmt}")
+            rows.append(run_sync(
+                f"render/{kind}/{size}_rows",
+                lambda: renderer.render(kind, data, path),
+                max(1, min(20, 2000 // size)), format=fmt, rows=size
+            ))
+
+    # Through DocumentGenerator: warm process pool, then content-addressed store hits
+    generator = DocumentGenerator()
+    workers = stages["render"].workers
+    size = sizes[len(sizes) // 2]
+
+    async def pool_scenarios():
+        rows.append(await run_concurrent(
+            f"render/pool/safety_inspection/{size}_rows",
+            lambda i: generator.generate_compliance_report("safety_inspection",
+                                                           compliance_payload("safety_inspection", size, nonce=i)),
+            pool_calls, concurrency=workers * 2, workers=workers
+        ))
+        rows.append(await run_concurrent(
+            f"render/store_hit/safety_inspection/{size}_rows",
+            lambda i: generator.generate_compliance_report("safety_inspection",
+                                                           compliance_payload("safety_inspection", size, nonce=-1)),
+            pool_calls, concurrency=workers * 2
+        ))
+
+    asyncio.run(pool_scenarios())
+    stages["render"].shutdown()
+    return rows
@@ -0,0 +1,65 @@
+"""
+Route optimization on synthetic stop sets, geocoded by an offline stub
+"""
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from geopy.location import Location
+
+from .common import run_sync
+
+DEFAULT_SIZES = (10, 50, 200, 1000, 5000)
+# OR-Tools is only exercised where it finishes in reasonable time
+VRP_MAX_STOPS = 200
+# Decomposition only pays off on large stop sets
+CLUSTERED_MIN_STOPS = 1000
+
+
+class StubGeocoder:
+    """Deterministic coordinates inside a 1000 km box, derived from the query text"""
+
+    def geocode(self, query: str) -> Optional[Location]:
+        h = hashlib.blake2b(query.encode("utf-8"), digest_size=8).digest()
+        lat = 35.0 + int.from_bytes(h[:4], "big") / 2 ** 32 * 9.0
+        lon = -100.0 + int.from_bytes(h[4:], "big") / 2 ** 32 * 11.0
+        return Location(query, (lat, lon), {})
+
+
+def synthetic_locations(count: int) -> List[str]:
+    return [f"Stop {i:05d}, Benchmark County" for i in range(count)]
+
+
+def run(sizes=DEFAULT_SIZES, vrp_time_limit: float = 1.0) -> List[Dict[str, Any]]:
+    from src.services.route_optimizer import RouteOptimizer
+
+    optimizer = RouteOptimizer()
+    optimizer.geolocator = StubGeocoder()
+    rows = []
+    for size in sizes:
+        locations = synthetic_locations(size)
+        repeat = max(1, min(20, 2000 // size))
+
+        rows.append(run_sync(
+            f"routing/greedy/{size}_stops",
+            lambda: optimizer.optimize_route(locations, {}, {}, solver="greedy", improve=False),
+            repeat, stops=size
+        ))
+        rows.append(run_sync(
+            f"routing/greedy+local_search/{size}_stops",
+            lambda: optimizer.optimize_route(locations, {}, {}, solver="greedy"),
+            repeat, stops=size
+        ))
+        if size >= CLUSTERED_MIN_STOPS:
+            rows.append(run_sync(
+                f"routing/clustered/{size}_stops",
+                lambda: optimizer.optimize_route(locations, {}, {}, solver="clustered"),
+                max(1, repeat // 2), stops=size
+            ))
+        if size <= VRP_MAX_STOPS:
+            rows.append(run_sync(
+                f"routing/vrp/{size}_stops",
+                lambda: optimizer.optimize_route(locations, {}, {}, solver="vrp",
+                                                 time_limit_seconds=vrp_time_limit),
+                max(1, repeat // 4), stops=size, time_limit_seconds=vrp_time_limit
+            ))
+    return rows
@@ -0,0 +1,53 @@
+"""
+Offline benchmark suite for the routing, rendering and notification hot paths
+
+    python -m benchmarks.run                       # all suites, results/<commit>.json
+    python -m benchmarks.run --quick --suite routing
+    python -m benchmarks.compare results/abc1234.json results/def5678.json
+"""
+import argparse
+
+from .common import configure_sandbox, print_table, write_results
+from .fake_ollama import FakeOllama
+
+SUITES = ("routing", "rendering", "notifications")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", choices=SUITES, action="append",
+                        help="run only this suite (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer calls")
+    parser.add_argument("--ollama-latency-ms", type=float, default=50.0)
+    parser.add_argument("--ollama-token-ms", type=float, default=1.0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+    suites = args.suite or SUITES
+
+    fake = FakeOllama(latency=args.ollama_latency_ms / 1000, token_latency=args.ollama_token_ms / 1000).start()
+    # Before any src.services import: caches go to a temp dir, Ollama to the fake
+    configure_sandbox(fake.url)
+
+    results = {}
+    try:
+        if "routing" in suites:
+            from . import routing
+            results["routing"] = routing.run((10, 50, 200) if args.quick else routing.DEFAULT_SIZES)
+            print_table("routing", results["routing"])
+        if "rendering" in suites:
+            from . import rendering
+            results["rendering"] = rendering.run((10, 100) if args.quick else rendering.DEFAULT_SIZES,
+                                                 pool_calls=16 if args.quick else 40)
+            print_table("rendering", results["rendering"])
+        if "notifications" in suites:
+            from . import notifications
+            results["notifications"] = notifications.run(calls=50 if args.quick else 200)
+            print_table("notifications", results["notifications"])
+    finally:
+        fake.stop()
+
+    print(f"\nResults written to {write_results(results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
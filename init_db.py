@@ -1,22 +1,17 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.models.database import Base
-from src.config import settings
-
-# Create database URL
-DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
+import asyncio
 
-# Create database engine
-engine = create_engine(DATABASE_URL)
+from src.models.database import Base
+from src.database import async_engine, upgrade_schema
 
-def init_db():
+async def init_db():
     # Create all tables
-    Base.metadata.create_all(bind=engine)
-    
-    # Create SessionLocal class for database sessions
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Columns added since the tables were first created
+    await upgrade_schema()
+    await async_engine.dispose()
     
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
-    init_db()
+    asyncio.run(init_db())
@@ -1,115 +1,663 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
+import asyncio
+import json
+import os
+import time
 
-from ..services.route_optimizer import RouteOptimizer
-from ..services.document_generator import DocumentGenerator
+from ..services.route_optimizer import (RouteOptimizer, plan_route, plan_route_clustered, plan_routes, plan_state,
+                                        replan_route, SOLVERS)
+from ..services.geocoding_cache import normalize_address
+from ..services.route_plan_cache import route_plan_cache, route_request_key, IdempotencyConflictError
+from ..services.document_generator import DocumentGenerator, COMPLIANCE_REPORT_TYPES, NOTIFICATION_TYPES
+from ..services.executors import balanced_batches, stages, StageOverloadedError
+from ..services.renderer import render_stats
+from ..services.tracing import span
+from ..services.ollama_client import ollama, OllamaOverloadedError
+from ..services.request_coalescer import coalescer
+from ..services.job_queue import job_queue, PRIORITIES
+from ..services.single_flight import SingleFlight
 from ..models.database import Route, Delivery, Customer, ComplianceDocument
-from ..database import get_db
+from ..database import get_async_db, AsyncSessionLocal
+from ..config import settings
 
 router = APIRouter()
 route_optimizer = RouteOptimizer()
 document_generator = DocumentGenerator()
 
+async def _save(db: AsyncSession, record):
+    """Insert a record and return it with its generated ID"""
+    db.add(record)
+    with span("db.commit"):
+        await db.commit()
+    return record
+
 @router.post("/routes/optimize")
 async def optimize_route(
     locations: List[str],
     cargo_details: Dict[str, Any],
     time_constraints: Dict[str, Any],
-    db: Session = Depends(get_db)
+    response: Response,
+    solver: str = "greedy",
+    time_limit_seconds: Optional[float] = None,
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Optimize route and generate route documentation"""
+    """Optimize route and generate route documentation
+
+    solver="vrp" honors time windows and spends up to time_limit_seconds
+    improving the tour; "greedy" returns immediately; "clustered" splits
+    thousands of stops into geographic clusters solved in parallel. Resubmitting the same
+    request with a departure_time (or the same Idempotency-Key) returns the
+    stored result until it expires or the route is modified.
+    """
+    if solver not in SOLVERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported solver: {solver}")
     try:
-        # Optimize route
-        route_plan = route_optimizer.optimize_route(locations, cargo_details, time_constraints)
-        
-        if not route_plan:
-            raise HTTPException(status_code=400, detail="Could not optimize route with given constraints")
-        
-        # Generate route documentation
-        route_doc = await document_generator.generate_route_document(route_plan)
-        
-        # Save route to database
-        new_route = Route(
-            route_name=f"Route_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            start_location=locations[0],
-            end_location=locations[-1],
-            waypoints=locations[1:-1],
-            cargo_details=cargo_details,
-            time_constraints=time_constraints,
-            fuel_stops=route_plan["fuel_stops"],
-            compliance_checkpoints=route_plan["compliance_checkpoints"],
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        
-        db.add(new_route)
-        db.commit()
-        db.refresh(new_route)
+        request_hash = route_request_key(locations, cargo_details, time_constraints, solver, time_limit_seconds)
+        # Without a departure_time ETAs count from now, so the plan is not reused by later requests
+        shared = bool(time_constraints.get("departure_time"))
+        with span("route.plan_cache"):
+            cached = await route_plan_cache.get(request_hash, idempotency_key, shared=shared)
+        if cached is not None:
+            response.headers["X-Route-Plan-Cache"] = "hit"
+            return cached
+        response.headers["X-Route-Plan-Cache"] = "miss" if shared else "bypass"
+
+        result = await _planning.run(request_hash, lambda: _optimize_and_save(
+            request_hash, locations, cargo_details, time_constraints, solver, time_limit_seconds, shared
+        ))
+        if idempotency_key:
+            await route_plan_cache.put_idempotency_key(idempotency_key, request_hash, result)
+        return result
         
+    except HTTPException:
+        raise
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except StageOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Identical requests arriving together share one optimization and one Route row
+_planning = SingleFlight()
+
+async def _optimize_and_save(request_hash: str,
+                             locations: List[str],
+                             cargo_details: Dict[str, Any],
+                             time_constraints: Dict[str, Any],
+                             solver: str,
+                             time_limit_seconds: Optional[float],
+                             shared: bool = True) -> Dict[str, Any]:
+    """Geocode, plan, document and insert a route, then cache the response (if ``shared``)"""
+    # Geocoding is network I/O, tour construction is CPU-bound: each runs on its own pool
+    coordinates, stop_indices = await stages.run(
+        "geocode", route_optimizer.geocode_locations, locations
+    )
+    with span("route.plan"):
+        if solver == "clustered":
+            # Fans out to the routing pool itself, one batch of clusters per worker
+            route_plan = await plan_route_clustered(
+                locations, coordinates, stop_indices, cargo_details, time_constraints
+            )
+        else:
+            route_plan = await stages.run(
+                "routing", plan_route, locations, coordinates, stop_indices,
+                cargo_details, time_constraints,
+                solver=solver, time_limit_seconds=time_limit_seconds
+            )
+    
+    if not route_plan:
+        raise HTTPException(status_code=400, detail="Could not optimize route with given constraints")
+    
+    # Generate route documentation
+    route_name = f"Route_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    route_doc = await document_generator.generate_route_document({
+        **route_plan,
+        "route_name": route_name,
+        "start_location": locations[0],
+        "end_location": locations[-1]
+    })
+    
+    # Save route to database (own session: the task may outlive the request that started it)
+    new_route = Route(
+        route_name=route_name,
+        start_location=locations[0],
+        end_location=locations[-1],
+        waypoints=locations[1:-1],
+        cargo_details=cargo_details,
+        time_constraints=time_constraints,
+        fuel_stops=route_plan["fuel_stops"],
+        compliance_checkpoints=route_plan["compliance_checkpoints"],
+        plan=plan_state(locations, coordinates, stop_indices, route_plan),
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
+    async with AsyncSessionLocal() as db:
+        new_route = await _save(db, new_route)
+    
+    result = {
+        "route_id": new_route.id,
+        "route_plan": route_plan,
+        "documentation_path": route_doc
+    }
+    if shared:
+        await route_plan_cache.put(request_hash, result)
+    return result
+
+@router.post("/routes/optimize/batch")
+async def optimize_routes_batch(
+    routes: List[Dict[str, Any]] = Body(..., embed=True),
+    solver: str = "greedy",
+    time_limit_seconds: Optional[float] = None,
+    documentation: bool = False
+):
+    """Plan many routes in one call (e.g. the whole next-day fleet)
+
+    Each entry has locations, cargo_details, time_constraints and optionally
+    its own solver. Locations shared between routes are geocoded once, the
+    plans are spread over the routing pool in one batch per worker, and all
+    routes are inserted in a single transaction. Results are reported per
+    route, in request order, with timings; failed routes do not stop the rest.
+    """
+    if not routes or len(routes) > settings.ROUTE_BATCH_MAX_ROUTES:
+        raise HTTPException(status_code=400,
+                            detail=f"Send between 1 and {settings.ROUTE_BATCH_MAX_ROUTES} routes")
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = [{"index": i, "status": "failed"} for i in range(len(routes))]
+    try:
+        requests: Dict[int, Dict[str, Any]] = {}
+        for i, spec in enumerate(routes):
+            locations = spec.get("locations")
+            route_solver = spec.get("solver", solver)
+            if not locations or not isinstance(locations, list):
+                results[i]["error"] = "locations must be a non-empty list"
+            elif not all(isinstance(location, str) and location.strip() for location in locations):
+                results[i]["error"] = "locations must be non-empty strings"
+            elif not all(isinstance(spec.get(field) or {}, dict) for field in ("cargo_details", "time_constraints")):
+                results[i]["error"] = "cargo_details and time_constraints must be objects"
+            elif route_solver not in SOLVERS:
+                results[i]["error"] = f"Unsupported solver: {route_solver}"
+            else:
+                requests[i] = {"locations": locations,
+                               "cargo_details": spec.get("cargo_details") or {},
+                               "time_constraints": spec.get("time_constraints") or {},
+                               "solver": route_solver,
+                               "time_limit_seconds": time_limit_seconds}
+
+        # One geocoding pass over the distinct locations of every route
+        geocode_started = time.perf_counter()
+        unique: Dict[str, str] = {}
+        for request in requests.values():
+            for location in request["locations"]:
+                unique.setdefault(normalize_address(location), location)
+        queries = list(unique.values())
+        chunks = [queries[i::stages["geocode"].workers] for i in range(stages["geocode"].workers)]
+        resolved: Dict[str, Tuple[float, float]] = {}
+        for chunk, (coordinates, indices) in zip(chunks, await asyncio.gather(*(
+            stages.run("geocode", route_optimizer.geocode_locations, chunk) for chunk in chunks if chunk
+        ))):
+            for coordinate, idx in zip(coordinates, indices):
+                resolved[normalize_address(chunk[idx])] = coordinate
+        geocode_seconds = time.perf_counter() - geocode_started
+
+        for request in requests.values():
+            keys = [normalize_address(location) for location in request["locations"]]
+            request["stop_indices"] = [idx for idx, key in enumerate(keys) if key in resolved]
+            request["coordinates"] = [resolved[keys[idx]] for idx in request["stop_indices"]]
+
+        # A few batches per worker keeps the pool busy even when route sizes differ
+        plan_started = time.perf_counter()
+        order = list(requests)
+        batches = balanced_batches([len(requests[i]["locations"]) ** 2 for i in order],
+                                   stages["routing"].workers * 4)
+        with span("route.plan_batch"):
+            batch_results = await asyncio.gather(*(
+                stages.run("routing", plan_routes, [requests[order[j]] for j in batch]) for batch in batches
+            ))
+        plan_seconds = time.perf_counter() - plan_started
+
+        planned: List[int] = []
+        for batch, outcomes in zip(batches, batch_results):
+            for j, (route_plan, error, seconds) in zip(batch, outcomes):
+                i = order[j]
+                results[i]["timings"] = {"plan_seconds": round(seconds, 4)}
+                if error or not route_plan:
+                    results[i]["error"] = error or "Could not optimize route with given constraints"
+                else:
+                    results[i]["route_plan"] = route_plan
+                    planned.append(i)
+        planned.sort()
+        batch_name = f"Route_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+        documentation_seconds = 0.0
+        if documentation and planned:
+            documentation_started = time.perf_counter()
+            # Bounded so the batch does not overflow the render stage queue
+            limit = asyncio.Semaphore(stages["render"].concurrency)
+
+            async def document(i: int):
+                async with limit:
+                    route_plan = results[i]["route_plan"]
+                    results[i]["documentation_path"] = await document_generator.generate_route_document({
+                        **route_plan,
+                        "route_name": f"{batch_name}_{i}",
+                        "start_location": route_plan["optimized_route"][0]["location"],
+                        "end_location": route_plan["optimized_route"][-1]["location"]
+                    })
+
+            await asyncio.gather(*(document(i) for i in planned))
+            documentation_seconds = time.perf_counter() - documentation_started
+
+        # Every planned route in one transaction
+        insert_started = time.perf_counter()
+        now = datetime.now()
+        new_routes = []
+        for i in planned:
+            request, route_plan = requests[i], results[i]["route_plan"]
+            locations = request["locations"]
+            new_routes.append(Route(
+                route_name=f"{batch_name}_{i}",
+                start_location=locations[0],
+                end_location=locations[-1],
+                waypoints=locations[1:-1],
+                cargo_details=request["cargo_details"],
+                time_constraints=request["time_constraints"],
+                fuel_stops=route_plan["fuel_stops"],
+                compliance_checkpoints=route_plan["compliance_checkpoints"],
+                plan=plan_state(locations, request["coordinates"], request["stop_indices"], route_plan),
+                created_at=now,
+                updated_at=now
+            ))
+        if new_routes:
+            async with AsyncSessionLocal() as db:
+                db.add_all(new_routes)
+                with span("db.commit"):
+                    await db.commit()
+        for i, new_route in zip(planned, new_routes):
+            results[i].update(status="ok", route_id=new_route.id, route_name=new_route.route_name)
+        insert_seconds = time.perf_counter() - insert_started
+
         return {
-            "route_id": new_route.id,
-            "route_plan": route_plan,
-            "documentation_path": route_doc
+            "routes": results,
+            "summary": {
+                "routes": len(routes),
+                "succeeded": len(planned),
+                "failed": len(routes) - len(planned),
+                "unique_locations": len(queries),
+                "geocoded": len(resolved),
+                "timings": {
+                    "geocode_seconds": round(geocode_seconds, 4),
+                    "plan_seconds": round(plan_seconds, 4),
+                    "documentation_seconds": round(documentation_seconds, 4),
+                    "insert_seconds": round(insert_seconds, 4),
+                    "total_seconds": round(time.perf_counter() - started, 4)
+                }
+            }
         }
-        
+
+    except HTTPException:
+        raise
+    except StageOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.patch("/routes/{route_id}")
+async def update_route(
+    route_id: int,
+    add: List[str] = Body([]),
+    remove: List[Union[int, str]] = Body([]),
+    order: Optional[List[Union[int, str]]] = Body(None),
+    cargo_details: Dict[str, Any] = Body({}),
+    documentation: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add, remove or reorder stops of an optimized route in place
+
+    Only added locations are geocoded; the stored coordinates and tour are
+    repaired by cheapest insertion and a short local search. Stops are
+    referenced by location or request index; cargo_details of added stops
+    are keyed by location. Pass documentation=true to re-render the route
+    document.
+    """
+    try:
+        route = await db.get(Route, route_id)
+        if route is None:
+            raise HTTPException(status_code=404, detail="Route not found")
+        if not route.plan:
+            raise HTTPException(status_code=409, detail="Route has no stored plan; optimize it again")
+
+        add_coordinates: List[Optional[Tuple[float, float]]] = [None] * len(add)
+        if add:
+            coordinates, resolved = await stages.run("geocode", route_optimizer.geocode_locations, add)
+            for coordinate, idx in zip(coordinates, resolved):
+                add_coordinates[idx] = coordinate
+
+        # Cargo details are keyed by request index, which added stops get appended at
+        first_new = len(route.plan["locations"])
+        merged_cargo = dict(route.cargo_details or {})
+        for offset, location in enumerate(add):
+            if location in cargo_details:
+                merged_cargo[str(first_new + offset)] = cargo_details[location]
+
+        with span("route.plan"):
+            route_plan, state = await stages.run(
+                "routing", replan_route, route.plan, merged_cargo, route.time_constraints or {},
+                add=add, add_coordinates=add_coordinates, remove=remove, order=order
+            )
+        if not route_plan:
+            raise HTTPException(status_code=400, detail="No stops left on the route")
+
+        stops = [stop["location"] for stop in route_plan["optimized_route"]]
+        route.start_location = stops[0]
+        route.end_location = stops[-1]
+        route.waypoints = stops[1:-1]
+        route.cargo_details = merged_cargo
+        route.fuel_stops = route_plan["fuel_stops"]
+        route.compliance_checkpoints = route_plan["compliance_checkpoints"]
+        route.plan = state
+        route.updated_at = datetime.now()
+        with span("db.commit"):
+            await db.commit()
+
+        response = {"route_id": route.id, "route_plan": route_plan}
+        if documentation:
+            response["documentation_path"] = await document_generator.generate_route_document({
+                **route_plan,
+                "route_name": route.route_name,
+                "start_location": route.start_location,
+                "end_location": route.end_location
+            })
+        # Idempotency-Key retries of the request that created the route replay it as it is now
+        await route_plan_cache.invalidate_route(route.id, changes=response)
+        return response
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except StageOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _delivery_payload(delivery: Delivery) -> Dict[str, Any]:
+    """Template variables describing a delivery"""
+    return {
+        "delivery_date": delivery.estimated_delivery_time.date(),
+        "time_window": f"{delivery.estimated_delivery_time.strftime('%H:%M')} - {delivery.estimated_delivery_time.strftime('%H:%M')}",
+        "tracking_number": f"TRK{delivery.id:06d}",
+        "tracking_url": f"https://logisync.com/track/{delivery.id}",
+        "delay_reason": delivery.delay_reason,
+        "new_delivery_time": delivery.estimated_delivery_time,
+        "delivery_time": delivery.actual_delivery_time,
+        "pod_reference": delivery.proof_of_delivery
+    }
+
+def _customer_payload(customer: Customer) -> Dict[str, Any]:
+    """Template variables describing a customer"""
+    return {
+        "customer_name": customer.name,
+        "email": customer.email,
+        "phone": customer.phone,
+        "communication_preferences": customer.communication_preferences
+    }
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _notification_events(notification_type: str,
+                               delivery_data: Dict[str, Any],
+                               customer_data: Dict[str, Any],
+                               use_cache: bool,
+                               personalize: Optional[bool]):
+    """Relay notification tokens as Server-Sent Events, ending with the stream metrics"""
+    metrics: Dict[str, Any] = {}
+    try:
+        async for token in document_generator.stream_customer_notification(
+            notification_type, delivery_data, customer_data,
+            use_cache=use_cache, metrics=metrics, personalize=personalize
+        ):
+            yield _sse("token", {"token": token})
+        yield _sse("done", metrics)
+    except Exception as e:
+        # Headers are already sent, so errors travel in-band
+        yield _sse("error", {"detail": str(e)})
+
 @router.post("/customer-communications/{notification_type}")
 async def generate_customer_communication(
     notification_type: str,
     delivery_id: int,
-    db: Session = Depends(get_db)
+    bypass_cache: bool = False,
+    stream: bool = False,
+    personalize: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Generate personalized customer communications"""
+    """Generate personalized customer communications
+
+    bypass_cache=true forces a fresh generation (and refreshes the cache).
+    stream=true relays tokens as Server-Sent Events ("token" events, then a
+    "done" event carrying time-to-first-token and tokens/sec).
+    personalize=false returns the rendered template without calling the
+    LLM; when omitted the customer's communication preferences decide.
+    """
+    if notification_type not in NOTIFICATION_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported notification type: {notification_type}")
     try:
-        delivery = db.query(Delivery).filter(Delivery.id == delivery_id).first()
+        with span("db.query"):
+            delivery = (await db.execute(
+                select(Delivery).options(selectinload(Delivery.customer)).where(Delivery.id == delivery_id)
+            )).scalar_one_or_none()
         if not delivery:
             raise HTTPException(status_code=404, detail="Delivery not found")
         
-        customer = db.query(Customer).filter(Customer.id == delivery.customer_id).first()
+        customer = delivery.customer
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        delivery_data = {
-            "delivery_date": delivery.estimated_delivery_time.date(),
-            "time_window": f"{delivery.estimated_delivery_time.strftime('%H:%M')} - {delivery.estimated_delivery_time.strftime('%H:%M')}",
-            "tracking_number": f"TRK{delivery.id:06d}",
-            "tracking_url": f"https://logisync.com/track/{delivery.id}",
-            "delay_reason": delivery.delay_reason,
-            "new_delivery_time": delivery.estimated_delivery_time,
-            "delivery_time": delivery.actual_delivery_time,
-            "pod_reference": delivery.proof_of_delivery
-        }
+        delivery_data = _delivery_payload(delivery)
+        customer_data = _customer_payload(customer)
         
-        customer_data = {
-            "customer_name": customer.name,
-            "email": customer.email,
-            "phone": customer.phone,
-            "communication_preferences": customer.communication_preferences
-        }
+        if stream:
+            return StreamingResponse(
+                _notification_events(notification_type, delivery_data, customer_data, not bypass_cache, personalize),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
         message = await document_generator.generate_customer_notification(
             notification_type,
             delivery_data,
-            customer_data
+            customer_data,
+            use_cache=not bypass_cache,
+            personalize=personalize
         )
         
         return {"message": message}
         
+    except HTTPException:
+        raise
+    except OllamaOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _deliveries_with_customers(db: AsyncSession,
+                                     delivery_ids: Optional[List[int]],
+                                     route_id: Optional[int],
+                                     status: Optional[str]) -> List[Delivery]:
+    """Matching deliveries, with customers eager-loaded by one extra IN query"""
+    query = select(Delivery).options(selectinload(Delivery.customer))
+    if delivery_ids:
+        query = query.where(Delivery.id.in_(delivery_ids))
+    if route_id is not None:
+        query = query.where(Delivery.route_id == route_id)
+    if status is not None:
+        query = query.where(Delivery.status == status)
+    with span("db.query"):
+        return list((await db.execute(query.order_by(Delivery.id))).scalars().all())
+
+async def _bulk_notification_lines(notification_type: str,
+                                   jobs: List[Dict[str, Any]],
+                                   use_cache: bool,
+                                   personalize: Optional[bool]):
+    """Generate notifications with bounded concurrency, yielding NDJSON lines as each finishes"""
+    semaphore = asyncio.Semaphore(settings.BULK_NOTIFICATION_CONCURRENCY)
+
+    async def generate(job: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in job:
+            return job
+        async with semaphore:
+            try:
+                message = await document_generator.generate_customer_notification(
+                    notification_type, job["delivery_data"], job["customer_data"],
+                    use_cache=use_cache, personalize=personalize
+                )
+                return {"delivery_id": job["delivery_id"], "message": message}
+            except Exception as e:
+                return {"delivery_id": job["delivery_id"], "error": str(e)}
+
+    tasks = [asyncio.ensure_future(generate(job)) for job in jobs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, default=str) + "\n"
+    finally:
+        # Client went away: stop generating for it
+        for task in tasks:
+            task.cancel()
+
+@router.post("/customer-communications/{notification_type}/bulk")
+async def generate_bulk_customer_communications(
+    notification_type: str,
+    delivery_ids: Optional[List[int]] = Body(None),
+    route_id: Optional[int] = None,
+    status: Optional[str] = None,
+    bypass_cache: bool = False,
+    personalize: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Generate notifications for many deliveries, streamed back as NDJSON
+
+    Select deliveries by a JSON list of IDs in the body and/or the route_id
+    and status filters. Each line is {"delivery_id", "message"} or
+    {"delivery_id", "error"}, in completion order. personalize works as for
+    a single notification.
+    """
+    if notification_type not in NOTIFICATION_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported notification type: {notification_type}")
+    if not delivery_ids and route_id is None and status is None:
+        raise HTTPException(status_code=400, detail="Provide delivery_ids, route_id or status")
+    deliveries = await _deliveries_with_customers(db, delivery_ids, route_id, status)
+    
+    # Build template data now, while the session is still open
+    jobs = []
+    for delivery in deliveries:
+        if delivery.customer is None:
+            jobs.append({"delivery_id": delivery.id, "error": "Customer not found"})
+        else:
+            jobs.append({
+                "delivery_id": delivery.id,
+                "delivery_data": _delivery_payload(delivery),
+                "customer_data": _customer_payload(delivery.customer)
+            })
+    
+    return StreamingResponse(
+        _bulk_notification_lines(notification_type, jobs, not bypass_cache, personalize),
+        media_type="application/x-ndjson"
+    )
+
+async def _render_compliance_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: render a queued compliance document and record its path"""
+    async with AsyncSessionLocal() as db:
+        doc = await db.get(ComplianceDocument, payload["document_id"])
+        if doc is None:
+            raise ValueError(f"Compliance document {payload['document_id']} no longer exists")
+        doc.status = "rendering"
+        await db.commit()
+        try:
+            doc_path = await document_generator.generate_compliance_report(payload["document_type"], payload["data"])
+        except Exception:
+            # Back in the queue until the retry (or the failure hook) runs
+            doc.status = "queued"
+            await db.commit()
+            raise
+        doc.file_path = doc_path
+        doc.status = "draft"
+        await db.commit()
+    return {"document_id": payload["document_id"], "file_path": doc_path}
+
+async def _compliance_job_failed(payload: Dict[str, Any], error: str):
+    async with AsyncSessionLocal() as db:
+        doc = await db.get(ComplianceDocument, payload["document_id"])
+        if doc is not None:
+            doc.status = "failed"
+            await db.commit()
+
+job_queue.register("compliance_document", _render_compliance_job, on_failure=_compliance_job_failed)
+
+def _parse_expiry_date(data: Dict[str, Any]) -> Optional[datetime]:
+    """ISO 8601 expiry_date from the request body (asyncpg does not coerce strings for DateTime columns)"""
+    value = data.get("expiry_date")
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid expiry_date (expected ISO 8601): {value}")
+
 @router.post("/compliance-documents/{document_type}")
 async def generate_compliance_document(
     document_type: str,
     data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    background: bool = False,
+    priority: str = "normal",
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Generate regulatory compliance documents"""
+    """Generate regulatory compliance documents
+
+    background=true records the document as "queued" and returns a job ID
+    immediately; poll GET /jobs/{job_id} for the rendered file.
+    """
+    if document_type not in COMPLIANCE_REPORT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported report type: {document_type}")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported priority: {priority}")
+    expiry_date = _parse_expiry_date(data)
     try:
+        if background:
+            new_doc = await _save(db, ComplianceDocument(
+                document_type=document_type,
+                related_route_id=data.get("route_id"),
+                content=data,
+                file_path=None,
+                created_at=datetime.now(),
+                expiry_date=expiry_date,
+                status="queued"
+            ))
+            try:
+                job_id = await job_queue.enqueue(
+                    "compliance_document",
+                    {"document_id": new_doc.id, "document_type": document_type, "data": data},
+                    priority=priority
+                )
+            except Exception:
+                # The queue is a separate store; without a job nothing would ever render it
+                new_doc.status = "failed"
+                with span("db.commit"):
+                    await db.commit()
+                raise
+            return JSONResponse(status_code=202, content={
+                "document_id": new_doc.id,
+                "job_id": job_id,
+                "status": "queued"
+            })
+        
         # Generate document
         doc_path = await document_generator.generate_compliance_report(document_type, data)
         
@@ -120,13 +668,11 @@ async def generate_compliance_document(
             content=data,
             file_path=doc_path,
             created_at=datetime.now(),
-            expiry_date=data.get("expiry_date"),
+            expiry_date=expiry_date,
             status="draft"
         )
         
-        db.add(new_doc)
-        db.commit()
-        db.refresh(new_doc)
+        new_doc = await _save(db, new_doc)
         
         return {
             "document_id": new_doc.id,
@@ -134,5 +680,116 @@ async def generate_compliance_document(
             "status": "generated"
         }
         
+    except StageOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single "bytes=" range; None means send the whole file"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        # Multi-range requests may be answered with the full document
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+async def _file_chunks(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = await asyncio.to_thread(f.read, min(length, settings.DOCUMENT_CHUNK_BYTES))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@router.get("/documents/{digest}")
+async def get_document(digest: str, request: Request):
+    """Download a rendered document by content digest
+
+    The digest is the ETag (If-None-Match gives 304) and a single byte
+    range is answered with 206 Partial Content.
+    """
+    path = document_generator.store.find(digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    etag = f'"{digest}"'
+    # Content never changes for a digest
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "public, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or
+                          etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    
+    size = os.path.getsize(path)
+    media_type = _MEDIA_TYPES.get(path.rsplit(".", 1)[-1], "application/octet-stream")
+    byte_range = None
+    if "range" in request.headers and request.headers.get("if-range", etag) == etag:
+        byte_range = _byte_range(request.headers["range"], size)
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers, filename=os.path.basename(path))
+    
+    start, end = byte_range
+    headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+    return StreamingResponse(_file_chunks(path, start, end - start + 1),
+                             status_code=206, media_type=media_type, headers=headers)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, attempts and result of a background job"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/system/executors")
+async def executor_stats():
+    """Per-stage pool size, concurrency limit and current queue depth"""
+    return stages.stats()
+
+@router.get("/system/geocoder")
+async def geocoder_stats():
+    """Gazetteer matches and load time, plus geocoding cache hits and misses"""
+    return route_optimizer.geocoder_stats()
+
+@router.get("/system/route-plan-cache")
+async def route_plan_cache_stats():
+    """Hits, idempotent replays, conflicts and invalidations of stored route plans"""
+    return route_plan_cache.stats()
+
+@router.get("/system/renderer")
+async def renderer_stats():
+    """Render latency (p50/p99/mean) per output format"""
+    return render_stats.stats()
+
+@router.get("/system/document-store")
+async def document_store_stats():
+    """Hits and misses of the rendered-document store"""
+    return document_generator.store.stats()
+
+@router.get("/system/ollama")
+async def ollama_stats():
+    """Ollama slot usage, plus how many upstream calls coalescing saved"""
+    return {**ollama.stats(), "coalescing": coalescer.stats()}
+
+@router.get("/system/llm-cache")
+async def llm_cache_stats():
+    """Hit/miss/eviction counters of the notification response cache"""
+    return document_generator.response_cache.stats()
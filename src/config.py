@@ -1,5 +1,6 @@
+import os
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class Settings(BaseModel):
     PROJECT_NAME: str = "LogiSync"
@@ -11,6 +12,18 @@ class Settings(BaseModel):
     POSTGRES_PASSWORD: str = "logisync"
     POSTGRES_DB: str = "logisync"
     
+    # Full URLs (from the environment) override the POSTGRES_* parts, e.g.
+    # sqlite:///./logisync.db locally; the async URL defaults to the same
+    # database through asyncpg / aiosqlite
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    
     # JWT settings
     JWT_SECRET_KEY: str = "your-secret-key-here"
     JWT_ALGORITHM: str = "HS256"
@@ -21,5 +34,104 @@ class Settings(BaseModel):
     
     # Google Maps API for route optimization
     GOOGLE_MAPS_API_KEY: Optional[str] = None
+    
+    # Geocoding cache (shared by all workers on the host)
+    GEOCODE_CACHE_PATH: str = "cache/geocode.sqlite3"
+    GEOCODE_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    GEOCODE_NEGATIVE_TTL_SECONDS: int = 24 * 3600
+    GEOCODE_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Offline gazetteer tried before Nominatim (GeoNames dump, CSV, or a prebuilt index directory)
+    GAZETTEER_PATH: Optional[str] = None
+    GAZETTEER_INDEX_PATH: str = "cache/gazetteer"
+    GAZETTEER_FUZZY_MAX_DISTANCE: int = 2
+    GAZETTEER_PREFIX_MIN_LENGTH: int = 4
+    GAZETTEER_SCAN_LIMIT: int = 2000
+    
+    # Route planning
+    AVERAGE_SPEED_KMH: float = 60.0
+    VRP_TIME_LIMIT_SECONDS: float = 5.0
+    LOCAL_SEARCH_MAX_ITERATIONS: int = 50000
+    LOCAL_SEARCH_TIME_LIMIT_SECONDS: float = 1.0
+    LOCAL_SEARCH_NEIGHBORS: int = 10
+    ROUTE_REPAIR_TIME_LIMIT_SECONDS: float = 0.05
+    CLUSTER_METHOD: str = "kmeans"  # or "sweep"
+    CLUSTER_MAX_STOPS: int = 200
+    CLUSTER_LOCAL_SEARCH_TIME_LIMIT_SECONDS: float = 0.25
+    ROUTE_BATCH_MAX_ROUTES: int = 1000
+    
+    # Stored /routes/optimize results (0 disables reuse by request hash; Idempotency-Key still applies)
+    ROUTE_PLAN_CACHE_PATH: str = "cache/route_plans.sqlite3"
+    ROUTE_PLAN_CACHE_TTL_SECONDS: int = 900
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 3600
+    
+    # Fuel-stop placement from a station catalog (CSV with name, latitude, longitude, price)
+    FUEL_STATIONS_PATH: Optional[str] = None
+    FUEL_STATION_DETOUR_METERS: float = 5000.0
+    FUEL_STATION_SAMPLE_METERS: float = 5000.0
+    FUEL_STATION_STRATEGY: str = "cheapest"
+    
+    # Ollama server and client pool
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_MAX_CONNECTIONS: int = 8
+    OLLAMA_MAX_IN_FLIGHT: int = 4
+    OLLAMA_MAX_QUEUE: int = 64
+    OLLAMA_TIMEOUT_SECONDS: float = 120.0
+    OLLAMA_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    OLLAMA_MAX_RETRIES: int = 3
+    OLLAMA_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    OLLAMA_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    OLLAMA_STREAM_HISTORY: int = 1000
+    
+    # LLM response cache; TTLs are per notification type
+    LLM_CACHE_PATH: str = "cache/llm_responses.sqlite3"
+    LLM_CACHE_MAX_MEMORY_BYTES: int = 32 * 1024 * 1024
+    LLM_CACHE_MAX_DISK_BYTES: int = 512 * 1024 * 1024
+    LLM_CACHE_DEFAULT_TTL_SECONDS: int = 3600
+    LLM_CACHE_TTL_SECONDS: Dict[str, int] = {
+        "delivery_confirmation": 24 * 3600,
+        "delay_notification": 15 * 60,
+        "proof_of_delivery": 7 * 24 * 3600,
+    }
+    
+    # Generations in flight per bulk notification request
+    BULK_NOTIFICATION_CONCURRENCY: int = 8
+    
+    # Background job queue (compliance document rendering)
+    JOB_QUEUE_PATH: str = "cache/jobs.sqlite3"
+    JOB_QUEUE_WORKERS: int = 2
+    JOB_QUEUE_POLL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: float = 600.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_DELAY_SECONDS: float = 5.0
+    
+    # Jinja2 notification / document text templates (src/templates)
+    TEMPLATE_BYTECODE_CACHE_PATH: str = "cache/jinja2"
+    TEMPLATE_AUTO_RELOAD: bool = False
+    # Send notifications through the LLM unless the request or the customer's
+    # communication_preferences ({"personalize": false}) say otherwise
+    NOTIFICATION_PERSONALIZE_DEFAULT: bool = True
+    
+    # Rendered documents, stored by content hash
+    DOCUMENT_STORE_PATH: str = "documents/store"
+    DOCUMENT_CHUNK_BYTES: int = 64 * 1024
+    
+    # Document rendering; an optional .docx (e.g. letterhead) every DOCX starts from
+    RENDER_DOCX_TEMPLATE: Optional[str] = None
+    RENDER_LATENCY_HISTORY: int = 1000
+    # FMCSA reports with at least this many records (or "streaming": true) are
+    # drawn as compact table pages instead of one paragraph per record
+    FMCSA_STREAMING_MIN_RECORDS: int = 500
+    FMCSA_STREAMING_ROWS_PER_PAGE: int = 50
+    
+    # Executors for blocking stages, keyed by stage name; an initializer is a
+    # dotted path run once in each worker
+    EXECUTOR_STAGES: Dict[str, Dict[str, Any]] = {
+        "geocode": {"kind": "thread", "workers": 8, "max_queue": 256},
+        "routing": {"kind": "process", "workers": 4, "max_queue": 128,
+                    "initializer": "src.services.fuel_stations.init_worker"},
+        "render": {"kind": "process", "workers": 4, "max_queue": 128,
+                   "initializer": "src.services.renderer.init_worker"},
+    }
 
 settings = Settings()
\ No newline at end of file
@@ -1,25 +1,65 @@
 """
 Database connection utilities
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from .config import settings
 
 # Create database URL
-DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
+DATABASE_URL = settings.DATABASE_URL or f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
 
-# Create database engine
-engine = create_engine(DATABASE_URL)
+def _async_url(url: str) -> str:
+    """Same database through its async driver (asyncpg / aiosqlite)"""
+    scheme, rest = url.split("://", 1)
+    driver = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}.get(scheme.split("+")[0])
+    return f"{driver}://{rest}" if driver else url
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_url(DATABASE_URL)
 
-def get_db():
+def _async_engine_options(url: str) -> dict:
+    """Pool and timeout settings; SQLite stand-ins get only pre-ping"""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("postgresql"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            connect_args={"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        )
+    return options
+
+# Async engine used by the API
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options(ASYNC_DATABASE_URL))
+
+# Objects stay usable after commit, so handlers can read generated IDs without a reload
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+# Columns added to tables after their first release; create_all never alters an existing table
+COLUMN_MIGRATIONS = (
+    ("routes", "plan", "JSON"),
+)
+
+def _existing_columns(sync_conn) -> dict:
+    inspector = inspect(sync_conn)
+    return {table: {column["name"] for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()}
+
+async def upgrade_schema():
+    """
+    Add the COLUMN_MIGRATIONS columns missing from existing tables (idempotent)
+    """
+    async with async_engine.begin() as conn:
+        existing = await conn.run_sync(_existing_columns)
+        # Postgres tolerates workers racing on the same ALTER
+        guard = "IF NOT EXISTS " if conn.dialect.name == "postgresql" else ""
+        for table, column, column_type in COLUMN_MIGRATIONS:
+            if table in existing and column not in existing[table]:
+                await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {guard}{column} {column_type}"))
+
+async def get_async_db():
     """
-    Dependency function that yields database sessions
+    Dependency function that yields async database sessions
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,14 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from .config import settings
 from .api.endpoints import router as api_router
+from .services.executors import stages
+from .services.ollama_client import ollama
+from .database import async_engine, upgrade_schema
+from .services.job_queue import job_queue
+from .services.tracing import ServerTimingMiddleware, registry
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upgrade_schema()
+    await ollama.start()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await ollama.close()
+    await async_engine.dispose()
+    # Let in-flight stage work finish before the worker exits
+    stages.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,6 +40,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request span timings in a Server-Timing header, histograms for /metrics
+app.add_middleware(ServerTimingMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 
@@ -30,4 +53,9 @@ templates = Jinja2Templates(directory="src/templates")
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Span latency histograms in Prometheus text format"""
+    return PlainTextResponse(registry.prometheus(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
@@ -16,6 +16,7 @@ class Route(Base):
     time_constraints = Column(JSON)  # Store pickup/delivery windows
     fuel_stops = Column(JSON)  # Recommended fuel stops
     compliance_checkpoints = Column(JSON)  # Required inspection/rest points
+    plan = Column(JSON, nullable=True)  # Stop coordinates and tour, for incremental re-planning
     created_at = Column(DateTime)
     updated_at = Column(DateTime)
     deliveries = relationship("Delivery", back_populates="route")
@@ -55,4 +56,4 @@ class ComplianceDocument(Base):
     file_path = Column(String)  # Path to generated document
     created_at = Column(DateTime)
     expiry_date = Column(DateTime, nullable=True)
-    status = Column(String)  # draft, submitted, approved, expired
\ No newline at end of file
+    status = Column(String)  # queued, rendering, failed, draft, submitted, approved, expired
\ No newline at end of file
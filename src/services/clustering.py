@@ -0,0 +1,146 @@
+"""
+Cluster-first, route-second decomposition of very large stop sets
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .distance_matrix import DistanceMatrix
+from .local_search import improve_tour
+
+METHODS = ("sweep", "kmeans")
+
+# cargo_details keys: vehicle capacity at the top level, demand per stop entry
+CAPACITY_FIELD = "vehicle_capacity"
+DEMAND_FIELD = "weight"
+
+# One cluster as shipped to a worker: (coordinates, index of the entry stop)
+ClusterTask = Tuple[List[Tuple[float, float]], int]
+
+
+def stop_demands(cargo_details: Dict, stop_indices: Sequence[int]) -> np.ndarray:
+    """Demand of every geocoded stop from its cargo_details entry (0 when not given)"""
+    demands = np.zeros(len(stop_indices))
+    for position, request_idx in enumerate(stop_indices):
+        entry = cargo_details.get(str(request_idx))
+        if isinstance(entry, dict):
+            demands[position] = float(entry.get(DEMAND_FIELD) or 0)
+    return demands
+
+
+def _bearings(coordinates: np.ndarray, origin: np.ndarray) -> np.ndarray:
+    """Initial bearing (radians, 0..2pi) from ``origin`` to every point"""
+    lat1, lon1 = np.radians(origin)
+    lat2, lon2 = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    y = np.sin(lon2 - lon1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.mod(np.arctan2(y, x), 2 * np.pi)
+
+
+def _cut(order: np.ndarray, demands: np.ndarray, capacity: float, max_stops: int) -> List[np.ndarray]:
+    """Split ``order`` into consecutive groups within the stop and capacity limits"""
+    groups, start, load = [], 0, 0.0
+    for i, position in enumerate(order):
+        if i > start and (i - start >= max_stops or load + demands[position] > capacity):
+            groups.append(order[start:i])
+            start, load = i, 0.0
+        load += demands[position]
+    groups.append(order[start:])
+    return groups
+
+
+def partition_stops(coordinates: Sequence[Tuple[float, float]],
+                    demands: np.ndarray,
+                    capacity: Optional[float] = None,
+                    max_stops: Optional[int] = None,
+                    method: Optional[str] = None) -> List[np.ndarray]:
+    """
+    Geographic clusters of stop positions, in visiting order.
+
+    "sweep" orders stops by bearing from the start stop (position 0) and
+    cuts the sweep whenever a cluster would exceed ``max_stops`` or
+    ``capacity``. "kmeans" groups stops around k = n / max_stops centroids,
+    visits clusters in nearest-neighbor order of their centroids, and
+    splits any over the limits by sweep. The start stop always opens the first cluster.
+    """
+    max_stops = max_stops or settings.CLUSTER_MAX_STOPS
+    method = method or settings.CLUSTER_METHOD
+    if method not in METHODS:
+        raise ValueError(f"Unsupported clustering method: {method}")
+    capacity = capacity if capacity and capacity > 0 else np.inf
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    depot = coordinates[0]
+    bearings = _bearings(coordinates, depot)
+    others = np.arange(1, len(coordinates))
+
+    if method == "sweep":
+        order = np.concatenate([[0], others[np.argsort(bearings[1:], kind="stable")]])
+        return _cut(order, demands, capacity, max_stops)
+
+    from sklearn.cluster import MiniBatchKMeans
+
+    k = max(1, int(np.ceil(len(coordinates) / max_stops)))
+    labels = MiniBatchKMeans(n_clusters=k, n_init=3, random_state=0).fit_predict(coordinates)
+    centroids = np.array([coordinates[labels == c].mean(axis=0) if np.any(labels == c) else depot
+                          for c in range(k)])
+    # Visit clusters as a nearest-neighbor chain over centroids, from the start stop's cluster
+    first = int(labels[0])
+    cluster_order = DistanceMatrix(centroids).nearest_neighbor_tour(first)
+    groups = []
+    for c in cluster_order:
+        members = others[labels[others] == c]
+        members = members[np.argsort(bearings[members], kind="stable")]
+        if c == first:
+            members = np.concatenate([[0], members])
+        if len(members):
+            groups.extend(_cut(members, demands, capacity, max_stops))
+    return groups
+
+
+def cluster_tasks(coordinates: Sequence[Tuple[float, float]], clusters: List[np.ndarray]) -> List[ClusterTask]:
+    """
+    Worker inputs per cluster. Clusters are solved independently, so each
+    one enters at the stop closest to the previous cluster's centroid (the
+    first at the start stop) to keep the stitching legs short.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    tasks = []
+    previous = None
+    for cluster in clusters:
+        points = coordinates[cluster]
+        if previous is None:
+            entry = 0
+        else:
+            entry = int(np.argmin(((points - previous) ** 2).sum(axis=1)))
+        tasks.append((points.tolist(), entry))
+        previous = points.mean(axis=0)
+    return tasks
+
+
+def solve_clusters(tasks: List[ClusterTask], improve: bool = True,
+                   time_limit_seconds: Optional[float] = None) -> List[List[int]]:
+    """
+    Open tour of every cluster from its entry stop, as local indices.
+
+    Pure CPU work on small inputs; a batch of clusters per call keeps the
+    routing pool queue short.
+    """
+    budget = time_limit_seconds if time_limit_seconds is not None else settings.CLUSTER_LOCAL_SEARCH_TIME_LIMIT_SECONDS
+    orders = []
+    for points, entry in tasks:
+        matrix = DistanceMatrix(points)
+        tour = matrix.nearest_neighbor_tour(entry)
+        if improve:
+            tour = improve_tour(matrix, tour,
+                                max_iterations=settings.LOCAL_SEARCH_MAX_ITERATIONS,
+                                time_limit_seconds=budget,
+                                neighbors=settings.LOCAL_SEARCH_NEIGHBORS)["tour"]
+        orders.append(tour)
+    return orders
+
+
+def stitch(clusters: List[np.ndarray], orders: List[List[int]]) -> List[int]:
+    """Concatenate the cluster tours into one tour of stop positions"""
+    return [int(cluster[i]) for cluster, order in zip(clusters, orders) for i in order]
+
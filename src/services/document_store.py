@@ -0,0 +1,82 @@
+"""
+Content-addressed store for rendered documents
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+from typing import Any, Dict, Optional
+
+from ..config import settings
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def document_digest(document_type: str, data: Dict[str, Any], version: str = "") -> str:
+    """
+    Hash of the document type and its canonicalized input data.
+
+    Key order and JSON layout do not matter; ``version`` lets the renderer
+    invalidate every stored artifact when its output changes.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    material = f"{document_type}\n{version}\n{canonical}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class DocumentStore:
+    """
+    Rendered artifacts on disk under ``<root>/<digest[:2]>/<digest>.<ext>``.
+
+    The same inputs always map to the same path, so a stored file can be
+    returned instead of rendering again, and a digest is a strong ETag.
+    Renders write to a temporary file that is moved into place atomically,
+    so readers never see a partial document.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.DOCUMENT_STORE_PATH
+        self._tmp = os.path.join(self.root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension}")
+
+    def lookup(self, digest: str, extension: str) -> Optional[str]:
+        """Path of the stored artifact, counting the hit or miss"""
+        path = self.path_for(digest, extension)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def find(self, digest: str) -> Optional[str]:
+        """Stored artifact for a digest, whatever its format"""
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        matches = glob.glob(os.path.join(self.root, digest[:2], f"{digest}.*"))
+        return matches[0] if matches else None
+
+    def temp_path(self, extension: str) -> str:
+        return os.path.join(self._tmp, f"{uuid.uuid4().hex}.{extension}")
+
+    def commit(self, temp_path: str, digest: str, extension: str) -> str:
+        """Move a finished render into place and return its store path"""
+        path = self.path_for(digest, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "root": self.root,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,160 @@
+"""
+Bounded executors for blocking pipeline stages (geocoding, routing, rendering, DB)
+"""
+import asyncio
+import contextvars
+import functools
+import importlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from ..config import settings
+from .tracing import replay, run_captured, span
+
+
+class StageOverloadedError(Exception):
+    """Raised when a stage's wait queue is full"""
+
+
+class Stage:
+    """
+    One pipeline stage backed by its own thread or process pool.
+
+    At most ``concurrency`` calls run at once; further callers wait on the
+    stage semaphore, and once ``max_queue`` are waiting new calls are
+    rejected instead of piling up.
+    """
+
+    def __init__(self,
+                 name: str,
+                 kind: str = "thread",
+                 workers: int = 4,
+                 concurrency: Optional[int] = None,
+                 max_queue: int = 256,
+                 initializer: Optional[Union[Callable, str]] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.concurrency = concurrency or workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if isinstance(self.initializer, str):
+                # Resolved lazily so settings can name it without import cycles
+                module, _, attr = self.initializer.rpartition(".")
+                self.initializer = getattr(importlib.import_module(module), attr)
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix=f"stage-{self.name}",
+                                                    initializer=self.initializer)
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the stage pool without blocking the event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise StageOverloadedError(f"Stage '{self.name}' is overloaded ({self.queued} waiting)")
+
+        self.queued += 1
+        try:
+            with span(f"stage.{self.name}.queue"):
+                await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.kind == "process":
+                # Spans recorded in the worker process come back with the result
+                result, spans = await loop.run_in_executor(
+                    self.executor, functools.partial(run_captured, fn, args, kwargs)
+                )
+                replay(spans)
+            else:
+                # Copy the context so worker-thread spans land on the current request
+                context = contextvars.copy_context()
+                result = await loop.run_in_executor(
+                    self.executor, functools.partial(context.run, fn, *args, **kwargs)
+                )
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+def balanced_batches(costs: Sequence[float], batches: int) -> List[List[int]]:
+    """
+    Item indices split into at most ``batches`` groups of similar total cost
+    (largest first onto the least loaded group), so a fan-out of many small
+    jobs becomes one call per worker instead of flooding the stage queue
+    """
+    groups: List[List[int]] = [[] for _ in range(max(1, min(batches, len(costs))))]
+    load = [0.0] * len(groups)
+    for i in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        target = load.index(min(load))
+        groups[target].append(i)
+        load[target] += costs[i]
+    return groups
+
+
+class StageExecutors:
+    """Registry of named stages configured from settings.EXECUTOR_STAGES"""
+
+    def __init__(self, config: Dict[str, Dict[str, Any]]):
+        self.stages: Dict[str, Stage] = {name: Stage(name, **options) for name, options in config.items()}
+
+    def __getitem__(self, name: str) -> Stage:
+        return self.stages[name]
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.stages[stage].run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
+
+    def shutdown(self, wait: bool = True):
+        for stage in self.stages.values():
+            stage.shutdown(wait=wait)
+
+
+stages = StageExecutors(settings.EXECUTOR_STAGES)
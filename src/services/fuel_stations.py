@@ -0,0 +1,215 @@
+"""
+Fuel-station catalog with a haversine BallTree for along-route fuel-stop placement
+"""
+import csv
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from ..config import settings
+from .distance_matrix import EARTH_RADIUS_M
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("cheapest", "nearest")
+
+# Accepted CSV header spellings
+_CSV_COLUMNS = {
+    "id": ("id", "station_id"),
+    "name": ("name", "station", "brand"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "price": ("price", "fuel_price", "diesel_price"),
+}
+
+# Catalog of the current process, loaded once per routing worker
+_catalog: Optional["FuelStationCatalog"] = None
+
+
+class FuelStationCatalog:
+    """
+    Station coordinates and prices with a BallTree over them.
+
+    The tree uses the haversine metric on radians, so one ``query_radius``
+    call answers "which stations are within the detour budget" for every
+    sample point of a route at once.
+    """
+
+    def __init__(self,
+                 coordinates: Sequence[Tuple[float, float]],
+                 names: Sequence[str],
+                 prices: Optional[Sequence[float]] = None,
+                 ids: Optional[Sequence[str]] = None):
+        started = time.perf_counter()
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.names = list(names)
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.names))]
+        # Unknown prices sort last for the "cheapest" strategy
+        self.prices = (np.full(len(self.names), np.nan) if prices is None
+                       else np.asarray(prices, dtype=np.float64))
+        self.tree = BallTree(np.radians(self.coordinates), metric="haversine")
+        self.build_seconds = time.perf_counter() - started
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FuelStationCatalog":
+        """Load a CSV with name, latitude, longitude and (optionally) id and price columns"""
+        coordinates, names, prices, ids = [], [], [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = {key: next((c for c in reader.fieldnames or () if c.strip().lower() in spellings), None)
+                      for key, spellings in _CSV_COLUMNS.items()}
+            if not (fields["latitude"] and fields["longitude"]):
+                raise ValueError(f"{path}: CSV needs latitude and longitude columns")
+            for number, row in enumerate(reader):
+                coordinates.append((float(row[fields["latitude"]]), float(row[fields["longitude"]])))
+                names.append(row[fields["name"]] if fields["name"] else f"Station {number}")
+                ids.append(row[fields["id"]] if fields["id"] else str(number))
+                price = row[fields["price"]].strip() if fields["price"] else ""
+                prices.append(float(price) if price else np.nan)
+        return cls(coordinates, names, prices, ids)
+
+    def within(self, points: np.ndarray, radius_meters: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Station indices and distances (meters) within ``radius_meters`` of each point, in one batch"""
+        indices, distances = self.tree.query_radius(np.radians(points), r=radius_meters / EARTH_RADIUS_M,
+                                                    return_distance=True)
+        return indices, distances * EARTH_RADIUS_M
+
+    def station(self, index: int, **extra) -> Dict[str, Any]:
+        price = self.prices[index]
+        return {
+            "location": self.names[index],
+            "station_id": self.ids[index],
+            "latitude": float(self.coordinates[index, 0]),
+            "longitude": float(self.coordinates[index, 1]),
+            "price": None if np.isnan(price) else float(price),
+            **extra,
+        }
+
+
+def init_worker():
+    """Load the station catalog once per routing worker (pool initializer)"""
+    global _catalog
+    if settings.FUEL_STATIONS_PATH and _catalog is None:
+        _catalog = FuelStationCatalog.from_csv(settings.FUEL_STATIONS_PATH)
+        logger.info("Loaded %d fuel stations in %.0f ms", len(_catalog), _catalog.build_seconds * 1000)
+
+
+def catalog() -> Optional[FuelStationCatalog]:
+    """The process-wide catalog, or None when FUEL_STATIONS_PATH is not set"""
+    if _catalog is None:
+        init_worker()
+    return _catalog
+
+
+def sample_route(coordinates: np.ndarray,
+                 cumulative_distance: np.ndarray,
+                 spacing_meters: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Points every ``spacing_meters`` along the great-circle legs of a tour.
+
+    ``coordinates`` are the tour's stops in visiting order. Returns the
+    sample points (degrees) and their distance from the start of the route,
+    measured along ``cumulative_distance``.
+    """
+    leg_lengths = np.diff(cumulative_distance)
+    counts = np.maximum(np.ceil(leg_lengths / spacing_meters).astype(np.int64), 1)
+    leg = np.repeat(np.arange(len(leg_lengths)), counts)
+    # Fraction of the leg covered at each sample; each leg's own start is included
+    fractions = np.arange(len(leg)) - np.repeat(np.cumsum(counts) - counts, counts)
+    fractions = fractions / counts[leg]
+
+    # Spherical interpolation between the leg's endpoints
+    lat, lon = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    unit = np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+    start, end = unit[leg], unit[leg + 1]
+    angle = np.arccos(np.clip((start * end).sum(axis=1), -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    straight = sin_angle < 1e-12
+    safe = np.where(straight, 1.0, sin_angle)
+    a = np.where(straight, 1.0 - fractions, np.sin((1.0 - fractions) * angle) / safe)
+    b = np.where(straight, fractions, np.sin(fractions * angle) / safe)
+    points = a[:, None] * start + b[:, None] * end
+
+    samples = np.degrees(np.stack([np.arcsin(np.clip(points[:, 2] / np.linalg.norm(points, axis=1), -1.0, 1.0)),
+                                   np.arctan2(points[:, 1], points[:, 0])], axis=1))
+    # The final stop closes the polyline
+    samples = np.vstack([samples, coordinates[-1:]])
+    along = np.append(cumulative_distance[leg] + fractions * leg_lengths[leg], cumulative_distance[-1])
+    return samples, along
+
+
+def place_fuel_stops(stations: FuelStationCatalog,
+                     coordinates: np.ndarray,
+                     cumulative_distance: np.ndarray,
+                     usable_range: float,
+                     detour_meters: Optional[float] = None,
+                     spacing_meters: Optional[float] = None,
+                     strategy: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Catalog stations to refuel at so no stretch exceeds ``usable_range`` meters.
+
+    Stations within ``detour_meters`` of the route are found in one batched
+    BallTree query. From each refuel, the next one is picked among stations
+    seen in the second half of the reachable stretch: the cheapest one
+    ("cheapest"), or the one closest to the route at the furthest sample
+    that has any ("nearest"). Where no station is in reach, the last route
+    stop before the range runs out is used instead, reported with
+    ``"station_id": None`` and its ``route_position`` in the tour.
+    """
+    detour_meters = detour_meters if detour_meters is not None else settings.FUEL_STATION_DETOUR_METERS
+    spacing_meters = spacing_meters or settings.FUEL_STATION_SAMPLE_METERS
+    strategy = strategy or settings.FUEL_STATION_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unsupported fuel station strategy: {strategy}")
+
+    total = float(cumulative_distance[-1])
+    if total <= usable_range:
+        return []
+    samples, along = sample_route(coordinates, cumulative_distance, spacing_meters)
+    indices, distances = stations.within(samples, detour_meters)
+
+    # Flatten to (sample, station, off-route distance) rows ordered by position along the route
+    counts = np.fromiter((len(i) for i in indices), dtype=np.int64, count=len(indices))
+    hit_sample = np.repeat(np.arange(len(indices)), counts)
+    hit_station = np.concatenate(indices) if len(indices) else np.empty(0, dtype=np.int64)
+    hit_offset = np.concatenate(distances) if len(distances) else np.empty(0)
+    hit_along = along[hit_sample]
+    hit_price = np.where(np.isnan(stations.prices[hit_station]), np.inf, stations.prices[hit_station])
+
+    stops = []
+    position = 0.0
+    while position + usable_range < total:
+        limit = position + usable_range
+        lo = int(np.searchsorted(hit_along, position + usable_range / 2, side="left"))
+        hi = int(np.searchsorted(hit_along, limit, side="right"))
+        if lo >= hi:
+            # Nothing in the late half; take the furthest station reachable at all
+            lo = int(np.searchsorted(hit_along, position, side="right"))
+        if lo >= hi:
+            # No station in reach: last route stop before running dry, as without a catalog
+            stop = int(np.searchsorted(cumulative_distance, limit, side="right")) - 1
+            if cumulative_distance[stop] > position:
+                stops.append({"location": None, "station_id": None, "route_position": stop,
+                              "distance_from_start": float(cumulative_distance[stop])})
+                position = float(cumulative_distance[stop])
+            else:
+                position = limit
+            continue
+        if strategy == "cheapest":
+            # Cheapest, then furthest along, then closest to the route
+            order = np.lexsort((hit_offset[lo:hi], -hit_along[lo:hi], hit_price[lo:hi]))
+            best = lo + int(order[0])
+        else:
+            furthest = int(np.searchsorted(hit_along[lo:hi], hit_along[hi - 1], side="left")) + lo
+            best = furthest + int(np.argmin(hit_offset[furthest:hi]))
+        stops.append(stations.station(int(hit_station[best]),
+                                      distance_from_start=float(hit_along[best]),
+                                      detour_meters=round(2 * float(hit_offset[best]), 1)))
+        position = float(hit_along[best])
+    return stops
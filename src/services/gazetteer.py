@@ -0,0 +1,409 @@
+"""
+Offline gazetteer geocoder: a prebuilt, memory-mapped place-name index with prefix and fuzzy matching
+
+    python -m src.services.gazetteer build cities500.txt cache/gazetteer
+    python -m src.services.gazetteer lookup cache/gazetteer "Springfield, IL"
+"""
+import argparse
+import csv
+import fcntl
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from geopy.location import Location
+
+from ..config import settings
+from .geocoding_cache import normalize_address
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Column positions in a GeoNames dump (geoname.txt / allCountries.txt / citiesNNN.txt)
+_GEONAMES_NAME, _GEONAMES_ASCII, _GEONAMES_ALTERNATE = 1, 2, 3
+_GEONAMES_LAT, _GEONAMES_LON, _GEONAMES_COUNTRY, _GEONAMES_ADMIN1, _GEONAMES_POPULATION = 4, 5, 8, 10, 14
+
+# Accepted CSV header spellings
+_CSV_COLUMNS = {
+    "name": ("name", "place", "city"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "admin1": ("admin1", "state", "region", "province"),
+    "country": ("country", "country_code"),
+    "population": ("population",),
+    "alternate_names": ("alternate_names", "alternatenames", "aliases"),
+}
+
+# Place record: (name, alternate names, latitude, longitude, admin1, country, population)
+Place = Tuple[str, List[str], float, float, str, str, int]
+
+
+def fold(text: str) -> str:
+    """normalize_address plus diacritic folding, so "São Paulo" matches "sao paulo" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return normalize_address("".join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+def read_places(path: str) -> Iterator[Place]:
+    """Places from a GeoNames tab-separated dump or a CSV file with a header row"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = {key: next((c for c in reader.fieldnames or () if c.strip().lower() in names), None)
+                      for key, names in _CSV_COLUMNS.items()}
+            if not (fields["name"] and fields["latitude"] and fields["longitude"]):
+                raise ValueError(f"{path}: CSV needs name, latitude and longitude columns")
+            for row in reader:
+                get = lambda key: (row.get(fields[key]) or "").strip() if fields[key] else ""
+                alternates = get("alternate_names").replace(";", ",").split(",")
+                yield (get("name"), [a for a in alternates if a.strip()], float(get("latitude")),
+                       float(get("longitude")), get("admin1"), get("country"), int(get("population") or 0))
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= _GEONAMES_POPULATION:
+                continue
+            alternates = [cols[_GEONAMES_ASCII]] + cols[_GEONAMES_ALTERNATE].split(",")
+            yield (cols[_GEONAMES_NAME], [a for a in alternates if a], float(cols[_GEONAMES_LAT]),
+                   float(cols[_GEONAMES_LON]), cols[_GEONAMES_ADMIN1], cols[_GEONAMES_COUNTRY],
+                   int(cols[_GEONAMES_POPULATION] or 0))
+
+
+def _place_keys(name: str, alternates: List[str], admin1: str, country: str) -> List[str]:
+    """Every normalized spelling a place can be looked up by"""
+    qualifiers = [fold(q) for q in (admin1, country) if q]
+    keys = set()
+    for spelling in {fold(name), *(fold(a) for a in alternates)}:
+        if not spelling:
+            continue
+        keys.add(spelling)
+        for qualifier in qualifiers:
+            keys.add(f"{spelling} {qualifier}")
+        if len(qualifiers) == 2:
+            keys.add(f"{spelling} {qualifiers[0]} {qualifiers[1]}")
+    return list(keys)
+
+
+def _write_blob(path: str, strings: List[bytes]) -> np.ndarray:
+    """Concatenate strings into one file; returns the n+1 byte offsets"""
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    with open(path, "wb") as f:
+        for s in strings:
+            f.write(s)
+    return offsets
+
+
+@contextmanager
+def _build_lock(index_dir: str):
+    """Exclusive lock on ``<index_dir>.lock``, held by one building process at a time"""
+    index_dir = index_dir.rstrip("/\\")
+    os.makedirs(os.path.dirname(os.path.abspath(index_dir)), exist_ok=True)
+    with open(index_dir + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _is_current(source: str, index_dir: str) -> bool:
+    """Whether ``index_dir`` holds an index of this version built from ``source`` as it is now"""
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = os.stat(source)
+    return (meta.get("version") == INDEX_VERSION and meta.get("source_size") == stat.st_size
+            and meta.get("source_mtime") == stat.st_mtime)
+
+
+def build_index(source: str, index_dir: str) -> Dict[str, Any]:
+    """
+    Build the on-disk index for ``source`` into ``index_dir``.
+
+    Keys are the UTF-8 bytes of every normalized spelling (also qualified
+    with admin1 / country code), sorted so lookups are a binary search over
+    a memory-mapped blob. Each build writes to its own temporary sibling
+    directory and swaps it in under the build lock, so readers never see a
+    half-written index and concurrent builders never share files.
+    """
+    with _build_lock(index_dir):
+        return _build_index(source, index_dir)
+
+
+def _build_index(source: str, index_dir: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    key_entries: List[Tuple[bytes, int]] = []
+    latitudes, longitudes, populations, addresses = [], [], [], []
+    for name, alternates, latitude, longitude, admin1, country, population in read_places(source):
+        entry = len(latitudes)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        populations.append(population)
+        addresses.append(", ".join(part for part in (name, admin1, country) if part).encode("utf-8"))
+        key_entries.extend((key.encode("utf-8"), entry) for key in _place_keys(name, alternates, admin1, country))
+    key_entries.sort()
+
+    index_dir = index_dir.rstrip("/\\")
+    staging = tempfile.mkdtemp(prefix=os.path.basename(index_dir) + ".building-",
+                               dir=os.path.dirname(os.path.abspath(index_dir)))
+    # mkdtemp creates 0700; the index is read by every worker
+    os.chmod(staging, 0o755)
+    try:
+        np.save(os.path.join(staging, "key_offsets.npy"),
+                _write_blob(os.path.join(staging, "keys.bin"), [key for key, _ in key_entries]))
+        np.save(os.path.join(staging, "key_entries.npy"), np.array([e for _, e in key_entries], dtype=np.int32))
+        np.save(os.path.join(staging, "coordinates.npy"), np.array([latitudes, longitudes], dtype=np.float64).T)
+        np.save(os.path.join(staging, "populations.npy"), np.array(populations, dtype=np.int64))
+        np.save(os.path.join(staging, "address_offsets.npy"),
+                _write_blob(os.path.join(staging, "addresses.bin"), addresses))
+
+        stat = os.stat(source)
+        meta = {"version": INDEX_VERSION, "source": os.path.abspath(source), "source_size": stat.st_size,
+                "source_mtime": stat.st_mtime, "places": len(latitudes), "keys": len(key_entries),
+                "build_seconds": round(time.perf_counter() - started, 3)}
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        if os.path.isdir(index_dir):
+            shutil.rmtree(index_dir)
+        os.replace(staging, index_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def _bounded_distance(a: bytes, b: bytes, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it must exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class GazetteerIndex:
+    """
+    Read-only view of a built index.
+
+    Arrays are opened with ``np.load(mmap_mode="r")`` and the string blobs
+    with mmap, so loading touches no data up front and worker processes on
+    the host share the pages through the OS cache.
+    """
+
+    def __init__(self, index_dir: str):
+        started = time.perf_counter()
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"{index_dir}: index version {self.meta.get('version')}, expected {INDEX_VERSION}")
+        # memoryviews over the mapped arrays: indexing one yields a plain int/float
+        # in ~50ns, where a numpy scalar read would dominate the binary search
+        load = lambda name: memoryview(np.load(os.path.join(index_dir, name), mmap_mode="r").reshape(-1))
+        self.key_offsets = load("key_offsets.npy")
+        self.key_entries = load("key_entries.npy")
+        self.coordinates = load("coordinates.npy")
+        self.populations = load("populations.npy")
+        self.address_offsets = load("address_offsets.npy")
+        self.keys = self._map(os.path.join(index_dir, "keys.bin"))
+        self.addresses = self._map(os.path.join(index_dir, "addresses.bin"))
+        self.size = len(self.key_entries)
+        self.load_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, "rb") as f:
+            # mmap rejects empty files
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def key(self, position: int) -> bytes:
+        return self.keys[self.key_offsets[position]:self.key_offsets[position + 1]]
+
+    def lower_bound(self, key: bytes, lo: int = 0) -> int:
+        """First key position not less than ``key``"""
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix: bytes) -> Tuple[int, int]:
+        """Positions [start, end) of every key starting with ``prefix``"""
+        start = self.lower_bound(prefix)
+        return start, self.lower_bound(prefix + b"\xff", start)
+
+    def place(self, position: int) -> Tuple[float, float, str, int]:
+        entry = self.key_entries[position]
+        start, end = self.address_offsets[entry], self.address_offsets[entry + 1]
+        return (self.coordinates[2 * entry], self.coordinates[2 * entry + 1],
+                self.addresses[start:end].decode("utf-8"), self.populations[entry])
+
+
+class GazetteerGeocoder:
+    """
+    Local geocoder with the same ``geocode`` call as a geopy geocoder.
+
+    A query is matched exactly, then as a prefix of a place name
+    ("springf" -> Springfield), then within ``max_distance`` edits of a
+    name sharing its first characters; ties go to the most populous place.
+    Misses are passed to ``fallback`` (e.g. the cached Nominatim client).
+    """
+
+    def __init__(self,
+                 index: GazetteerIndex,
+                 fallback=None,
+                 max_distance: Optional[int] = None,
+                 prefix_min_length: Optional[int] = None,
+                 scan_limit: Optional[int] = None):
+        self.index = index
+        self.fallback = fallback
+        self.max_distance = max_distance if max_distance is not None else settings.GAZETTEER_FUZZY_MAX_DISTANCE
+        self.prefix_min_length = prefix_min_length or settings.GAZETTEER_PREFIX_MIN_LENGTH
+        self.scan_limit = scan_limit or settings.GAZETTEER_SCAN_LIMIT
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "prefix_hits": 0, "fuzzy_hits": 0, "misses": 0, "fallback_calls": 0}
+        self._lookup_seconds = 0.0
+
+    def geocode(self, query: str) -> Optional[Location]:
+        """Geocode from the index, asking the fallback geocoder on a miss"""
+        started = time.perf_counter()
+        kind, match = self.lookup(query)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._counters[f"{kind}_hits" if match else "misses"] += 1
+            self._lookup_seconds += elapsed
+        if match is not None:
+            latitude, longitude, address, _ = match
+            return Location(address, (latitude, longitude), {})
+        if self.fallback is None:
+            return None
+        with self._lock:
+            self._counters["fallback_calls"] += 1
+        return self.fallback.geocode(query)
+
+    def lookup(self, query: str) -> Tuple[str, Optional[Tuple[float, float, str, int]]]:
+        """("exact" | "prefix" | "fuzzy", place) for the best match, or ("miss", None)"""
+        key = fold(query).encode("utf-8")
+        if not key or not self.index.size:
+            return "miss", None
+
+        start = self.index.lower_bound(key)
+        exact = self._run(start, lambda k: k == key)
+        if exact:
+            return "exact", self._most_populous(exact)
+        if len(key) >= self.prefix_min_length:
+            prefixed = self._run(start, lambda k: k.startswith(key))
+            if prefixed:
+                return "prefix", self._most_populous(prefixed)
+
+        if self.max_distance and len(key) > self.max_distance:
+            match = self._fuzzy(key)
+            if match is not None:
+                return "fuzzy", match
+        return "miss", None
+
+    def _run(self, start: int, matches) -> range:
+        """Positions of consecutive matching keys from ``start`` (at most scan_limit)"""
+        end, limit = start, min(self.index.size, start + self.scan_limit)
+        while end < limit and matches(self.index.key(end)):
+            end += 1
+        return range(start, end)
+
+    def _most_populous(self, positions) -> Tuple[float, float, str, int]:
+        return max((self.index.place(p) for p in positions), key=lambda place: place[3])
+
+    def _fuzzy(self, key: bytes) -> Optional[Tuple[float, float, str, int]]:
+        # Typos rarely hit the first characters, which keeps the scan to one key range
+        start, end = self.index.prefix_range(key[:3])
+        best, best_distance = None, self.max_distance + 1
+        for position in range(start, min(end, start + self.scan_limit)):
+            distance = _bounded_distance(key, self.index.key(position), self.max_distance)
+            if distance > self.max_distance:
+                continue
+            place = self.index.place(position)
+            if best is None or (distance, -place[3]) < (best_distance, -best[3]):
+                best, best_distance = place, distance
+        return best
+
+    def stats(self) -> Dict[str, Any]:
+        """Match counters, mean lookup time and index size / load time"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            lookups = sum(stats[k] for k in ("exact_hits", "prefix_hits", "fuzzy_hits", "misses"))
+            stats["mean_lookup_us"] = round(self._lookup_seconds / lookups * 1e6, 2) if lookups else 0.0
+        stats["hit_ratio"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        stats.update(places=self.index.meta["places"], keys=self.index.size,
+                     load_seconds=round(self.index.load_seconds, 6), build_seconds=self.index.meta["build_seconds"])
+        return stats
+
+
+def load_index(source: str, index_dir: Optional[str] = None) -> GazetteerIndex:
+    """
+    Open the prebuilt index for ``source``, (re)building it first when it is
+    missing or older than the source file. ``source`` may also be an index
+    directory built with the CLI. Workers starting together build once: the
+    first takes the build lock, the rest wait for it and load its result.
+    """
+    if os.path.isdir(source):
+        return GazetteerIndex(source)
+    index_dir = index_dir or settings.GAZETTEER_INDEX_PATH
+    if not _is_current(source, index_dir):
+        with _build_lock(index_dir):
+            # Another worker may have finished the build while this one waited
+            if not _is_current(source, index_dir):
+                meta = _build_index(source, index_dir)
+                logger.info("Built gazetteer index %s: %d places, %d keys in %.1fs",
+                            index_dir, meta["places"], meta["keys"], meta["build_seconds"])
+    index = GazetteerIndex(index_dir)
+    logger.info("Loaded gazetteer index %s in %.2f ms", index_dir, index.load_seconds * 1000)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build an index directory from a GeoNames dump or CSV")
+    build.add_argument("source")
+    build.add_argument("index_dir")
+    lookup = commands.add_parser("lookup", help="look up queries in a built index")
+    lookup.add_argument("index_dir")
+    lookup.add_argument("queries", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_index(args.source, args.index_dir), indent=2))
+        return
+    geocoder = GazetteerGeocoder(GazetteerIndex(args.index_dir))
+    print(f"index loaded in {geocoder.index.load_seconds * 1000:.2f} ms")
+    for query in args.queries:
+        started = time.perf_counter()
+        kind, match = geocoder.lookup(query)
+        print(f"{query!r}: {kind} {match} ({(time.perf_counter() - started) * 1e6:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
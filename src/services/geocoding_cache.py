@@ -0,0 +1,168 @@
+"""
+Two-tier geocoding cache (in-process LRU + shared SQLite) for route optimization
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from geopy.location import Location
+
+from ..config import settings
+from .sqlite_store import SQLiteConnections
+
+# Cached payload: (latitude, longitude, address), or None for "no result"
+CacheEntry = Optional[Tuple[float, float, str]]
+
+_NON_WORD = re.compile(r"[^\w#/-]+")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of an address used as cache key, so that
+    "123 Main St., Springfield" and "123  main st springfield" share an entry
+    """
+    return " ".join(_NON_WORD.sub(" ", address.casefold()).split())
+
+
+class CachedGeocoder:
+    """
+    Caching wrapper exposing the same ``geocode`` call as a geopy geocoder.
+
+    Lookups go memory -> SQLite -> upstream geocoder. The SQLite file is opened
+    in WAL mode so every uvicorn worker on the host shares one cache. Misses
+    (no result from upstream) are cached too, with their own shorter TTL.
+    """
+
+    def __init__(self,
+                 geocoder,
+                 db_path: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None,
+                 negative_ttl_seconds: Optional[int] = None,
+                 max_memory_entries: Optional[int] = None):
+        self.geocoder = geocoder
+        self.db_path = db_path or settings.GEOCODE_CACHE_PATH
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.GEOCODE_CACHE_TTL_SECONDS
+        self.negative_ttl_seconds = (negative_ttl_seconds if negative_ttl_seconds is not None
+                                     else settings.GEOCODE_NEGATIVE_TTL_SECONDS)
+        self.max_memory_entries = max_memory_entries or settings.GEOCODE_CACHE_MAX_ENTRIES
+
+        self._memory: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = SQLiteConnections(self.db_path)
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "upstream_errors": 0,
+        }
+
+        with self._connections.get() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                " key TEXT PRIMARY KEY,"
+                " latitude REAL,"
+                " longitude REAL,"
+                " address TEXT,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def geocode(self, query: str) -> Optional[Location]:
+        """Geocode an address, returning None when it cannot be resolved"""
+        key = normalize_address(query)
+        now = time.time()
+
+        entry = self._memory_get(key, now)
+        if entry is not None:
+            self._count("memory_hits")
+            return self._to_location(entry[1], "negative_hits")
+
+        entry = self._disk_get(key, now)
+        if entry is not None:
+            self._count("disk_hits")
+            self._memory_put(key, entry)
+            return self._to_location(entry[1], "negative_hits")
+
+        self._count("misses")
+        try:
+            location = self.geocoder.geocode(query)
+        except Exception:
+            self._count("upstream_errors")
+            raise
+
+        if location:
+            payload: CacheEntry = (location.latitude, location.longitude, location.address)
+            entry = (now + self.ttl_seconds, payload)
+        else:
+            entry = (now + self.negative_ttl_seconds, None)
+        self._memory_put(key, entry)
+        self._disk_put(key, entry)
+        return self._to_location(entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters plus current memory tier size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop both tiers (counters are kept)"""
+        with self._lock:
+            self._memory.clear()
+        with self._connections.get() as conn:
+            conn.execute("DELETE FROM geocode_cache")
+
+    def _to_location(self, payload: CacheEntry, negative_counter: Optional[str] = None) -> Optional[Location]:
+        if payload is None:
+            if negative_counter:
+                self._count(negative_counter)
+            return None
+        latitude, longitude, address = payload
+        return Location(address, (latitude, longitude), {})
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _memory_get(self, key: str, now: float):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float):
+        row = self._connections.get().execute(
+            "SELECT latitude, longitude, address, expires_at FROM geocode_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None or row[3] <= now:
+            return None
+        payload = None if row[0] is None else (row[0], row[1], row[2])
+        return (row[3], payload)
+
+    def _disk_put(self, key: str, entry):
+        expires_at, payload = entry
+        latitude, longitude, address = payload if payload else (None, None, None)
+        with self._connections.get() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, latitude, longitude, address, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, latitude, longitude, address, expires_at)
+            )
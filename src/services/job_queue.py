@@ -0,0 +1,228 @@
+"""
+SQLite-backed background job queue with priorities, retries and an in-process worker pool
+"""
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from .sqlite_store import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+# Lower value is claimed first
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+FailureHook = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Durable job queue that needs no outside services.
+
+    Jobs live in a SQLite file, so every worker process on the host shares
+    one queue and queued work survives restarts. Each claim takes a lease;
+    a job whose worker died is claimed again once the lease expires, unless
+    that was its last attempt, in which case it is marked failed. Failed
+    jobs are retried with jittered exponential backoff up to max_attempts.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 workers: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 lease_seconds: Optional[float] = None):
+        self.db_path = db_path or settings.JOB_QUEUE_PATH
+        self.workers = workers or settings.JOB_QUEUE_WORKERS
+        self.poll_interval = poll_interval or settings.JOB_QUEUE_POLL_SECONDS
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+
+        self._handlers: Dict[str, Handler] = {}
+        self._failure_hooks: Dict[str, FailureHook] = {}
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._connections = SQLiteConnections(self.db_path, timeout=10.0, autocommit=True,
+                                              synchronous=None, row_factory=sqlite3.Row)
+
+        with self._connections.get() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " priority INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"  # queued, running, succeeded, failed
+                " payload TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " max_attempts INTEGER NOT NULL,"
+                " available_at REAL NOT NULL,"
+                " lease_expires_at REAL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, available_at)")
+
+    def register(self, kind: str, handler: Handler, on_failure: Optional[FailureHook] = None):
+        """Route jobs of ``kind`` to ``handler``; ``on_failure`` runs once retries are exhausted"""
+        self._handlers[kind] = handler
+        if on_failure is not None:
+            self._failure_hooks[kind] = on_failure
+
+    async def enqueue(self,
+                      kind: str,
+                      payload: Dict[str, Any],
+                      priority: str = "normal",
+                      max_attempts: Optional[int] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        row = (job_id, kind, PRIORITIES[priority], "queued", json.dumps(payload, default=str),
+               max_attempts or settings.JOB_MAX_ATTEMPTS, now, now, now)
+        await asyncio.to_thread(self._insert, row)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._fetch, job_id)
+
+    async def start(self):
+        """Launch the worker tasks (called from the app lifespan)"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, number: int):
+        while True:
+            for job in await asyncio.to_thread(self._fail_abandoned):
+                logger.error("Job %s (%s) %s", job["id"], job["kind"], job["error"])
+                await self._run_failure_hook(job, job["error"])
+
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            payload = json.loads(job["payload"])
+            try:
+                result = await self._handlers[job["kind"]](payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Job %s (%s) failed on attempt %d", job["id"], job["kind"], job["attempts"])
+                final = await asyncio.to_thread(self._record_failure, job, repr(e))
+                if final:
+                    await self._run_failure_hook(job, repr(e))
+            else:
+                await asyncio.to_thread(self._record_success, job["id"], result)
+
+    async def _run_failure_hook(self, job: Dict[str, Any], error: str):
+        hook = self._failure_hooks.get(job["kind"])
+        if hook is None:
+            return
+        try:
+            await hook(json.loads(job["payload"]), error)
+        except Exception:
+            logger.exception("Failure hook for job %s (%s) raised", job["id"], job["kind"])
+
+    def _insert(self, row):
+        self._connections.get().execute(
+            "INSERT INTO jobs (id, kind, priority, status, payload, max_attempts, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            row
+        )
+
+    def _fetch(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connections.get().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["priority"] = next(name for name, value in PRIORITIES.items() if value == job["priority"])
+        return job
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the most urgent runnable job (or one with an expired lease)"""
+        conn = self._connections.get()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs"
+                " WHERE (status = 'queued' AND available_at <= ?)"
+                " OR (status = 'running' AND lease_expires_at <= ? AND attempts < max_attempts)"
+                " ORDER BY priority, available_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _fail_abandoned(self) -> List[Dict[str, Any]]:
+        """Mark failed the running jobs whose lease expired on their last attempt"""
+        now = time.time()
+        rows = self._connections.get().execute(
+            "UPDATE jobs SET status = 'failed',"
+            " error = 'lease expired after ' || attempts || ' attempt(s); the worker running it stopped',"
+            " lease_expires_at = NULL, updated_at = ?"
+            " WHERE status = 'running' AND lease_expires_at <= ? AND attempts >= max_attempts"
+            " RETURNING *",
+            (now, now)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _record_success(self, job_id: str, result: Any):
+        self._connections.get().execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL,"
+            " lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+            (json.dumps(result, default=str), time.time(), job_id)
+        )
+
+    def _record_failure(self, job: Dict[str, Any], error: str) -> bool:
+        """Requeue with backoff, or mark failed; returns True when no attempts remain"""
+        now = time.time()
+        final = job["attempts"] >= job["max_attempts"]
+        delay = settings.JOB_RETRY_BASE_DELAY_SECONDS * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.5)
+        self._connections.get().execute(
+            "UPDATE jobs SET status = ?, error = ?, available_at = ?,"
+            " lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+            ("failed" if final else "queued", error, now + delay, now, job["id"])
+        )
+        return final
+
+
+job_queue = JobQueue()
@@ -0,0 +1,149 @@
+"""
+Content-addressed cache of LLM responses (in-process LRU + SQLite)
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from .sqlite_store import SQLiteConnections
+
+
+def cache_key(prompt: str, model: str, options: Dict[str, Any]) -> str:
+    """
+    Hash of the whitespace-normalized prompt, model name and sampling options.
+
+    Prompts are built from indented templates, so layout-only differences
+    must not produce distinct entries.
+    """
+    normalized = " ".join(prompt.split())
+    material = json.dumps([normalized, model, options], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with byte-size limits on each tier.
+
+    The memory tier evicts least recently used entries; the SQLite tier
+    (shared by all workers on the host) evicts by last access time. Every
+    entry carries its own TTL, chosen by the caller per notification type.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 max_disk_bytes: Optional[int] = None):
+        self.db_path = db_path or settings.LLM_CACHE_PATH
+        self.max_memory_bytes = max_memory_bytes or settings.LLM_CACHE_MAX_MEMORY_BYTES
+        self.max_disk_bytes = max_disk_bytes or settings.LLM_CACHE_MAX_DISK_BYTES
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._connections = SQLiteConnections(self.db_path)
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+        with self._connections.get() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+                self._memory_bytes -= len(entry[1].encode("utf-8"))
+
+        entry = await asyncio.to_thread(self._disk_get, key, now)
+        if entry is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self._memory_put(key, entry)
+        return entry[1]
+
+    async def put(self, key: str, response: str, ttl_seconds: int):
+        entry = (time.time() + ttl_seconds, response)
+        self._memory_put(key, entry)
+        await asyncio.to_thread(self._disk_put, key, entry)
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _memory_put(self, key: str, entry: Tuple[float, str]):
+        size = len(entry[1].encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous[1].encode("utf-8"))
+            self._memory[key] = entry
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted[1].encode("utf-8"))
+                self._counters["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        with self._connections.get() as conn:
+            row = conn.execute(
+                "SELECT expires_at, response FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row
+
+    def _disk_put(self, key: str, entry: Tuple[float, str]):
+        expires_at, response = entry
+        now = time.time()
+        with self._connections.get() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), expires_at, now)
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_disk_bytes:
+                # Drop least recently used rows until the tier fits again
+                excess = total - self.max_disk_bytes
+                freed = 0
+                victims = []
+                for victim, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access"):
+                    if freed >= excess:
+                        break
+                    victims.append((victim,))
+                    freed += size
+                conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+                with self._lock:
+                    self._counters["evictions"] += len(victims)
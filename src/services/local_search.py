@@ -0,0 +1,170 @@
+"""
+2-opt / Or-opt improvement of open tours against a precomputed distance matrix
+"""
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .distance_matrix import DistanceMatrix
+
+# Ignore improvements below float32 rounding noise (meters)
+_EPSILON = 0.5
+_MAX_SEGMENT = 3
+
+
+def neighbor_lists(matrix: DistanceMatrix, k: int) -> List[List[int]]:
+    """The k nearest other stops of every stop, closest first"""
+    n = len(matrix)
+    k = min(k, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+    meters = matrix.meters.copy()
+    np.fill_diagonal(meters, np.inf)
+    nearest = np.argpartition(meters, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(meters, nearest, axis=1).argsort(axis=1)
+    return np.take_along_axis(nearest, order, axis=1).tolist()
+
+
+class LocalSearch:
+    """
+    First-improvement 2-opt and Or-opt on an open tour whose first stop is fixed.
+
+    Every candidate move is scored in O(1) from the edges it removes and adds;
+    candidates are limited to each stop's nearest neighbors.
+    """
+
+    def __init__(self, matrix: DistanceMatrix, neighbors: int = 10):
+        self.matrix = matrix
+        self.d = matrix.meters
+        self.neighbors = neighbor_lists(matrix, neighbors)
+
+    def improve(self, tour: Sequence[int], max_iterations: int, time_limit_seconds: float) -> Dict:
+        """
+        Returns {"tour", "moves", "saved"}; stops at a local optimum, after
+        max_iterations applied moves or once time_limit_seconds has elapsed.
+        """
+        self.tour = list(tour)
+        self.pos = [0] * len(self.tour)
+        for position, stop in enumerate(self.tour):
+            self.pos[stop] = position
+
+        deadline = time.perf_counter() + time_limit_seconds
+        start_length = self.matrix.tour_length(self.tour)
+        moves = 0
+        improved = True
+        while improved and moves < max_iterations and time.perf_counter() < deadline:
+            improved = False
+            for i in range(len(self.tour) - 1):
+                if self._try_two_opt(i) or self._try_or_opt(i + 1):
+                    improved = True
+                    moves += 1
+                    if moves >= max_iterations or time.perf_counter() >= deadline:
+                        break
+
+        return {
+            "tour": self.tour,
+            "moves": moves,
+            "saved": start_length - self.matrix.tour_length(self.tour),
+        }
+
+    def _edge(self, p: int) -> float:
+        """Length of the edge leaving position p (0 past the end of the tour)"""
+        if p + 1 >= len(self.tour):
+            return 0.0
+        return float(self.d[self.tour[p], self.tour[p + 1]])
+
+    def _two_opt_delta(self, p: int, q: int) -> float:
+        # Reversing tour[p+1..q] swaps edges (p,p+1),(q,q+1) for (p,q),(p+1,q+1)
+        t = self.tour
+        added = float(self.d[t[p], t[q]])
+        if q + 1 < len(t):
+            added += float(self.d[t[p + 1], t[q + 1]])
+        return added - self._edge(p) - self._edge(q)
+
+    def _try_two_opt(self, i: int) -> bool:
+        t, d = self.tour, self.d
+        a = t[i]
+        current = d[a, t[i + 1]]
+        for c in self.neighbors[a]:
+            if d[a, c] >= current:
+                break  # neighbors are sorted; no closer replacement edge left
+            j = self.pos[c]
+            if j > i + 1:
+                p, q = i, j
+            elif j < i - 1:
+                p, q = j, i
+            else:
+                continue
+            if self._two_opt_delta(p, q) < -_EPSILON:
+                self._reverse(p + 1, q)
+                return True
+        return False
+
+    def _reverse(self, start: int, end: int):
+        t = self.tour
+        t[start:end + 1] = t[start:end + 1][::-1]
+        for position in range(start, end + 1):
+            self.pos[t[position]] = position
+
+    def _try_or_opt(self, s: int) -> bool:
+        """Move a segment of 1-3 stops starting at position s next to one of its neighbors"""
+        t, d = self.tour, self.d
+        n = len(t)
+        for length in range(1, _MAX_SEGMENT + 1):
+            e = s + length - 1
+            if e >= n:
+                break
+            first, last = t[s], t[e]
+            prev = t[s - 1]
+            if e + 1 < n:
+                nxt = t[e + 1]
+                removal_gain = float(d[prev, first] + d[last, nxt] - d[prev, nxt])
+            else:
+                removal_gain = float(d[prev, first])
+
+            for c in self.neighbors[first]:
+                k = self.pos[c]
+                if s - 1 <= k <= e:
+                    continue
+                # Insert after c keeping orientation: c -> first .. last -> t[k+1]
+                # or before c reversed:             t[k-1] -> last .. first -> c
+                for u_pos, v_pos, reverse in ((k, k + 1, False), (k - 1, k, True)):
+                    if u_pos < 0 or s - 1 <= u_pos <= e:
+                        continue
+                    u = t[u_pos]
+                    head, tail = (last, first) if reverse else (first, last)
+                    if v_pos < n and not s <= v_pos <= e:
+                        v = t[v_pos]
+                        added = float(d[u, head] + d[tail, v] - d[u, v])
+                    elif v_pos >= n:
+                        added = float(d[u, head])
+                    else:
+                        continue
+                    if added - removal_gain < -_EPSILON:
+                        self._move_segment(s, e, u_pos, reverse)
+                        return True
+        return False
+
+    def _move_segment(self, s: int, e: int, after: int, reverse: bool):
+        t = self.tour
+        segment = t[s:e + 1]
+        if reverse:
+            segment.reverse()
+        del t[s:e + 1]
+        if after > e:
+            after -= e - s + 1
+        t[after + 1:after + 1] = segment
+        for position in range(min(s, after + 1), max(e, after + len(segment)) + 1):
+            self.pos[t[position]] = position
+
+
+def improve_tour(matrix: DistanceMatrix,
+                 tour: Sequence[int],
+                 max_iterations: int,
+                 time_limit_seconds: float,
+                 neighbors: int = 10) -> Dict:
+    """Convenience wrapper around LocalSearch"""
+    if len(tour) < 4:
+        return {"tour": list(tour), "moves": 0, "saved": 0.0}
+    return LocalSearch(matrix, neighbors).improve(tour, max_iterations, time_limit_seconds)
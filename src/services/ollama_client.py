@@ -1,36 +1,218 @@
 """
 Ollama integration for document generation
 """
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Optional
+
 import httpx
-from typing import Dict, Any
+
+from ..config import settings
+from .tracing import record, span
+
+DEFAULT_MODEL = "llama2:latest"
+DEFAULT_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 40
+}
+
+# Worth retrying: the server is busy or briefly unavailable
+_RETRY_STATUS = {429, 502, 503, 504}
+
+
+class OllamaError(Exception):
+    """Ollama returned an error or could not be reached"""
+
+
+class OllamaOverloadedError(OllamaError):
+    """Too many generations are already waiting for a slot"""
+
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
-        
-    async def generate_text(self, prompt: str, model: str = "llama2:latest") -> str:
+    """
+    Long-lived pooled client for the Ollama HTTP API.
+
+    One httpx.AsyncClient keeps connections alive across calls. At most
+    max_in_flight generations run against the server at once; up to max_queue
+    more wait for a slot and anything beyond that is rejected with
+    OllamaOverloadedError. Transport errors and busy responses are retried
+    with jittered exponential backoff.
+    """
+
+    def __init__(self,
+                 base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 max_queue: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None,
+                 max_retries: Optional[int] = None):
+        self.base_url = base_url or settings.OLLAMA_BASE_URL
+        self.max_connections = max_connections or settings.OLLAMA_MAX_CONNECTIONS
+        self.max_in_flight = max_in_flight or settings.OLLAMA_MAX_IN_FLIGHT
+        self.max_queue = max_queue if max_queue is not None else settings.OLLAMA_MAX_QUEUE
+        self.timeout_seconds = timeout_seconds or settings.OLLAMA_TIMEOUT_SECONDS
+        self.max_retries = max_retries if max_retries is not None else settings.OLLAMA_MAX_RETRIES
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        # Recent streamed generations, for time-to-first-token / tokens per second
+        self.stream_history = deque(maxlen=settings.OLLAMA_STREAM_HISTORY)
+
+    async def start(self):
+        """Open the connection pool (called from the app lifespan)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=httpx.Timeout(self.timeout_seconds, connect=settings.OLLAMA_CONNECT_TIMEOUT_SECONDS)
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Wait (boundedly) for one of the max_in_flight generation slots"""
+        await self.start()
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise OllamaOverloadedError(f"{self.waiting} Ollama generations already waiting")
+        self.waiting += 1
+        try:
+            with span("ollama.slot_wait"):
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield self._client
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _backoff(self, attempt: int):
+        delay = min(settings.OLLAMA_RETRY_MAX_DELAY_SECONDS,
+                    settings.OLLAMA_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._slot() as client:
+            with span("ollama.generate"):
+                for attempt in range(self.max_retries + 1):
+                    last_attempt = attempt == self.max_retries
+                    try:
+                        response = await client.post(path, json=payload)
+                    except httpx.TransportError as e:
+                        if last_attempt:
+                            raise OllamaError(f"Ollama unreachable: {e!r}") from e
+                        await self._backoff(attempt)
+                        continue
+                    if response.status_code == 200:
+                        return response.json()
+                    if response.status_code not in _RETRY_STATUS or last_attempt:
+                        raise OllamaError(f"Ollama API error: {response.text}")
+                    await self._backoff(attempt)
+
+    async def generate_text(self,
+                            prompt: str,
+                            model: str = DEFAULT_MODEL,
+                            options: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate text using Ollama with Llama2 model
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "top_k": 40
-                    }
-                }
-            )
-            if response.status_code == 200:
-                return response.json()["response"]
-            else:
-                raise Exception(f"Ollama API error: {response.text}")
-    
+        data = await self._post("/api/generate", {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": options or DEFAULT_OPTIONS
+        })
+        return data["response"]
+
+    async def stream_text(self,
+                          prompt: str,
+                          model: str = DEFAULT_MODEL,
+                          options: Optional[Dict[str, Any]] = None,
+                          metrics: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Yield response tokens as Ollama streams them (NDJSON).
+
+        Connection failures are retried until the first token arrives. If
+        ``metrics`` is given it is filled with time_to_first_token,
+        duration, tokens and tokens_per_second once the stream finishes.
+        """
+        metrics = metrics if metrics is not None else {}
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or DEFAULT_OPTIONS
+        }
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        final = {}
+
+        async with self._slot() as client:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    async with client.stream("POST", "/api/generate", json=payload) as response:
+                        if response.status_code != 200:
+                            body = (await response.aread()).decode("utf-8", "replace")
+                            if response.status_code not in _RETRY_STATUS or last_attempt:
+                                raise OllamaError(f"Ollama API error: {body}")
+                            await self._backoff(attempt)
+                            continue
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if chunk.get("error"):
+                                raise OllamaError(f"Ollama API error: {chunk['error']}")
+                            token = chunk.get("response", "")
+                            if token:
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                tokens += 1
+                                yield token
+                            if chunk.get("done"):
+                                final = chunk
+                    break
+                except httpx.TransportError as e:
+                    # Once tokens have been relayed the stream cannot be replayed
+                    if first_token_at is not None or last_attempt:
+                        raise OllamaError(f"Ollama unreachable: {e!r}") from e
+                    await self._backoff(attempt)
+
+        duration = time.perf_counter() - started
+        if first_token_at is not None:
+            record("ollama.stream.first_token", first_token_at - started)
+        record("ollama.stream", duration)
+        # Ollama reports generated tokens and generation time in its final chunk
+        eval_count = final.get("eval_count", tokens)
+        eval_seconds = final.get("eval_duration", 0) / 1e9 or duration
+        metrics.update(
+            time_to_first_token=(first_token_at - started) if first_token_at is not None else None,
+            duration=duration,
+            tokens=eval_count,
+            tokens_per_second=eval_count / eval_seconds if eval_seconds else 0.0
+        )
+        self.stream_history.append(dict(metrics))
+
     async def generate_document(self, template: str, variables: Dict[str, Any]) -> str:
         """
         Generate a document using a template and variables
@@ -43,4 +225,25 @@ Template to follow:
 Variables to use:
 {variables}
 
-Generate a clear, concise, and professional document incorporating all the provided information. [/INST]"""
\ No newline at end of file
+Generate a clear, concise, and professional document incorporating all the provided information. [/INST]"""
+        return await self.generate_text(prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        ttfts = sorted(m["time_to_first_token"] for m in self.stream_history
+                       if m["time_to_first_token"] is not None)
+        rates = [m["tokens_per_second"] for m in self.stream_history]
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "streams": {
+                "recent": len(self.stream_history),
+                "time_to_first_token_p50": ttfts[len(ttfts) // 2] if ttfts else None,
+                "time_to_first_token_p99": ttfts[int(len(ttfts) * 0.99)] if ttfts else None,
+                "mean_tokens_per_second": sum(rates) / len(rates) if rates else None,
+            },
+        }
+
+
+ollama = OllamaClient()
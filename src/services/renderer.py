@@ -0,0 +1,365 @@
+"""
+PDF / DOCX rendering, run inside the warm "render" process pool
+"""
+import io
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from docx import Document
+from jinja2 import Environment
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfdoc import PDFName, PDFStream, PDFZCompress
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+from ..config import settings
+from .text_templates import create_environment
+from .tracing import span
+
+# Loaded once per worker by init_worker(), reused by every render
+_styles = None
+_docx_base: Optional[bytes] = None
+_templates: Optional[Environment] = None
+
+
+def init_worker():
+    """Preload the PDF stylesheet, DOCX base template and document text templates (pool initializer)"""
+    global _styles, _docx_base, _templates
+    _styles = getSampleStyleSheet()
+    _templates = create_environment(precompile="documents")
+    if settings.RENDER_DOCX_TEMPLATE:
+        with open(settings.RENDER_DOCX_TEMPLATE, "rb") as f:
+            _docx_base = f.read()
+    else:
+        buffer = io.BytesIO()
+        Document().save(buffer)
+        _docx_base = buffer.getvalue()
+
+
+def _stylesheet():
+    if _styles is None:
+        init_worker()
+    return _styles
+
+
+def _text_templates() -> Environment:
+    if _templates is None:
+        init_worker()
+    return _templates
+
+
+def _new_docx() -> Document:
+    """Fresh document from the in-memory base template"""
+    if _docx_base is None:
+        init_worker()
+    return Document(io.BytesIO(_docx_base))
+
+
+def _fill_table(doc, headers, rows):
+    """Add a grid table with all rows allocated up front"""
+    table = doc.add_table(rows=len(rows) + 1, cols=len(headers))
+    table.style = 'Table Grid'
+    for row, values in zip(table.rows, [headers] + rows):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    return table
+
+
+def _add_text(doc, text: str):
+    """Add template output: "#" lines are headings (one "#" is the title), blank lines end paragraphs"""
+    paragraph = []
+    for line in text.splitlines() + [""]:
+        if line.startswith("#") or not line.strip():
+            if paragraph:
+                doc.add_paragraph("\n".join(paragraph))
+                paragraph = []
+            if line.startswith("#"):
+                level = len(line) - len(line.lstrip("#"))
+                doc.add_heading(line[level:].strip(), level - 1)
+        else:
+            paragraph.append(line)
+
+
+def render_route_document(route_data: Dict[str, Any], path: str) -> str:
+    doc = _new_docx()
+    _add_text(doc, _text_templates().get_template("documents/route_plan.txt.j2").render(route_data))
+    doc.save(path)
+    return path
+
+
+def render_fmcsa_report(data: Dict[str, Any], path: str) -> str:
+    records = data["operational_records"]
+    if data.get("streaming") or len(records) >= settings.FMCSA_STREAMING_MIN_RECORDS:
+        return render_fmcsa_report_streaming(data, records, path)
+
+    doc = SimpleDocTemplate(path, pagesize=letter)
+    styles = _stylesheet()
+    story = []
+
+    # Add title
+    story.append(Paragraph('FMCSA Compliance Report', styles['Title']))
+    story.append(Spacer(1, 12))
+
+    # Add carrier information
+    story.append(Paragraph('Carrier Information', styles['Heading1']))
+    story.append(Paragraph(f'Carrier: {data["carrier_name"]}', styles['Normal']))
+    story.append(Paragraph(f'USDOT Number: {data["usdot_number"]}', styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    # Add operational data
+    story.append(Paragraph('Operational Data', styles['Heading1']))
+    for record in records:
+        story.append(Paragraph(
+            f'Date: {record["date"]}\n'
+            f'Miles Driven: {record["miles_driven"]}\n'
+            f'Hours of Service: {record["hours_of_service"]}\n'
+            f'Violations: {record["violations"]}\n',
+            styles['Normal']
+        ))
+
+    doc.build(story)
+    return doc.filename
+
+
+# Operational data table: (field, heading, column width in characters)
+FMCSA_COLUMNS = (
+    ("date", "Date", 28),
+    ("miles_driven", "Miles Driven", 22),
+    ("hours_of_service", "Hours of Service", 22),
+    ("violations", "Violations", 12),
+)
+_MARGIN = 54
+_ROW_HEIGHT = 13
+_ROW_FORMAT = "".join(f"{{:<{width}.{width - 1}}}" for _, _, width in FMCSA_COLUMNS)
+
+
+def iter_cursor(cursor, batch_size: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield rows from a DB-API cursor or SQLAlchemy result via fetchmany.
+
+    For in-process callers of render_fmcsa_report_streaming; the API has no
+    table of operational records and passes the request's list instead.
+    """
+    batch_size = batch_size or settings.FMCSA_STREAMING_ROWS_PER_PAGE
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _record_values(record) -> Tuple:
+    """Cell values of a record given as a mapping or a (date, miles, hours, violations) row"""
+    if hasattr(record, "keys"):
+        return tuple(str(record[field]) for field, _, _ in FMCSA_COLUMNS)
+    return tuple(str(value) for value in record)
+
+
+def _compress_finished_page(pdf: canvas.Canvas):
+    """
+    Deflate the page just closed by showPage.
+
+    reportlab keeps every page's operator list in memory until save() and
+    compresses only while writing; compressing each page as it is finished
+    keeps the retained size to a few hundred bytes per page.
+    """
+    page = pdf._doc.Pages.pages[-1]
+    stream = PDFStream(content=PDFZCompress.encode("".join(page.stream)))
+    stream.dictionary["Filter"] = PDFName("FlateDecode")
+    page.Contents = stream
+    page.stream = None
+
+
+def render_fmcsa_report_streaming(data: Dict[str, Any],
+                                  records: Iterable[Any],
+                                  path: str) -> str:
+    """
+    FMCSA report as compact table pages drawn straight onto the canvas.
+
+    Records are consumed one page-sized chunk at a time from any iterable
+    (a list, a generator, or iter_cursor() over a DB cursor), so no flowable
+    is built per record and finished pages are held only in compressed form.
+    Memory stays flat only if ``records`` is lazy too; reports requested
+    through the API arrive as a parsed list.
+    """
+    pdf = canvas.Canvas(path, pagesize=letter, pageCompression=1)
+    pdf.setPageCallBack(lambda number: _compress_finished_page(pdf))
+    width, height = letter
+    rows_per_page = settings.FMCSA_STREAMING_ROWS_PER_PAGE
+    records = iter(records)
+    heading = _ROW_FORMAT.format(*(title for _, title, _ in FMCSA_COLUMNS))
+
+    page = 1
+    chunk = list(islice(records, rows_per_page))
+    while True:
+        top = height - _MARGIN
+        if page == 1:
+            pdf.setFont("Helvetica-Bold", 16)
+            pdf.drawString(_MARGIN, top, "FMCSA Compliance Report")
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(_MARGIN, top - 22, f'Carrier: {data["carrier_name"]}')
+            pdf.drawString(_MARGIN, top - 36, f'USDOT Number: {data["usdot_number"]}')
+            top -= 60
+
+        # Fixed-width columns: one text operator per row, headings on every page
+        text = pdf.beginText(_MARGIN, top)
+        text.setFont("Courier-Bold", 8, leading=_ROW_HEIGHT)
+        text.textLine(heading)
+        text.setFont("Courier", 8, leading=_ROW_HEIGHT)
+        # The first page gives up room for the header block
+        fit = int((top - _MARGIN - 20) // _ROW_HEIGHT) - 1
+        rows, overflow = chunk[:fit], chunk[fit:]
+        for record in rows:
+            text.textLine(_ROW_FORMAT.format(*_record_values(record)))
+        pdf.drawText(text)
+        pdf.line(_MARGIN, top - 4, width - _MARGIN, top - 4)
+
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(width - _MARGIN, _MARGIN / 2, f"Page {page}")
+
+        chunk = overflow + list(islice(records, rows_per_page - len(overflow)))
+        pdf.showPage()
+        if not chunk:
+            break
+        page += 1
+
+    pdf.save()
+    return path
+
+
+def render_safety_report(data: Dict[str, Any], path: str) -> str:
+    doc = _new_docx()
+    doc.add_heading('Safety Inspection Report', 0)
+
+    # Add inspection details
+    doc.add_heading('Inspection Details', level=1)
+    doc.add_paragraph(f'Inspector: {data["inspector_name"]}')
+    doc.add_paragraph(f'Date: {data["inspection_date"]}')
+    doc.add_paragraph(f'Location: {data["location"]}')
+
+    # Add inspection results
+    doc.add_heading('Inspection Results', level=1)
+    for category, checks in data["inspection_items"].items():
+        doc.add_heading(category, level=2)
+        _fill_table(doc, ['Item', 'Status', 'Notes'],
+                    [[check["item"], check["status"], check["notes"]] for check in checks])
+
+    doc.save(path)
+    return path
+
+
+def render_environmental_report(data: Dict[str, Any], path: str) -> str:
+    doc = SimpleDocTemplate(path, pagesize=letter)
+    styles = _stylesheet()
+    story = []
+
+    # Add title
+    story.append(Paragraph('Environmental Impact Assessment', styles['Title']))
+    story.append(Spacer(1, 12))
+
+    # Add summary
+    story.append(Paragraph('Executive Summary', styles['Heading1']))
+    story.append(Paragraph(data["executive_summary"], styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    # Add emissions data
+    story.append(Paragraph('Emissions Data', styles['Heading1']))
+    for emission_type, value in data["emissions_data"].items():
+        story.append(Paragraph(
+            f'{emission_type}: {value} metric tons CO2e',
+            styles['Normal']
+        ))
+
+    # Add recommendations
+    story.append(Paragraph('Recommendations', styles['Heading1']))
+    for rec in data["recommendations"]:
+        story.append(Paragraph(f'- {rec}', styles['Normal']))
+
+    doc.build(story)
+    return doc.filename
+
+
+def render_driver_qualification_report(data: Dict[str, Any], path: str) -> str:
+    doc = _new_docx()
+    doc.add_heading('Driver Qualification File', 0)
+
+    # Add driver information
+    doc.add_heading('Driver Information', level=1)
+    doc.add_paragraph(f'Name: {data["driver_name"]}')
+    doc.add_paragraph(f'License Number: {data["license_number"]}')
+    doc.add_paragraph(f'License Class: {data["license_class"]}')
+
+    # Add qualification checklist
+    doc.add_heading('Qualification Checklist', level=1)
+    _fill_table(doc, ['Requirement', 'Status', 'Date', 'Expiry'],
+                [[item["requirement"], item["status"], item["date"], item["expiry"]]
+                 for item in data["qualification_items"]])
+
+    # Add violation history
+    doc.add_heading('Violation History', level=1)
+    if data["violations"]:
+        for violation in data["violations"]:
+            doc.add_paragraph(
+                f'Date: {violation["date"]}\n'
+                f'Type: {violation["type"]}\n'
+                f'Description: {violation["description"]}\n'
+                f'Resolution: {violation["resolution"]}'
+            )
+    else:
+        doc.add_paragraph('No violations recorded.')
+
+    doc.save(path)
+    return path
+
+
+# Bump when rendered output changes, so stored documents are not reused
+RENDER_VERSION = "1"
+
+# Document kind -> (output format, render function)
+RENDERERS: Dict[str, Tuple[str, Callable[[Dict[str, Any], str], str]]] = {
+    "route_plan": ("docx", render_route_document),
+    "FMCSA": ("pdf", render_fmcsa_report),
+    "safety_inspection": ("docx", render_safety_report),
+    "environmental": ("pdf", render_environmental_report),
+    "driver_qualification": ("docx", render_driver_qualification_report),
+}
+
+
+def render(kind: str, data: Dict[str, Any], path: str) -> Tuple[str, float]:
+    """Render one document to ``path`` in the worker; returns (path, seconds spent rendering)"""
+    started = time.perf_counter()
+    with span(f"render.{RENDERERS[kind][0]}"):
+        RENDERERS[kind][1](data, path)
+    return path, time.perf_counter() - started
+
+
+class RenderStats:
+    """Recent render latencies per output format, kept in the API process"""
+
+    def __init__(self, history: Optional[int] = None):
+        self.history = history or settings.RENDER_LATENCY_HISTORY
+        self._latencies: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+
+    def record(self, fmt: str, seconds: float):
+        self._latencies.setdefault(fmt, deque(maxlen=self.history)).append(seconds)
+        self.counts[fmt] = self.counts.get(fmt, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for fmt, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            result[fmt] = {
+                "rendered": self.counts[fmt],
+                "recent": len(ordered),
+                "p50_seconds": ordered[len(ordered) // 2],
+                "p99_seconds": ordered[int(len(ordered) * 0.99)],
+                "mean_seconds": sum(ordered) / len(ordered),
+            }
+        return result
+
+
+render_stats = RenderStats()
@@ -0,0 +1,50 @@
+"""
+Single-flight deduplication in front of the Ollama client
+"""
+from typing import Any, Dict, Optional
+
+from .llm_cache import cache_key
+from .ollama_client import OllamaClient, ollama, DEFAULT_MODEL, DEFAULT_OPTIONS
+from .single_flight import SingleFlight
+
+
+class RequestCoalescer:
+    """
+    Share one upstream generation between identical in-flight prompts.
+
+    A prompt goes upstream as soon as it arrives; callers asking for the same
+    prompt (after normalization) while it is running await that generation
+    instead of starting their own. Ollama has no batch endpoint, so distinct
+    prompts are sent as concurrent requests through the client's pool and
+    in-flight cap.
+    """
+
+    def __init__(self, client: OllamaClient):
+        self.client = client
+        self._flights = SingleFlight()
+        self.requests = 0
+        self.upstream_calls = 0
+
+    async def generate_text(self,
+                            prompt: str,
+                            model: str = DEFAULT_MODEL,
+                            options: Optional[Dict[str, Any]] = None) -> str:
+        options = options or DEFAULT_OPTIONS
+        key = cache_key(prompt, model, options)
+        self.requests += 1
+        return await self._flights.run(key, lambda: self._generate(prompt, model, options))
+
+    async def _generate(self, prompt: str, model: str, options: Dict[str, Any]) -> str:
+        self.upstream_calls += 1
+        return await self.client.generate_text(prompt, model, options)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "calls_saved": self.requests - self.upstream_calls,
+            "in_flight": len(self._flights),
+        }
+
+
+coalescer = RequestCoalescer(ollama)
@@ -0,0 +1,96 @@
+"""
+Per-stop cumulative distance, drive time and ETA for a fixed tour
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class RouteLegs:
+    """
+    Array-backed legs of a tour, computed once per optimization.
+
+    Index i refers to the i-th stop of the tour; leg i runs from stop i to
+    stop i + 1. Fuel-stop and rest-break planning are binary-search jumps
+    over the cumulative arrays, so planning is O(n) after the tour is fixed.
+    """
+
+    def __init__(self,
+                 leg_distances: Sequence[float],
+                 average_speed_kmh: float,
+                 departure: datetime,
+                 service_seconds: Optional[Sequence[float]] = None,
+                 arrival_seconds: Optional[Sequence[float]] = None):
+        self.leg_distances = np.asarray(leg_distances, dtype=np.float64)
+        n = len(self.leg_distances) + 1
+        self.departure = departure
+
+        self.cumulative_distance = np.zeros(n)
+        np.cumsum(self.leg_distances, out=self.cumulative_distance[1:])
+
+        self.leg_drive_seconds = self.leg_distances / (average_speed_kmh / 3.6)
+        self.cumulative_drive_seconds = np.zeros(n)
+        np.cumsum(self.leg_drive_seconds, out=self.cumulative_drive_seconds[1:])
+
+        self.service_seconds = (np.zeros(n) if service_seconds is None
+                                else np.asarray(service_seconds, dtype=np.float64))
+        if arrival_seconds is not None:
+            # Solver-provided arrivals already include waiting for windows
+            self.arrival_seconds = np.asarray(arrival_seconds, dtype=np.float64)
+        else:
+            # Arrival at stop i = driving so far + service at every earlier stop
+            self.arrival_seconds = self.cumulative_drive_seconds.copy()
+            self.arrival_seconds[1:] += np.cumsum(self.service_seconds[:-1])
+
+    def __len__(self) -> int:
+        return len(self.cumulative_distance)
+
+    @property
+    def total_distance(self) -> float:
+        return float(self.cumulative_distance[-1])
+
+    def fuel_stop_positions(self, usable_range: float) -> List[int]:
+        """
+        Stops at which to refuel so that no stretch between refuels exceeds
+        usable_range meters (where the leg network allows it)
+        """
+        positions = []
+        last = 0
+        n = len(self)
+        while True:
+            # First stop that would be beyond range from the last refuel
+            beyond = int(np.searchsorted(self.cumulative_distance,
+                                         self.cumulative_distance[last] + usable_range,
+                                         side="right"))
+            if beyond >= n:
+                break
+            stop = beyond - 1
+            if stop <= last:
+                # A single leg longer than the usable range; nothing better on route
+                last += 1
+                continue
+            positions.append(stop)
+            last = stop
+        return positions
+
+    def rest_break_positions(self, max_drive_seconds: float) -> List[int]:
+        """First stop reached after each max_drive_seconds of driving since the last break"""
+        positions = []
+        base = 0.0
+        n = len(self)
+        while True:
+            stop = int(np.searchsorted(self.cumulative_drive_seconds, base + max_drive_seconds, side="left"))
+            if stop >= n:
+                break
+            positions.append(stop)
+            base = self.cumulative_drive_seconds[stop]
+        return positions
+
+    def etas(self, rest_positions: Sequence[int] = (), rest_seconds: float = 0) -> List[datetime]:
+        """Arrival time at every stop, delayed by the rest breaks taken at earlier stops"""
+        offsets = self.arrival_seconds.copy()
+        if len(rest_positions):
+            breaks_before = np.searchsorted(np.asarray(rest_positions), np.arange(len(self)), side="left")
+            offsets += breaks_before * rest_seconds
+        return [self.departure + timedelta(seconds=round(float(s))) for s in offsets]
@@ -1,164 +1,447 @@
-from typing import List, Dict, Any
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from datetime import datetime
+import numpy as np
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 from ..config import settings
+from .geocoding_cache import CachedGeocoder
+from .gazetteer import GazetteerGeocoder, load_index
+from .distance_matrix import DistanceMatrix, haversine_meters
+from .clustering import (CAPACITY_FIELD, ClusterTask, cluster_tasks, partition_stops, solve_clusters, stitch,
+                         stop_demands)
+from .executors import balanced_batches, stages
+from .vrp_solver import VRPSolver
+from .local_search import improve_tour
+from .route_legs import RouteLegs
+from . import fuel_stations
+from .tracing import span
+
+SOLVERS = ("greedy", "vrp", "clustered")
+
+FUEL_RANGE = 500000  # 500 km in meters
+MAX_DRIVING_TIME = 8 * 3600  # 8 hours in seconds
+REST_BREAK_MINUTES = 45
 
 class RouteOptimizer:
     def __init__(self):
-        self.geolocator = Nominatim(user_agent="logisync")
-        
-    def optimize_route(self, locations: List[str], cargo_details: Dict, time_constraints: Dict) -> Dict[str, Any]:
-        # Convert locations to coordinates
+        # Every Nominatim lookup goes through the cache
+        self.geolocator = CachedGeocoder(Nominatim(user_agent="logisync"))
+        self.gazetteer: Optional[GazetteerGeocoder] = None
+        if settings.GAZETTEER_PATH:
+            # Local index first; Nominatim (rate-limited) only for its misses
+            self.gazetteer = GazetteerGeocoder(load_index(settings.GAZETTEER_PATH), fallback=self.geolocator)
+            self.geolocator = self.gazetteer
+
+    def geocoder_stats(self) -> Dict[str, Any]:
+        """Gazetteer match counters (when enabled) and geocoding cache counters"""
+        cache = self.gazetteer.fallback if self.gazetteer else self.geolocator
+        return {"gazetteer": self.gazetteer.stats() if self.gazetteer else None, "cache": cache.stats()}
+
+    def geocode_locations(self, locations: List[str]) -> Tuple[List[Tuple[float, float]], List[int]]:
+        """
+        Resolve locations to coordinates (blocking network I/O on cache misses).
+
+        Returns the coordinates of every resolvable location together with its
+        index in ``locations``.
+        """
         coordinates = []
-        location_objects = []
-        for loc in locations:
-            location = self.geolocator.geocode(loc)
-            if location:
-                coordinates.append((location.latitude, location.longitude))
-                location_objects.append(location)
-        
-        # Simple nearest neighbor algorithm
-        current_index = 0
-        route = [current_index]
-        unvisited = list(range(1, len(coordinates)))
-        
-        while unvisited:
-            current_coord = coordinates[current_index]
-            nearest_index = min(
-                unvisited,
-                key=lambda i: geodesic(current_coord, coordinates[i]).meters
+        stop_indices = []
+        with span("route.geocode"):
+            for idx, loc in enumerate(locations):
+                location = self.geolocator.geocode(loc)
+                if location:
+                    coordinates.append((location.latitude, location.longitude))
+                    stop_indices.append(idx)
+        return coordinates, stop_indices
+
+    def optimize_route(self,
+                       locations: List[str],
+                       cargo_details: Dict,
+                       time_constraints: Dict,
+                       solver: str = "greedy",
+                       time_limit_seconds: Optional[float] = None,
+                       improve: bool = True) -> Dict[str, Any]:
+        """Geocode the locations, then plan the route (see plan_route)"""
+        if solver not in SOLVERS:
+            raise ValueError(f"Unsupported solver: {solver}")
+        coordinates, stop_indices = self.geocode_locations(locations)
+        return plan_route(locations, coordinates, stop_indices, cargo_details, time_constraints,
+                          solver=solver, time_limit_seconds=time_limit_seconds, improve=improve)
+
+
+def plan_route(locations: List[str],
+               coordinates: List[Tuple[float, float]],
+               stop_indices: List[int],
+               cargo_details: Dict,
+               time_constraints: Dict,
+               solver: str = "greedy",
+               time_limit_seconds: Optional[float] = None,
+               improve: bool = True) -> Dict[str, Any]:
+    """
+    Order the geocoded stops and plan fuel stops and rest breaks.
+
+    Pure CPU work with picklable inputs, so it can run in a process pool.
+    solver="greedy" runs nearest neighbor, followed by a 2-opt/Or-opt pass
+    unless improve=False. solver="vrp" seeds OR-Tools with the greedy tour,
+    honors time_constraints["time_windows"] and ["service_times"], and
+    returns the best tour found within time_limit_seconds. solver="clustered"
+    solves geographic clusters one by one (see plan_route_clustered for the
+    parallel version).
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unsupported solver: {solver}")
+
+    if not coordinates:
+        return {}
+
+    if solver == "clustered":
+        # In-process variant of plan_route_clustered, one cluster after another
+        clusters, tasks = cluster_route(coordinates, stop_indices, cargo_details)
+        with span("route.cluster_solve"):
+            orders = solve_clusters(tasks, improve)
+        return finish_clustered_route(locations, coordinates, stop_indices, cargo_details, time_constraints,
+                                      clusters, orders)
+
+    # One batched pass for every pairwise distance, shared by all stages below
+    with span("route.distance_matrix"):
+        matrix = DistanceMatrix(coordinates)
+
+    # Simple nearest neighbor algorithm
+    with span("route.construct"):
+        route = matrix.nearest_neighbor_tour(0)
+    arrival_seconds = None
+    solver_info = {"mode": solver}
+
+    departure, time_windows, service_seconds = _parse_time_constraints(
+        time_constraints, locations, stop_indices
+    )
+
+    if solver == "vrp":
+        budget = time_limit_seconds if time_limit_seconds is not None else settings.VRP_TIME_LIMIT_SECONDS
+        with span("route.vrp"):
+            solution = VRPSolver(settings.AVERAGE_SPEED_KMH).solve(
+                matrix, route, time_windows, service_seconds, budget
             )
-            route.append(nearest_index)
-            unvisited.remove(nearest_index)
-            current_index = nearest_index
-            
-        # Format the solution
-        optimized_route = []
-        total_distance = 0
-        prev_coord = None
-        
-        for idx in route:
-            loc = location_objects[idx]
-            coord = coordinates[idx]
-            if prev_coord:
-                total_distance += geodesic(prev_coord, coord).meters
-            
-            optimized_route.append({
-                "location": locations[idx],
-                "arrival_time": None,  # Would need actual time calculation
-                "cargo_handling": cargo_details.get(str(idx), {})
-            })
-            prev_coord = coord
-        
-        # Add suggested fuel stops and compliance checkpoints
-        result = {
-            "optimized_route": optimized_route,
-            "total_distance": total_distance,
-            "fuel_stops": self._calculate_fuel_stops(optimized_route),
-            "compliance_checkpoints": self._add_compliance_checkpoints(optimized_route)
-        }
-        
-        return result
-    
-    def _calculate_fuel_stops(self, route: List[Dict]) -> List[Dict]:
-        # Calculate optimal fuel stops based on vehicle range and route distance
-        # This is a simplified implementation
-        FUEL_RANGE = 500000  # 500 km in meters
-        fuel_stops = []
-        current_distance = 0
-        
-        for i in range(len(route)-1):
-            location1 = self.geolocator.geocode(route[i]["location"])
-            location2 = self.geolocator.geocode(route[i+1]["location"])
-            
-            if location1 and location2:
-                distance = geodesic(
-                    (location1.latitude, location1.longitude),
-                    (location2.latitude, location2.longitude)
-                ).meters
-                current_distance += distance
-                
-                if current_distance > FUEL_RANGE * 0.8:  # Plan stop at 80% of range
-                    fuel_stops.append({
-                        "location": route[i]["location"],
-                        "distance_from_start": current_distance
-                    })
-                    current_distance = 0
-        
-        return fuel_stops
-        
-    def _add_compliance_checkpoints(self, route: List[Dict]) -> List[Dict]:
-        # Add required compliance checkpoints based on regulations
-        # This is a simplified implementation
-        MAX_DRIVING_TIME = 8 * 3600  # 8 hours in seconds
-        checkpoints = []
-        current_time = 0
-        
-        for i in range(len(route)):
-            if i > 0:
-                # Simulate time based on distance
-                location1 = self.geolocator.geocode(route[i-1]["location"])
-                location2 = self.geolocator.geocode(route[i]["location"])
-                if location1 and location2:
-                    distance = geodesic(
-                        (location1.latitude, location1.longitude),
-                        (location2.latitude, location2.longitude)
-                    ).meters
-                    # Assume average speed of 60 km/h
-                    time_taken = (distance / 1000) / 60 * 3600  # Convert to seconds
-                    current_time += time_taken
-            
-            if current_time >= MAX_DRIVING_TIME:
-                checkpoints.append({
-                    "location": route[i]["location"],
-                    "type": "rest_break",
-                    "duration_minutes": 45
-                })
-                current_time = 0
-        
-        return checkpoints
-    
-    def _calculate_fuel_stops(self, route: List[Dict]) -> List[Dict]:
-        # Calculate optimal fuel stops based on vehicle range and route distance
-        # This is a simplified implementation
-        FUEL_RANGE = 500000  # 500 km in meters
-        fuel_stops = []
-        current_distance = 0
-        
-        for i in range(len(route)-1):
-            distance = self._calculate_distance(
-                self.geolocator.geocode(route[i]["location"]).point,
-                self.geolocator.geocode(route[i+1]["location"]).point
+        if solution:
+            route = solution["tour"]
+            arrival_seconds = solution["arrival_seconds"]
+            solver_info.update(status="solved", seeded=solution["seeded"], time_limit_seconds=budget)
+        else:
+            # Keep the greedy tour so the caller still gets a plan
+            solver_info.update(status="infeasible", time_limit_seconds=budget)
+    elif improve:
+        # Local search ignores time windows, so it only refines the greedy tour
+        with span("route.local_search"):
+            improvement = improve_tour(
+                matrix, route,
+                max_iterations=settings.LOCAL_SEARCH_MAX_ITERATIONS,
+                time_limit_seconds=settings.LOCAL_SEARCH_TIME_LIMIT_SECONDS,
+                neighbors=settings.LOCAL_SEARCH_NEIGHBORS
+            )
+        route = improvement["tour"]
+        solver_info.update(improvement_moves=improvement["moves"], distance_saved=improvement["saved"])
+
+    return _schedule(locations, stop_indices, route, matrix.coordinates[route], matrix.tour_legs(route),
+                     cargo_details, departure, service_seconds, solver_info, arrival_seconds)
+
+
+async def plan_route_clustered(locations: List[str],
+                               coordinates: List[Tuple[float, float]],
+                               stop_indices: List[int],
+                               cargo_details: Dict,
+                               time_constraints: Dict,
+                               improve: bool = True) -> Dict[str, Any]:
+    """
+    Cluster-first, route-second plan for very large stop sets.
+
+    Stops are partitioned geographically (CLUSTER_METHOD, at most
+    CLUSTER_MAX_STOPS per cluster and cargo_details["vehicle_capacity"] of
+    stop "weight"), the clusters are solved in parallel on the routing pool
+    in one batch per worker, and the sub-tours are stitched in cluster
+    order. No full distance matrix is built, so cost grows with
+    n * CLUSTER_MAX_STOPS rather than n^2. Time windows only shift ETAs.
+    """
+    if not coordinates:
+        return {}
+    clusters, tasks = await stages.run("routing", cluster_route, coordinates, stop_indices, cargo_details)
+
+    batches = balanced_batches([len(points) ** 2 for points, _ in tasks], stages["routing"].workers)
+    with span("route.cluster_solve"):
+        results = await asyncio.gather(*(
+            stages.run("routing", solve_clusters, [tasks[i] for i in batch], improve) for batch in batches
+        ))
+    orders: List[List[int]] = [[] for _ in tasks]
+    for batch, batch_orders in zip(batches, results):
+        for i, order in zip(batch, batch_orders):
+            orders[i] = order
+
+    return await stages.run("routing", finish_clustered_route, locations, coordinates, stop_indices,
+                            cargo_details, time_constraints, clusters, orders)
+
+
+def cluster_route(coordinates: List[Tuple[float, float]],
+                  stop_indices: List[int],
+                  cargo_details: Dict) -> Tuple[List[np.ndarray], List[ClusterTask]]:
+    """Partition the stops and build one solve task per cluster"""
+    with span("route.cluster"):
+        clusters = partition_stops(coordinates, stop_demands(cargo_details, stop_indices),
+                                   cargo_details.get(CAPACITY_FIELD))
+        return clusters, cluster_tasks(coordinates, clusters)
+
+
+def finish_clustered_route(locations: List[str],
+                           coordinates: List[Tuple[float, float]],
+                           stop_indices: List[int],
+                           cargo_details: Dict,
+                           time_constraints: Dict,
+                           clusters: List[np.ndarray],
+                           orders: List[List[int]]) -> Dict[str, Any]:
+    """Stitch solved clusters into one tour and schedule it from consecutive-stop legs"""
+    tour = stitch(clusters, orders)
+    tour_coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)[tour]
+    leg_distances = haversine_meters(tour_coordinates[:-1, 0], tour_coordinates[:-1, 1],
+                                     tour_coordinates[1:, 0], tour_coordinates[1:, 1])
+    departure, _, service_seconds = _parse_time_constraints(time_constraints, locations, stop_indices)
+    solver_info = {"mode": "clustered", "method": settings.CLUSTER_METHOD, "clusters": len(clusters),
+                   "largest_cluster": max(len(c) for c in clusters)}
+    return _schedule(locations, stop_indices, tour, tour_coordinates, leg_distances,
+                     cargo_details, departure, service_seconds, solver_info)
+
+
+def plan_routes(requests: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[str], float]]:
+    """
+    plan_route for several routes in one worker call.
+
+    Each request holds plan_route's keyword arguments; returns (plan, error,
+    seconds) per route so one bad route does not fail its whole batch.
+    """
+    results = []
+    for request in requests:
+        started = time.perf_counter()
+        try:
+            plan, error = plan_route(**request), None
+        except Exception as e:
+            plan, error = {}, str(e)
+        results.append((plan, error, time.perf_counter() - started))
+    return results
+
+
+def replan_route(state: Dict[str, Any],
+                 cargo_details: Dict,
+                 time_constraints: Dict,
+                 add: Sequence[str] = (),
+                 add_coordinates: Sequence[Optional[Tuple[float, float]]] = (),
+                 remove: Sequence[Union[str, int]] = (),
+                 order: Optional[Sequence[Union[str, int]]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Apply stop changes to a stored plan (see plan_state) without re-geocoding
+    or rebuilding the tour.
+
+    Removed stops (location or request index) are cut out of the tour and
+    matrix; added stops, geocoded by the caller (None if unresolvable), get
+    only their own matrix rows computed and are placed by cheapest insertion,
+    after which a short 2-opt/Or-opt pass repairs the tour. ``order`` fixes
+    the visiting order of the remaining stops instead. Time windows only
+    shift ETAs here; use /routes/optimize with solver=vrp to enforce them.
+    Returns (route plan, new plan state); the plan is empty if no stop is left.
+    """
+    locations = list(state["locations"])
+    stop_indices = list(state["stop_indices"])
+    tour = list(state["tour"])
+    matrix = DistanceMatrix(state["coordinates"])
+
+    with span("route.replan"):
+        removed = {_resolve_stop(ref, locations, stop_indices) for ref in remove}
+        if removed:
+            keep = [p for p, request_idx in enumerate(stop_indices) if request_idx not in removed]
+            renumber = {old: new for new, old in enumerate(keep)}
+            tour = [renumber[p] for p in tour if p in renumber]
+            stop_indices = [stop_indices[p] for p in keep]
+            matrix = matrix.subset(keep)
+
+        added = []
+        for location, coordinates in zip(add, add_coordinates):
+            locations.append(location)
+            if coordinates is not None:
+                added.append(coordinates)
+                stop_indices.append(len(locations) - 1)
+        if added:
+            first = len(matrix)
+            matrix = matrix.extend(added)
+            for position in range(first, len(matrix)):
+                tour.insert(matrix.cheapest_insertion(tour, position), position)
+
+        solver_info = {"mode": "incremental", "added": len(added), "removed": len(removed)}
+        if order is not None:
+            positions = {request_idx: p for p, request_idx in enumerate(stop_indices)}
+            tour = [positions[_resolve_stop(ref, locations, stop_indices)] for ref in order]
+            if sorted(tour) != list(range(len(stop_indices))):
+                raise ValueError("order must list every stop of the route exactly once")
+            solver_info["mode"] = "fixed_order"
+        elif added or removed:
+            repair = improve_tour(
+                matrix, tour,
+                max_iterations=settings.LOCAL_SEARCH_MAX_ITERATIONS,
+                time_limit_seconds=settings.ROUTE_REPAIR_TIME_LIMIT_SECONDS,
+                neighbors=settings.LOCAL_SEARCH_NEIGHBORS
             )
-            current_distance += distance
-            
-            if current_distance > FUEL_RANGE * 0.8:  # Plan stop at 80% of range
-                fuel_stops.append({
-                    "location": route[i]["location"],
-                    "distance_from_start": current_distance
-                })
-                current_distance = 0
-        
-        return fuel_stops
-    
-    def _add_compliance_checkpoints(self, route: List[Dict]) -> List[Dict]:
-        # Add required compliance checkpoints based on regulations
-        # This is a simplified implementation
-        MAX_DRIVING_TIME = 8 * 3600  # 8 hours in seconds
-        checkpoints = []
-        current_time = 0
-        
-        for i in range(len(route)):
-            if i > 0:
-                current_time += route[i]["arrival_time"] - route[i-1]["arrival_time"]
-            
-            if current_time >= MAX_DRIVING_TIME:
-                checkpoints.append({
-                    "location": route[i]["location"],
-                    "type": "rest_break",
-                    "duration_minutes": 45
-                })
-                current_time = 0
-        
-        return checkpoints
\ No newline at end of file
+            tour = repair["tour"]
+            solver_info.update(improvement_moves=repair["moves"], distance_saved=repair["saved"])
+
+    new_state = {"locations": locations, "coordinates": matrix.coordinates.tolist(),
+                 "stop_indices": stop_indices, "tour": tour}
+    if not tour:
+        return {}, new_state
+    departure, _, service_seconds = _parse_time_constraints(time_constraints, locations, stop_indices)
+    return (_schedule(locations, stop_indices, tour, matrix.coordinates[tour], matrix.tour_legs(tour),
+                      cargo_details, departure, service_seconds, solver_info),
+            new_state)
+
+
+def plan_state(locations: List[str],
+               coordinates: List[Tuple[float, float]],
+               stop_indices: List[int],
+               route_plan: Dict[str, Any]) -> Dict[str, Any]:
+    """What replan_route needs to change a route later, stored on the Route row"""
+    positions = {request_idx: p for p, request_idx in enumerate(stop_indices)}
+    return {"locations": list(locations), "coordinates": [list(c) for c in coordinates],
+            "stop_indices": list(stop_indices), "tour": [positions[i] for i in route_plan["stop_order"]]}
+
+
+def _resolve_stop(ref: Union[str, int], locations: List[str], stop_indices: List[int]) -> int:
+    """Request index of a stop on the route, given by request index or location"""
+    if isinstance(ref, int):
+        if ref in stop_indices:
+            return ref
+    else:
+        for request_idx in stop_indices:
+            if locations[request_idx] == ref:
+                return request_idx
+    raise ValueError(f"Stop not on route: {ref}")
+
+
+def _schedule(locations: List[str],
+              stop_indices: List[int],
+              route: List[int],
+              tour_coordinates: np.ndarray,
+              leg_distances: np.ndarray,
+              cargo_details: Dict,
+              departure: datetime,
+              service_seconds: Dict[int, int],
+              solver_info: Dict[str, Any],
+              arrival_seconds: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Legs, ETAs, fuel stops and rest breaks for a fixed tour, formatted as a route plan"""
+    # Legs, cumulative distance/drive time and ETAs are computed once here
+    with span("route.schedule"):
+        legs = RouteLegs(
+            leg_distances,
+            average_speed_kmh=settings.AVERAGE_SPEED_KMH,
+            departure=departure,
+            service_seconds=[service_seconds.get(idx, 0) for idx in route],
+            arrival_seconds=arrival_seconds
+        )
+        rest_positions = legs.rest_break_positions(MAX_DRIVING_TIME)
+        etas = legs.etas(rest_positions, REST_BREAK_MINUTES * 60)
+
+    # Format the solution
+    optimized_route = []
+    for position, idx in enumerate(route):
+        request_idx = stop_indices[idx]
+        optimized_route.append({
+            "location": locations[request_idx],
+            "arrival_time": etas[position].isoformat(),
+            "cargo_handling": cargo_details.get(str(request_idx), {})
+        })
+
+    # Add suggested fuel stops and compliance checkpoints
+    result = {
+        "optimized_route": optimized_route,
+        "stop_order": [stop_indices[idx] for idx in route],
+        "total_distance": legs.total_distance,
+        "fuel_stops": _calculate_fuel_stops(optimized_route, legs, tour_coordinates),
+        "compliance_checkpoints": _add_compliance_checkpoints(optimized_route, legs, rest_positions),
+        "solver": solver_info
+    }
+
+    return result
+
+
+def _calculate_fuel_stops(route: List[Dict],
+                         legs: RouteLegs,
+                         coordinates: Optional[np.ndarray] = None) -> List[Dict]:
+    # Refuel before 80% of the vehicle range is used up, at a catalog station
+    # near the route when FUEL_STATIONS_PATH is set, otherwise at a route stop
+    usable_range = FUEL_RANGE * 0.8
+    stations = fuel_stations.catalog()
+    if stations is None or coordinates is None:
+        return [
+            {
+                "location": route[position]["location"],
+                "distance_from_start": float(legs.cumulative_distance[position])
+            }
+            for position in legs.fuel_stop_positions(usable_range)
+        ]
+
+    with span("route.fuel_stops"):
+        stops = fuel_stations.place_fuel_stops(stations, coordinates, legs.cumulative_distance, usable_range)
+    for stop in stops:
+        if stop["station_id"] is None:
+            stop["location"] = route[stop.pop("route_position")]["location"]
+    return stops
+
+
+def _add_compliance_checkpoints(route: List[Dict],
+                                legs: RouteLegs,
+                                rest_positions: Optional[List[int]] = None) -> List[Dict]:
+    # Add required rest breaks based on hours-of-service driving limits
+    # This is a simplified implementation
+    if rest_positions is None:
+        rest_positions = legs.rest_break_positions(MAX_DRIVING_TIME)
+    return [
+        {
+            "location": route[position]["location"],
+            "type": "rest_break",
+            "duration_minutes": REST_BREAK_MINUTES
+        }
+        for position in rest_positions
+    ]
+
+
+def _parse_time_constraints(time_constraints: Dict,
+                            locations: List[str],
+                            stop_indices: List[int]) -> Tuple[datetime, Dict[int, Tuple[int, int]], Dict[int, int]]:
+    """
+    Convert time_constraints into solver inputs keyed by matrix position.
+
+    Windows and service times are keyed like cargo_details (request index as
+    a string) or by location name. Window bounds may be minutes after
+    departure, "HH:MM" clock times or ISO datetimes; service times are minutes.
+    """
+    departure = time_constraints.get("departure_time")
+    departure = datetime.fromisoformat(departure) if departure else datetime.now().replace(microsecond=0)
+    windows_in = time_constraints.get("time_windows", {})
+    service_in = time_constraints.get("service_times", {})
+    default_service = time_constraints.get("default_service_minutes", 0)
+
+    def to_seconds(value) -> int:
+        if isinstance(value, (int, float)):
+            return int(value * 60)
+        if len(value) <= 5 and ":" in value:
+            clock = datetime.strptime(value, "%H:%M").time()
+            value = datetime.combine(departure.date(), clock)
+        else:
+            value = datetime.fromisoformat(value)
+        return max(0, int((value - departure).total_seconds()))
+
+    time_windows = {}
+    service_seconds = {}
+    for position, request_idx in enumerate(stop_indices):
+        keys = (str(request_idx), locations[request_idx])
+        window = next((windows_in[k] for k in keys if k in windows_in), None)
+        if window:
+            time_windows[position] = (to_seconds(window[0]), to_seconds(window[1]))
+        minutes = next((service_in[k] for k in keys if k in service_in), default_service)
+        service_seconds[position] = int(minutes * 60)
+
+    return departure, time_windows, service_seconds
@@ -0,0 +1,178 @@
+"""
+Idempotent /routes/optimize results, keyed by canonical request hash or Idempotency-Key (SQLite)
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from .sqlite_store import SQLiteConnections
+from .geocoding_cache import normalize_address
+
+
+class IdempotencyConflictError(Exception):
+    """An Idempotency-Key was reused with a different request body"""
+
+
+def route_request_key(locations: List[str],
+                      cargo_details: Dict[str, Any],
+                      time_constraints: Dict[str, Any],
+                      solver: str,
+                      time_limit_seconds: Optional[float]) -> str:
+    """
+    Hash of everything that determines a route plan.
+
+    Locations are normalized like geocoding cache keys and dicts are
+    serialized with sorted keys, so resubmissions differing only in
+    spacing, case or key order share one entry.
+    """
+    material = json.dumps(
+        [[normalize_address(location) for location in locations], cargo_details, time_constraints,
+         solver, time_limit_seconds if solver == "vrp" else None],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class RoutePlanCache:
+    """
+    Stored optimize responses, shared by every worker through one SQLite file.
+
+    Entries are stored under "request:<hash>" and, when the client sent one,
+    "idempotency:<key>"; both remember the route they created. Modifying
+    that route drops its request entries and updates its idempotency
+    entries, so a retry still gets the route back rather than a new one.
+    There is no memory tier: an invalidation in one worker must be visible
+    to all of them.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None,
+                 idempotency_ttl_seconds: Optional[int] = None):
+        self.db_path = db_path or settings.ROUTE_PLAN_CACHE_PATH
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ROUTE_PLAN_CACHE_TTL_SECONDS
+        self.idempotency_ttl_seconds = (idempotency_ttl_seconds if idempotency_ttl_seconds is not None
+                                        else settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self._connections = SQLiteConnections(self.db_path)
+        self._counters = {"hits": 0, "misses": 0, "unshared": 0, "idempotent_replays": 0, "conflicts": 0,
+                          "invalidated": 0}
+
+        with self._connections.get() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS route_plans ("
+                " key TEXT PRIMARY KEY,"
+                " request_hash TEXT NOT NULL,"
+                " route_id INTEGER NOT NULL,"
+                " response TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS route_plans_route_id ON route_plans (route_id)")
+
+    async def get(self,
+                  request_hash: str,
+                  idempotency_key: Optional[str] = None,
+                  shared: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Stored response for this request, or None.
+
+        ``shared=False`` honors only the Idempotency-Key, for requests whose
+        plan must not be reused by an identical later request. Raises
+        IdempotencyConflictError if ``idempotency_key`` was first used with a
+        different request.
+        """
+        if idempotency_key:
+            row = await asyncio.to_thread(self._disk_get, f"idempotency:{idempotency_key}")
+            if row is not None:
+                if row[0] != request_hash:
+                    self._count("conflicts")
+                    raise IdempotencyConflictError("Idempotency-Key was already used with a different request")
+                self._count("idempotent_replays")
+                return json.loads(row[2])
+
+        if not shared:
+            self._count("unshared")
+            return None
+        if self.ttl_seconds <= 0:
+            self._count("misses")
+            return None
+        row = await asyncio.to_thread(self._disk_get, f"request:{request_hash}")
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        response = json.loads(row[2])
+        if idempotency_key:
+            # Later retries with this key replay the same route
+            await self.put_idempotency_key(idempotency_key, request_hash, response)
+        return response
+
+    async def put(self, request_hash: str, response: Dict[str, Any]):
+        """Store a fresh optimize response (must carry its route_id)"""
+        if self.ttl_seconds > 0:
+            await asyncio.to_thread(self._disk_put, f"request:{request_hash}", request_hash, response["route_id"],
+                                    json.dumps(response, default=str), self.ttl_seconds)
+
+    async def put_idempotency_key(self, idempotency_key: str, request_hash: str, response: Dict[str, Any]):
+        """Bind an Idempotency-Key to the request it came with and the response it got"""
+        await asyncio.to_thread(self._disk_put, f"idempotency:{idempotency_key}", request_hash, response["route_id"],
+                                json.dumps(response, default=str), self.idempotency_ttl_seconds)
+
+    async def invalidate_route(self, route_id: int, changes: Optional[Dict[str, Any]] = None):
+        """
+        Call after modifying ``route_id``: identical requests plan a new route
+        again, while Idempotency-Key retries keep replaying this one, with
+        ``changes`` (e.g. the new route_plan) applied to the stored response.
+        """
+        removed = await asyncio.to_thread(self._disk_invalidate_route, route_id, changes or {})
+        with self._lock:
+            self._counters["invalidated"] += removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"] + stats["idempotent_replays"]
+        stats["hit_ratio"] = (stats["hits"] + stats["idempotent_replays"]) / lookups if lookups else 0.0
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _disk_get(self, key: str):
+        return self._connections.get().execute(
+            "SELECT request_hash, route_id, response FROM route_plans WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+
+    def _disk_put(self, key: str, request_hash: str, route_id: int, response: str, ttl_seconds: int):
+        now = time.time()
+        with self._connections.get() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO route_plans (key, request_hash, route_id, response, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, request_hash, route_id, response, now + ttl_seconds)
+            )
+            conn.execute("DELETE FROM route_plans WHERE expires_at <= ?", (now,))
+
+    def _disk_invalidate_route(self, route_id: int, changes: Dict[str, Any]) -> int:
+        with self._connections.get() as conn:
+            if changes:
+                rows = conn.execute(
+                    "SELECT key, response FROM route_plans WHERE route_id = ? AND key LIKE 'idempotency:%'",
+                    (route_id,)
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE route_plans SET response = ? WHERE key = ?",
+                    [(json.dumps({**json.loads(response), **changes}, default=str), key) for key, response in rows]
+                )
+            return conn.execute(
+                "DELETE FROM route_plans WHERE route_id = ? AND key LIKE 'request:%'", (route_id,)
+            ).rowcount
+
+
+route_plan_cache = RoutePlanCache()
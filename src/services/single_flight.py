@@ -0,0 +1,38 @@
+"""
+Single-flight execution: concurrent callers with the same key share one running task
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    At most one task per key.
+
+    The first caller for a key calls ``factory()`` (a coroutine function, or
+    a function returning a future settled elsewhere); callers arriving
+    before that finishes await the same result. The key is released as
+    soon as it finishes, so later callers start fresh work.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda f: self._done(key, f))
+        # Shielded so one caller giving up does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark errors retrieved even if every waiter has gone away
+        if not task.cancelled():
+            task.exception()
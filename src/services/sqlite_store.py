@@ -0,0 +1,48 @@
+"""
+Per-thread SQLite connections to one WAL database file, shared by the on-disk caches and the job queue
+"""
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+
+class SQLiteConnections:
+    """
+    Lazily opened connection per thread to ``db_path``.
+
+    sqlite3 connections are bound to their creating thread, and the caches
+    run their queries through ``asyncio.to_thread``, so every thread gets its
+    own. WAL mode lets every worker process on the host share the file.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 timeout: float = 5.0,
+                 autocommit: bool = False,
+                 synchronous: Optional[str] = "NORMAL",
+                 row_factory=None):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.autocommit = autocommit
+        self.synchronous = synchronous
+        self.row_factory = row_factory
+        self._local = threading.local()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.autocommit:
+                conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            else:
+                conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,45 @@
+"""
+Precompiled Jinja2 templates for notification and document text
+"""
+import hashlib
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
+
+from ..config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+
+def create_environment(precompile: str = "") -> Environment:
+    """
+    Template environment with a shared on-disk bytecode cache.
+
+    Every template under ``precompile`` (a folder of TEMPLATE_DIR) is
+    compiled up front. With TEMPLATE_AUTO_RELOAD off, later lookups are
+    served from memory without checking the source files.
+    """
+    os.makedirs(settings.TEMPLATE_BYTECODE_CACHE_PATH, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATE_BYTECODE_CACHE_PATH),
+        auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    if precompile:
+        for name in env.list_templates(filter_func=lambda name: name.startswith(f"{precompile}/")):
+            env.get_template(name)
+    return env
+
+
+def fingerprint(folder: str) -> str:
+    """Hash of every template source in ``folder``, to version rendered output"""
+    digest = hashlib.sha256()
+    root = os.path.join(TEMPLATE_DIR, folder)
+    for name in sorted(os.listdir(root)):
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
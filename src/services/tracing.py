@@ -0,0 +1,176 @@
+"""
+Lightweight span timing: histograms for /metrics, per-request Server-Timing headers
+"""
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds; the implicit +Inf bucket catches the rest
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans of the request being handled (None outside a request)
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (non-cumulative counts, summed on export)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class SpanRegistry:
+    """Histograms keyed by span name; safe to record into from worker threads"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def prometheus(self, metric: str = "logisync_span_duration_seconds") -> str:
+        """Prometheus text exposition of every span histogram"""
+        lines = [f"# HELP {metric} Duration of named pipeline spans",
+                 f"# TYPE {metric} histogram"]
+        with self._lock:
+            snapshot = {name: (list(h.counts), h.sum, h.count) for name, h in self._histograms.items()}
+        for name in sorted(snapshot):
+            counts, total, count = snapshot[name]
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{span="{label}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{span="{label}"}} {total}')
+            lines.append(f'{metric}_count{{span="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = SpanRegistry()
+
+
+def record(name: str, seconds: float):
+    """Add one finished span to the histograms and to the current request, if any"""
+    registry.observe(name, seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+class span:
+    """
+    Time a block as a named span: ``with span("route.geocode"): ...``
+
+    Works around awaits as well; the cost is two perf_counter calls and
+    one uncontended lock.
+    """
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+@contextmanager
+def collect():
+    """Collect spans recorded in this context (and threads it is copied to)"""
+    spans: List[Tuple[str, float]] = []
+    token = _request_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _request_spans.reset(token)
+
+
+def run_captured(fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Any, List[Tuple[str, float]]]:
+    """Run ``fn`` in a pool worker process and ship its spans back to the caller"""
+    with collect() as spans:
+        result = fn(*args, **kwargs)
+    return result, spans
+
+
+def replay(spans: List[Tuple[str, float]]):
+    """Record spans captured in a worker process"""
+    for name, seconds in spans:
+        record(name, seconds)
+
+
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Server-Timing header value, one entry per span name with durations summed"""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{_TOKEN_UNSAFE.sub('_', name)};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def _route_name(scope) -> str:
+    """Route template (not the raw path, to keep label cardinality bounded)"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects a request's spans and reports them.
+
+    Spans finished before the response starts go out in a Server-Timing
+    header (with "total" for the whole handler); every request is also
+    recorded as an "http <METHOD> <route>" span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing(spans + [("total", time.perf_counter() - started)])
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        with collect() as spans:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                registry.observe(f"http {scope['method']} {_route_name(scope)}", time.perf_counter() - started)
@@ -0,0 +1,99 @@
+"""
+OR-Tools routing solver with time windows and a wall-clock budget
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+from .distance_matrix import DistanceMatrix
+
+
+class VRPSolver:
+    """
+    Single-vehicle open tour starting at stop 0.
+
+    Returning to the start is free, so the vehicle may finish at any stop.
+    Times are integer seconds from departure.
+    """
+
+    def __init__(self, average_speed_kmh: float):
+        self.speed_mps = average_speed_kmh / 3.6
+
+    def solve(self,
+              matrix: DistanceMatrix,
+              initial_tour: Sequence[int],
+              time_windows: Dict[int, Tuple[int, int]],
+              service_seconds: Dict[int, int],
+              time_limit_seconds: float) -> Optional[Dict]:
+        """
+        Improve ``initial_tour`` under the time windows until the budget runs out.
+
+        Returns {"tour", "arrival_seconds", "distance", "seeded"} or None when
+        no feasible tour was found within the budget.
+        """
+        n = len(matrix)
+        distance = np.rint(matrix.meters).astype(np.int64)
+        distance[:, 0] = 0  # open tour: the trip back to the start costs nothing
+        service = np.zeros(n, dtype=np.int64)
+        for stop, seconds in service_seconds.items():
+            service[stop] = seconds
+        # Transit from i includes the service performed at i
+        transit = np.rint(distance / self.speed_mps).astype(np.int64) + service[:, None]
+        transit[:, 0] = 0
+        distance_rows = distance.tolist()
+        transit_rows = transit.tolist()
+
+        latest_window = max((end for _, end in time_windows.values()), default=0)
+        horizon = int(max(latest_window, transit.max(initial=0) * n) + 1)
+
+        manager = pywrapcp.RoutingIndexManager(n, 1, 0)
+        routing = pywrapcp.RoutingModel(manager)
+
+        def distance_callback(from_index, to_index):
+            return distance_rows[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+        def time_callback(from_index, to_index):
+            return transit_rows[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+        routing.SetArcCostEvaluatorOfAllVehicles(routing.RegisterTransitCallback(distance_callback))
+        time_index = routing.RegisterTransitCallback(time_callback)
+        # Slack lets the vehicle wait for a window to open
+        routing.AddDimension(time_index, horizon, horizon, False, "Time")
+        time_dimension = routing.GetDimensionOrDie("Time")
+
+        time_dimension.CumulVar(routing.Start(0)).SetRange(0, 0)
+        for stop, (start, end) in time_windows.items():
+            if stop == 0:
+                continue
+            time_dimension.CumulVar(manager.NodeToIndex(stop)).SetRange(int(start), int(end))
+
+        params = pywrapcp.DefaultRoutingSearchParameters()
+        params.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
+        params.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        params.time_limit.FromMilliseconds(max(1, int(time_limit_seconds * 1000)))
+
+        routing.CloseModelWithParameters(params)
+        # The greedy tour is only a usable seed if it satisfies the windows
+        initial = routing.ReadAssignmentFromRoutes([list(initial_tour[1:])], True)
+        if initial is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial, params)
+        else:
+            solution = routing.SolveWithParameters(params)
+        if solution is None:
+            return None
+
+        tour: List[int] = []
+        arrival_seconds: List[int] = []
+        index = routing.Start(0)
+        while not routing.IsEnd(index):
+            tour.append(manager.IndexToNode(index))
+            arrival_seconds.append(solution.Min(time_dimension.CumulVar(index)))
+            index = solution.Value(routing.NextVar(index))
+
+        return {
+            "tour": tour,
+            "arrival_seconds": arrival_seconds,
+            "distance": matrix.tour_length(tour),
+            "seeded": initial is not None,
+        }
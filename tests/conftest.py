@@ -0,0 +1,57 @@
+"""
+Shared test setup: caches, stores and the database live in a temporary directory
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from geopy.location import Location
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read when src.config is first imported; the API tests need a database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='logisync-test-')}/test.db")
+
+from benchmarks.common import configure_sandbox  # noqa: E402
+
+# Before any src.services singleton opens its files
+configure_sandbox()
+
+# "stop <i>" geocodes to STOP_POINTS[i] in the API tests
+STOP_POINTS = np.random.default_rng(11).uniform([40.0, -75.0], [40.5, -74.5], (40, 2)).tolist()
+
+
+class StubGeocoder:
+    """Resolves "stop <i>" to STOP_POINTS[i]; anything else is unknown"""
+
+    def geocode(self, query):
+        name, _, number = query.partition(" ")
+        if name != "stop" or not number.isdigit():
+            return None
+        return Location(query, tuple(STOP_POINTS[int(number)]), {})
+
+
+@pytest.fixture(scope="module")
+def client():
+    """The API router and Server-Timing middleware on a bare app (src.main needs the static assets)"""
+    from src.api import endpoints
+    from src.database import async_engine
+    from src.models.database import Base
+    from src.services.tracing import ServerTimingMiddleware
+
+    async def create_tables():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    endpoints.route_optimizer.geolocator = StubGeocoder()
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+    app.include_router(endpoints.router, prefix="/api/v1")
+    with TestClient(app) as test_client:
+        yield test_client
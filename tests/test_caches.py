@@ -0,0 +1,199 @@
+"""
+Route plan, LLM response and geocoding caches
+"""
+import asyncio
+
+import pytest
+from geopy.location import Location
+
+from src.services.geocoding_cache import CachedGeocoder, normalize_address
+from src.services.llm_cache import ResponseCache, cache_key
+from src.services.route_plan_cache import IdempotencyConflictError, RoutePlanCache, route_request_key
+
+
+# Route plan cache
+
+def request_key(**overrides):
+    request = {"locations": ["123 Main St", "456 Oak Ave"], "cargo_details": {"a": 1, "b": 2},
+               "time_constraints": {"departure_time": "2026-10-17T08:00:00"}, "solver": "greedy",
+               "time_limit_seconds": None}
+    request.update(overrides)
+    return route_request_key(**request)
+
+
+def test_request_key_ignores_spelling_and_key_order():
+    assert request_key() == request_key(locations=["123  MAIN st.", "456 oak ave"],
+                                        cargo_details={"b": 2, "a": 1})
+    assert request_key() != request_key(locations=["456 Oak Ave", "123 Main St"])
+    # The time budget only matters to the vrp solver
+    assert request_key() == request_key(time_limit_seconds=3.0)
+    assert request_key(solver="vrp") != request_key(solver="vrp", time_limit_seconds=3.0)
+
+
+def test_plan_cache_hit_and_invalidation(tmp_path):
+    cache = RoutePlanCache(str(tmp_path / "plans.sqlite3"), ttl_seconds=60, idempotency_ttl_seconds=60)
+
+    async def scenario():
+        assert await cache.get("h1") is None
+        await cache.put("h1", {"route_id": 7, "route_plan": {}})
+        assert (await cache.get("h1"))["route_id"] == 7
+        # Requests timed from now are never matched by hash
+        assert await cache.get("h1", shared=False) is None
+        await cache.invalidate_route(7)
+        assert await cache.get("h1") is None
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["unshared"], stats["invalidated"]) == (1, 2, 1, 1)
+
+
+def test_plan_cache_idempotency_key(tmp_path):
+    cache = RoutePlanCache(str(tmp_path / "plans.sqlite3"), ttl_seconds=0, idempotency_ttl_seconds=60)
+
+    async def scenario():
+        await cache.put_idempotency_key("key-1", "h1", {"route_id": 3})
+        assert (await cache.get("h1", "key-1", shared=False))["route_id"] == 3
+        with pytest.raises(IdempotencyConflictError):
+            await cache.get("h2", "key-1")
+        # ttl_seconds=0 disables reuse by hash, but not by key
+        await cache.put("h1", {"route_id": 3})
+        assert await cache.get("h1") is None
+
+    asyncio.run(scenario())
+
+
+def test_plan_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "plans.sqlite3")
+
+    async def scenario():
+        await RoutePlanCache(path, ttl_seconds=60).put("h1", {"route_id": 1})
+        return await RoutePlanCache(path, ttl_seconds=60).get("h1")
+
+    assert asyncio.run(scenario()) == {"route_id": 1}
+
+
+# LLM response cache
+
+def test_llm_cache_key_normalizes_whitespace_only():
+    options = {"temperature": 0.7}
+    assert cache_key("Hello\n   world", "m", options) == cache_key("Hello world", "m", options)
+    assert cache_key("Hello world", "m", options) != cache_key("hello world", "m", options)
+    assert cache_key("Hello world", "m", options) != cache_key("Hello world", "m2", options)
+    assert cache_key("Hello world", "m", options) != cache_key("Hello world", "m", {"temperature": 0.1})
+
+
+def test_llm_cache_tiers_and_expiry(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+
+    async def scenario():
+        cache = ResponseCache(path)
+        await cache.put("k1", "first", ttl_seconds=60)
+        await cache.put("k2", "short", ttl_seconds=-1)
+        assert await cache.get("k1") == "first"
+        assert await cache.get("k2") is None
+        # A fresh process finds it on disk and promotes it to memory
+        other = ResponseCache(path)
+        assert await other.get("k1") == "first"
+        assert await other.get("k1") == "first"
+        return cache.stats(), other.stats()
+
+    first, other = asyncio.run(scenario())
+    assert (first["memory_hits"], first["misses"]) == (1, 1)
+    assert (other["disk_hits"], other["memory_hits"]) == (1, 1)
+
+
+def test_llm_cache_memory_byte_limit(tmp_path):
+    async def scenario():
+        cache = ResponseCache(str(tmp_path / "llm.sqlite3"), max_memory_bytes=10)
+        await cache.put("a", "12345", 60)
+        await cache.put("b", "67890", 60)
+        await cache.put("c", "abcde", 60)
+        return cache
+
+    cache = asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 10
+    assert stats["memory_entries"] == 2
+    assert stats["evictions"] == 1
+    # Evicted from memory only; still served from disk
+    assert asyncio.run(cache.get("a")) == "12345"
+
+
+def test_llm_cache_disk_byte_limit(tmp_path):
+    async def scenario():
+        cache = ResponseCache(str(tmp_path / "llm.sqlite3"), max_disk_bytes=10)
+        for key in ("a", "b", "c"):
+            await cache.put(key, "12345", 60)
+        return await ResponseCache(str(tmp_path / "llm.sqlite3")).get("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+# Geocoding cache
+
+class CountingGeocoder:
+    def __init__(self, known=None, fail=False):
+        self.known = known or {}
+        self.fail = fail
+        self.calls = []
+
+    def geocode(self, query):
+        self.calls.append(query)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        coordinates = self.known.get(normalize_address(query))
+        return Location(query, coordinates, {}) if coordinates else None
+
+
+def test_normalize_address():
+    assert normalize_address("123 Main St., Springfield") == normalize_address("123  main st springfield")
+    assert normalize_address("Unit #4/B") == "unit #4/b"
+
+
+def test_geocode_cache_tiers(tmp_path):
+    path = str(tmp_path / "geocode.sqlite3")
+    upstream = CountingGeocoder({"123 main st": (40.0, -74.0)})
+    geocoder = CachedGeocoder(upstream, db_path=path)
+
+    assert geocoder.geocode("123 Main St").point[:2] == (40.0, -74.0)
+    assert geocoder.geocode("123 MAIN ST.").point[:2] == (40.0, -74.0)
+    assert len(upstream.calls) == 1
+
+    # Another worker shares the SQLite tier
+    other_upstream = CountingGeocoder()
+    other = CachedGeocoder(other_upstream, db_path=path)
+    assert other.geocode("123 main st").latitude == 40.0
+    assert other_upstream.calls == []
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_geocode_cache_negative_entries(tmp_path):
+    upstream = CountingGeocoder()
+    geocoder = CachedGeocoder(upstream, db_path=str(tmp_path / "geocode.sqlite3"), negative_ttl_seconds=60)
+    assert geocoder.geocode("Nowhere") is None
+    assert geocoder.geocode("nowhere") is None
+    assert len(upstream.calls) == 1
+    assert geocoder.stats()["negative_hits"] == 1
+
+
+def test_geocode_cache_expiry_and_errors(tmp_path):
+    upstream = CountingGeocoder({"a": (1.0, 2.0)})
+    geocoder = CachedGeocoder(upstream, db_path=str(tmp_path / "geocode.sqlite3"), ttl_seconds=-1)
+    geocoder.geocode("a")
+    geocoder.geocode("a")
+    assert len(upstream.calls) == 2
+
+    failing = CachedGeocoder(CountingGeocoder(fail=True), db_path=str(tmp_path / "other.sqlite3"))
+    with pytest.raises(RuntimeError):
+        failing.geocode("a")
+    assert failing.stats()["upstream_errors"] == 1
+    # Errors are not cached as misses
+    failing.geocoder = upstream
+    assert failing.geocode("a") is not None
+
+
+def test_geocode_cache_memory_limit(tmp_path):
+    geocoder = CachedGeocoder(CountingGeocoder(), db_path=str(tmp_path / "geocode.sqlite3"), max_memory_entries=2)
+    for query in ("a", "b", "c"):
+        geocoder.geocode(query)
+    assert geocoder.stats()["memory_entries"] == 2
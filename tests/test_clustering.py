@@ -0,0 +1,77 @@
+"""
+Cluster-first routing: sweep and k-means partitions within stop and capacity limits
+"""
+import numpy as np
+import pytest
+
+from src.services.clustering import cluster_tasks, partition_stops, solve_clusters, stitch, stop_demands
+from src.services.route_optimizer import plan_route
+
+COORDINATES = np.random.default_rng(5).uniform([40.0, -75.0], [41.0, -74.0], (60, 2))
+
+
+def assert_partition(clusters, n):
+    assert sorted(int(i) for cluster in clusters for i in cluster) == list(range(n))
+    assert clusters[0][0] == 0
+
+
+@pytest.mark.parametrize("method", ["sweep", "kmeans"])
+def test_clusters_respect_max_stops(method):
+    clusters = partition_stops(COORDINATES, np.zeros(60), max_stops=8, method=method)
+    assert_partition(clusters, 60)
+    assert max(len(cluster) for cluster in clusters) <= 8
+    assert all(len(cluster) for cluster in clusters)
+
+
+@pytest.mark.parametrize("method", ["sweep", "kmeans"])
+def test_clusters_respect_capacity(method):
+    demands = np.full(60, 3.0)
+    demands[7] = 15.0  # over capacity on its own
+    clusters = partition_stops(COORDINATES, demands, capacity=10.0, max_stops=50, method=method)
+    assert_partition(clusters, 60)
+    for cluster in clusters:
+        assert demands[cluster].sum() <= 10.0 or list(cluster) == [7]
+    assert [7] in [list(cluster) for cluster in clusters]
+
+
+def test_sweep_orders_by_bearing():
+    # Four stops due north, east, south and west of the start
+    coordinates = [(40.0, -74.0), (40.0, -73.9), (39.9, -74.0), (40.1, -74.0), (40.0, -74.1)]
+    clusters = partition_stops(coordinates, np.zeros(5), max_stops=2, method="sweep")
+    assert [list(cluster) for cluster in clusters] == [[0, 3], [1, 2], [4]]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        partition_stops(COORDINATES, np.zeros(60), method="random")
+
+
+def test_stop_demands_from_cargo_details():
+    cargo_details = {"vehicle_capacity": 10, "0": {"weight": 2}, "2": {"weight": "4.5"}, "3": "fragile"}
+    # Request indices 0, 2 and 3 were geocoded
+    assert stop_demands(cargo_details, [0, 2, 3]).tolist() == [2.0, 4.5, 0.0]
+
+
+def test_cluster_tours_stitch_into_one_tour():
+    clusters = partition_stops(COORDINATES, np.zeros(60), max_stops=10, method="kmeans")
+    tasks = cluster_tasks(COORDINATES, clusters)
+    assert tasks[0][1] == 0
+    orders = solve_clusters(tasks, improve=True, time_limit_seconds=0.2)
+    for (points, entry), order in zip(tasks, orders):
+        assert order[0] == entry
+        assert sorted(order) == list(range(len(points)))
+    tour = stitch(clusters, orders)
+    assert tour[0] == 0
+    assert sorted(tour) == list(range(60))
+
+
+def test_clustered_solver():
+    locations = [f"stop {i}" for i in range(60)]
+    cargo_details = {"vehicle_capacity": 20, **{str(i): {"weight": 2} for i in range(60)}}
+    route_plan = plan_route(locations, COORDINATES.tolist(), list(range(60)), cargo_details, {}, solver="clustered")
+    assert route_plan["solver"]["mode"] == "clustered"
+    # 60 stops of weight 2 under a capacity of 20 need at least 6 clusters
+    assert route_plan["solver"]["clusters"] >= 6
+    assert route_plan["solver"]["largest_cluster"] <= 10
+    assert route_plan["optimized_route"][0]["location"] == "stop 0"
+    assert sorted(stop["location"] for stop in route_plan["optimized_route"]) == sorted(locations)
@@ -0,0 +1,101 @@
+"""
+Content-addressed document store and GET /documents/{digest} (ETag, Range, 416)
+"""
+import os
+
+import pytest
+
+from src.api import endpoints
+from src.services.document_store import DocumentStore, document_digest
+
+CONTENT = bytes(range(256)) * 4
+
+
+def test_digest_ignores_key_order_and_tracks_version():
+    a = document_digest("route", {"b": 1, "a": [1, 2]})
+    assert a == document_digest("route", {"a": [1, 2], "b": 1})
+    assert a != document_digest("route", {"a": [1, 2], "b": 2})
+    assert a != document_digest("manifest", {"a": [1, 2], "b": 1})
+    assert a != document_digest("route", {"a": [1, 2], "b": 1}, version="2")
+
+
+def test_commit_and_lookup(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    digest = document_digest("route", {"n": 1})
+    assert store.lookup(digest, "pdf") is None
+
+    temp = store.temp_path("pdf")
+    with open(temp, "wb") as f:
+        f.write(b"%PDF")
+    path = store.commit(temp, digest, "pdf")
+    assert not os.path.exists(temp)
+    assert path == os.path.join(str(tmp_path), digest[:2], f"{digest}.pdf")
+    assert store.lookup(digest, "pdf") == path
+    assert store.find(digest) == path
+    # Only well-formed digests reach the filesystem
+    assert store.find("../" + digest[3:]) is None
+    assert (store.stats()["hits"], store.stats()["misses"]) == (1, 1)
+
+
+@pytest.fixture(scope="module")
+def digest():
+    store = endpoints.document_generator.store
+    digest = document_digest("test", {"content": "bytes"})
+    temp = store.temp_path("pdf")
+    with open(temp, "wb") as f:
+        f.write(CONTENT)
+    store.commit(temp, digest, "pdf")
+    return digest
+
+
+def test_full_download(client, digest):
+    response = client.get(f"/api/v1/documents/{digest}")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{digest}"'
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_if_none_match(client, digest):
+    for tag in (f'"{digest}"', f'W/"{digest}"', f'"other", "{digest}"', "*"):
+        response = client.get(f"/api/v1/documents/{digest}", headers={"If-None-Match": tag})
+        assert response.status_code == 304
+        assert response.content == b""
+    assert client.get(f"/api/v1/documents/{digest}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1020-5000", 1020, 1023),
+])
+def test_byte_ranges(client, digest, header, start, end):
+    response = client.get(f"/api/v1/documents/{digest}", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range(client, digest):
+    for header in ("bytes=1024-", "bytes=20-10"):
+        response = client.get(f"/api/v1/documents/{digest}", headers={"Range": header})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range(client, digest):
+    # A range against another version of the document gets the whole current one
+    stale = client.get(f"/api/v1/documents/{digest}", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
+    partial = client.get(f"/api/v1/documents/{digest}", headers={"Range": "bytes=0-9", "If-Range": f'"{digest}"'})
+    assert partial.status_code == 206
+    assert partial.content == CONTENT[:10]
+
+
+def test_unknown_document(client):
+    assert client.get(f"/api/v1/documents/{'0' * 64}").status_code == 404
+    assert client.get("/api/v1/documents/not-a-digest").status_code == 404
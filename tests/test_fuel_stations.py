@@ -0,0 +1,110 @@
+"""
+Fuel-stop placement from a station catalog along the route
+"""
+import numpy as np
+import pytest
+
+from src.services import fuel_stations
+from src.services.distance_matrix import haversine_meters
+from src.services.fuel_stations import FuelStationCatalog, place_fuel_stops, sample_route
+from src.services.route_optimizer import plan_route
+
+KM_NORTH = 1 / 111.195  # degrees of latitude per km
+# Stops on the -90 meridian (a great circle), 0, 444.8 and 889.6 km north of 30N
+STOPS = np.array([(30.0, -90.0), (34.0, -90.0), (38.0, -90.0)])
+RANGE = 300000.0
+
+# (km north of the start, km east of the route, price)
+STATIONS = [
+    (166.8, 0, 2.0),
+    (255.8, 0, 3.0),
+    (289.1, 0, 3.5),
+    (200.0, 46, 1.0),  # cheapest, but too far off the route
+    (500.0, 0, 3.0),
+    (556.0, 0, 2.5),
+    (667.0, 0, 3.0),
+    (778.0, 0, 3.0),
+]
+
+
+def cumulative(coordinates):
+    legs = haversine_meters(coordinates[:-1, 0], coordinates[:-1, 1], coordinates[1:, 0], coordinates[1:, 1])
+    return np.concatenate([[0.0], np.cumsum(legs)])
+
+
+def catalog(stations=STATIONS):
+    coordinates = [(30.0 + north * KM_NORTH, -90.0 + east / (111.195 * np.cos(np.radians(31))))
+                   for north, east, _ in stations]
+    return FuelStationCatalog(coordinates, [f"S{i}" for i in range(len(stations))], [p for _, _, p in stations])
+
+
+def place(stations, strategy, usable_range=RANGE):
+    return place_fuel_stops(stations, STOPS, cumulative(STOPS), usable_range,
+                            detour_meters=5000.0, spacing_meters=2000.0, strategy=strategy)
+
+
+def assert_within_range(stops, usable_range=RANGE):
+    positions = [0.0] + [stop["distance_from_start"] for stop in stops] + [cumulative(STOPS)[-1]]
+    assert all(b - a <= usable_range for a, b in zip(positions, positions[1:]))
+
+
+@pytest.mark.parametrize("strategy", ["cheapest", "nearest"])
+def test_stops_keep_every_stretch_within_range(strategy):
+    stops = place(catalog(), strategy)
+    assert_within_range(stops)
+    assert all(stop["station_id"] is not None for stop in stops)
+    assert "3" not in [stop["station_id"] for stop in stops]
+    # There and back from a sample point within the detour budget
+    assert all(stop["detour_meters"] <= 2 * 5000.0 for stop in stops)
+
+
+def test_strategies_choose_differently():
+    # Late half of the first stretch (150-300 km) holds S0, S1 and S2
+    assert place(catalog(), "cheapest")[0]["location"] == "S0"
+    assert place(catalog(), "nearest")[0]["location"] == "S2"
+
+
+def test_short_route_needs_no_stops():
+    assert place(catalog(), "cheapest", usable_range=1e6) == []
+
+
+def test_route_stop_when_no_station_is_in_reach():
+    far_away = catalog([(300.0, 500, 1.0)])
+    stops = place(far_away, "cheapest", usable_range=500000.0)
+    assert [(stop["station_id"], stop["route_position"]) for stop in stops] == [(None, 1)]
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        place(catalog(), "scenic")
+
+
+def test_sample_route_spacing():
+    samples, along = sample_route(STOPS, cumulative(STOPS), 10000.0)
+    assert np.allclose(samples[0], STOPS[0]) and np.allclose(samples[-1], STOPS[-1])
+    assert np.all(np.diff(along) > 0) and np.all(np.diff(along) <= 10000.0 + 1e-6)
+    # Samples lie on the route and at the reported distance
+    assert np.allclose(samples[:, 1], -90.0)
+    assert np.allclose(haversine_meters(STOPS[0, 0], STOPS[0, 1], samples[:, 0], samples[:, 1]), along)
+
+
+def test_catalog_from_csv(tmp_path):
+    path = tmp_path / "stations.csv"
+    path.write_text("station_id,brand,lat,lng,diesel_price\nA1,Fuel Co,31.5,-90.0,3.19\nB2,Gas Inc,32.0,-90.0,\n")
+    stations = FuelStationCatalog.from_csv(str(path))
+    assert len(stations) == 2
+    assert stations.station(0) == {"location": "Fuel Co", "station_id": "A1", "latitude": 31.5,
+                                   "longitude": -90.0, "price": 3.19}
+    assert stations.station(1)["price"] is None
+
+    path.write_text("name,price\nNowhere,3.0\n")
+    with pytest.raises(ValueError):
+        FuelStationCatalog.from_csv(str(path))
+
+
+def test_plan_route_uses_the_catalog(monkeypatch):
+    monkeypatch.setattr(fuel_stations, "_catalog", catalog())
+    locations = ["start", "middle", "end"]
+    route_plan = plan_route(locations, STOPS.tolist(), [0, 1, 2], {}, {})
+    stops = route_plan["fuel_stops"]
+    assert stops and all(stop["location"].startswith("S") for stop in stops)
@@ -0,0 +1,131 @@
+"""
+Offline gazetteer: index build and reuse, exact / prefix / fuzzy lookup and the fallback geocoder
+"""
+import os
+import threading
+
+import pytest
+
+from src.services import gazetteer
+from src.services.gazetteer import GazetteerGeocoder, GazetteerIndex, build_index, fold, load_index, read_places
+
+PLACES = """name,latitude,longitude,state,country,population,alternate_names
+Springfield,39.80,-89.64,IL,US,116000,
+Springfield,37.21,-93.29,MO,US,169000,
+Springfield,42.10,-72.59,MA,US,155000,
+São Paulo,-23.55,-46.63,SP,BR,12300000,Sampa;Sao Paulo City
+Portland,45.52,-122.68,OR,US,650000,
+Portland,43.66,-70.26,ME,US,68000,
+Pittsburgh,40.44,-79.99,PA,US,302000,
+"""
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "places.csv"
+    path.write_text(PLACES, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def geocoder(source, tmp_path):
+    return GazetteerGeocoder(load_index(source, str(tmp_path / "index")), max_distance=2, prefix_min_length=4)
+
+
+def test_reads_csv_and_geonames(source, tmp_path):
+    places = list(read_places(source))
+    assert len(places) == 7
+    assert places[3][:2] == ("São Paulo", ["Sampa", "Sao Paulo City"])
+
+    columns = ["0"] * 19
+    columns[1:6] = ["Zürich", "Zurich", "Zuerich,Turicum", "47.37", "8.54"]
+    columns[8], columns[10], columns[14] = "CH", "ZH", "421878"
+    dump = tmp_path / "cities.txt"
+    dump.write_text("\t".join(columns) + "\nshort\tline\n", encoding="utf-8")
+    (place,) = read_places(str(dump))
+    assert place == ("Zürich", ["Zurich", "Zuerich", "Turicum"], 47.37, 8.54, "ZH", "CH", 421878)
+
+
+def test_fold_strips_diacritics_and_punctuation():
+    assert fold("São  Paulo, SP") == "sao paulo sp"
+
+
+def test_exact_matches_prefer_population_and_honor_qualifiers(geocoder):
+    kind, place = geocoder.lookup("Springfield")
+    assert (kind, place[2]) == ("exact", "Springfield, MO, US")
+    assert geocoder.lookup("Springfield, IL")[1][2] == "Springfield, IL, US"
+    assert geocoder.lookup("springfield ma us")[1][2] == "Springfield, MA, US"
+    assert geocoder.lookup("Sao Paulo")[1][:2] == (-23.55, -46.63)
+    assert geocoder.lookup("Sampa")[1][2] == "São Paulo, SP, BR"
+
+
+def test_prefix_and_fuzzy_matches(geocoder):
+    kind, place = geocoder.lookup("Pittsb")
+    assert (kind, place[2]) == ("prefix", "Pittsburgh, PA, US")
+    # Shorter than prefix_min_length: no prefix match, and too short for fuzzy matching
+    assert geocoder.lookup("Pi") == ("miss", None)
+
+    kind, place = geocoder.lookup("Portlnd")
+    assert (kind, place[2]) == ("fuzzy", "Portland, OR, US")
+    assert geocoder.lookup("Springfeild IL")[1][2] == "Springfield, IL, US"
+    # Beyond max_distance edits
+    assert geocoder.lookup("Pxrtlxnd xx") == ("miss", None)
+
+
+def test_geocode_falls_back_on_a_miss(geocoder):
+    class Fallback:
+        def __init__(self):
+            self.queries = []
+
+        def geocode(self, query):
+            self.queries.append(query)
+            return None
+
+    geocoder.fallback = Fallback()
+    location = geocoder.geocode("Portland, ME")
+    assert (location.latitude, location.longitude) == (43.66, -70.26)
+    assert geocoder.geocode("Atlantis") is None
+    assert geocoder.fallback.queries == ["Atlantis"]
+    stats = geocoder.stats()
+    assert (stats["exact_hits"], stats["misses"], stats["fallback_calls"], stats["places"]) == (1, 1, 1, 7)
+
+
+def test_index_is_reused_until_the_source_changes(source, tmp_path):
+    index_dir = str(tmp_path / "index")
+    first = load_index(source, index_dir)
+    built_at = os.stat(os.path.join(index_dir, "meta.json")).st_mtime_ns
+    assert load_index(source, index_dir).meta == first.meta
+    assert os.stat(os.path.join(index_dir, "meta.json")).st_mtime_ns == built_at
+
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("Boise,43.62,-116.20,ID,US,235000,\n")
+    rebuilt = load_index(source, index_dir)
+    assert rebuilt.meta["places"] == 8
+    assert GazetteerGeocoder(rebuilt).lookup("Boise")[0] == "exact"
+    # An index directory can be opened directly
+    assert load_index(index_dir).meta == rebuilt.meta
+
+
+def test_concurrent_loads_build_once(source, tmp_path, monkeypatch):
+    builds = []
+    build = gazetteer._build_index
+    monkeypatch.setattr(gazetteer, "_build_index", lambda *args: builds.append(args) or build(*args))
+    index_dir = str(tmp_path / "index")
+    indexes = []
+    threads = [threading.Thread(target=lambda: indexes.append(load_index(source, index_dir))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert [index.meta["places"] for index in indexes] == [7] * 4
+    # No staging directories are left behind
+    assert sorted(os.listdir(tmp_path)) == ["index", "index.lock", "places.csv"]
+
+
+def test_empty_index(tmp_path):
+    source = tmp_path / "empty.csv"
+    source.write_text("name,latitude,longitude\n")
+    meta = build_index(str(source), str(tmp_path / "index"))
+    assert meta["places"] == 0
+    assert GazetteerGeocoder(GazetteerIndex(str(tmp_path / "index"))).lookup("Anywhere") == ("miss", None)
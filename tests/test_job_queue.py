@@ -0,0 +1,164 @@
+"""
+Job queue claims, leases and retries, and the background compliance documents built on it
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import select
+
+from src.api import endpoints
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.models.database import ComplianceDocument
+from src.services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_DELAY_SECONDS", 0.0)
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1, poll_interval=0.01, lease_seconds=0.05)
+    queue.register("echo", echo)
+    return queue
+
+
+async def echo(payload):
+    return payload
+
+
+def run_until_settled(queue, job_ids, timeout=5.0):
+    """Run the workers until every job has succeeded or failed"""
+    async def scenario():
+        await queue.start()
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                jobs = [await queue.get(job_id) for job_id in job_ids]
+                if all(job["status"] in ("succeeded", "failed") for job in jobs):
+                    return jobs
+                await asyncio.sleep(0.01)
+            raise AssertionError(f"Jobs still pending: {jobs}")
+        finally:
+            await queue.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_claims_most_urgent_first(queue):
+    low = asyncio.run(queue.enqueue("echo", {"n": 1}, priority="low"))
+    normal = asyncio.run(queue.enqueue("echo", {"n": 2}))
+    high = asyncio.run(queue.enqueue("echo", {"n": 3}, priority="high"))
+    assert [queue._claim()["id"] for _ in range(3)] == [high, normal, low]
+    # Leased jobs are not handed out twice
+    assert queue._claim() is None
+
+
+def test_enqueue_rejects_unknown_kinds_and_priorities(queue):
+    with pytest.raises(ValueError):
+        asyncio.run(queue.enqueue("unknown", {}))
+    with pytest.raises(ValueError):
+        asyncio.run(queue.enqueue("echo", {}, priority="urgent"))
+
+
+def test_expired_lease_is_claimed_again(queue):
+    job_id = asyncio.run(queue.enqueue("echo", {}, max_attempts=2))
+    assert queue._claim()["attempts"] == 1
+    time.sleep(0.06)
+    job = queue._claim()
+    assert (job["id"], job["attempts"]) == (job_id, 2)
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+    job_id = asyncio.run(queue.enqueue("echo", {}, max_attempts=1))
+    queue._claim()
+    time.sleep(0.06)
+    assert queue._claim() is None
+    assert [job["id"] for job in queue._fail_abandoned()] == [job_id]
+    job = asyncio.run(queue.get(job_id))
+    assert job["status"] == "failed"
+    assert "lease expired after 1 attempt" in job["error"]
+
+
+def test_abandoned_job_runs_its_failure_hook(queue):
+    failures = []
+
+    async def record(payload, error):
+        failures.append((payload, error))
+
+    queue.register("echo", echo, on_failure=record)
+    job_id = asyncio.run(queue.enqueue("echo", {"n": 1}, max_attempts=1))
+    queue._claim()
+    time.sleep(0.06)
+    (job,) = run_until_settled(queue, [job_id])
+    assert job["status"] == "failed"
+    assert failures == [({"n": 1}, job["error"])]
+
+
+def test_failed_job_is_retried_until_it_succeeds(queue):
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 2:
+            raise RuntimeError("transient")
+        return {"ok": True}
+
+    queue.register("flaky", flaky)
+    (job,) = run_until_settled(queue, [asyncio.run(queue.enqueue("flaky", {}, max_attempts=3))])
+    assert (job["status"], job["attempts"], job["result"]) == ("succeeded", 2, {"ok": True})
+    assert job["error"] is None
+
+
+def test_exhausted_retries_fail_the_job(queue):
+    failures = []
+
+    async def broken(payload):
+        raise RuntimeError("permanent")
+
+    async def record(payload, error):
+        failures.append(error)
+
+    queue.register("broken", broken, on_failure=record)
+    (job,) = run_until_settled(queue, [asyncio.run(queue.enqueue("broken", {}, max_attempts=2))])
+    assert (job["status"], job["attempts"]) == ("failed", 2)
+    assert "permanent" in job["error"]
+    assert len(failures) == 1
+
+
+def document_status(document_id):
+    async def fetch():
+        async with AsyncSessionLocal() as db:
+            return (await db.get(ComplianceDocument, document_id)).status
+
+    return asyncio.run(fetch())
+
+
+def latest_document_status():
+    async def fetch():
+        async with AsyncSessionLocal() as db:
+            query = select(ComplianceDocument).order_by(ComplianceDocument.id.desc()).limit(1)
+            return (await db.execute(query)).scalar_one().status
+
+    return asyncio.run(fetch())
+
+
+def test_background_document_is_queued_with_its_job(client):
+    response = client.post("/api/v1/compliance-documents/safety_inspection?background=true&priority=high",
+                           json={"vehicle_id": "T-1"})
+    assert response.status_code == 202
+    body = response.json()
+    assert document_status(body["document_id"]) == "queued"
+    job = client.get(f"/api/v1/jobs/{body['job_id']}").json()
+    assert (job["status"], job["priority"]) == ("queued", "high")
+    assert job["payload"]["document_id"] == body["document_id"]
+
+
+def test_document_fails_when_enqueue_does(client, monkeypatch):
+    async def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(endpoints.job_queue, "enqueue", broken_enqueue)
+    response = client.post("/api/v1/compliance-documents/safety_inspection?background=true",
+                           json={"vehicle_id": "T-2"})
+    assert response.status_code == 500
+    assert latest_document_status() == "failed"
@@ -0,0 +1,68 @@
+"""
+Invariants of the 2-opt / Or-opt tour improvement
+"""
+import numpy as np
+import pytest
+
+from src.services.distance_matrix import DistanceMatrix
+from src.services.local_search import _EPSILON, improve_tour
+
+
+def random_matrix(n: int, seed: int) -> DistanceMatrix:
+    points = np.random.default_rng(seed).uniform([40.0, -75.0], [41.0, -74.0], (n, 2))
+    return DistanceMatrix(points.tolist())
+
+
+@pytest.mark.parametrize("n, seed", [(5, 0), (30, 1), (120, 2)])
+def test_result_is_permutation_with_fixed_start(n, seed):
+    matrix = random_matrix(n, seed)
+    tour = matrix.nearest_neighbor_tour(0)
+    result = improve_tour(matrix, tour, max_iterations=10000, time_limit_seconds=5.0)
+    assert result["tour"][0] == 0
+    assert sorted(result["tour"]) == list(range(n))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_never_lengthens_and_reports_savings(seed):
+    matrix = random_matrix(60, seed)
+    tour = matrix.nearest_neighbor_tour(0)
+    before = matrix.tour_length(tour)
+    result = improve_tour(matrix, tour, max_iterations=10000, time_limit_seconds=5.0)
+    after = matrix.tour_length(result["tour"])
+    assert after <= before
+    assert result["saved"] == pytest.approx(before - after, abs=1.0)
+    assert (result["moves"] > 0) == (result["saved"] > 0)
+
+
+def test_input_tour_is_not_modified():
+    matrix = random_matrix(40, 7)
+    tour = matrix.nearest_neighbor_tour(0)
+    original = list(tour)
+    improve_tour(matrix, tour, max_iterations=10000, time_limit_seconds=5.0)
+    assert tour == original
+
+
+def test_reaches_two_opt_local_optimum():
+    matrix = random_matrix(25, 3)
+    result = improve_tour(matrix, matrix.nearest_neighbor_tour(0), max_iterations=100000,
+                          time_limit_seconds=10.0, neighbors=24)
+    tour, d = result["tour"], matrix.meters
+    for p in range(len(tour) - 1):
+        for q in range(p + 2, len(tour)):
+            # Reversing tour[p+1..q] of the open tour
+            removed = d[tour[p], tour[p + 1]] + (d[tour[q], tour[q + 1]] if q + 1 < len(tour) else 0.0)
+            added = d[tour[p], tour[q]] + (d[tour[p + 1], tour[q + 1]] if q + 1 < len(tour) else 0.0)
+            assert added - removed >= -_EPSILON
+
+
+def test_iteration_budget_is_respected():
+    matrix = random_matrix(80, 4)
+    tour = matrix.nearest_neighbor_tour(0)
+    assert improve_tour(matrix, tour, max_iterations=0, time_limit_seconds=5.0)["tour"] == tour
+    assert improve_tour(matrix, tour, max_iterations=3, time_limit_seconds=5.0)["moves"] <= 3
+
+
+def test_short_tours_are_returned_unchanged():
+    matrix = random_matrix(3, 5)
+    assert improve_tour(matrix, [0, 2, 1], max_iterations=100, time_limit_seconds=1.0) == \
+        {"tour": [0, 2, 1], "moves": 0, "saved": 0.0}
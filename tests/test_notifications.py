@@ -0,0 +1,142 @@
+"""
+Customer notifications: single, streamed as Server-Sent Events, and bulk as NDJSON
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from src.api import endpoints
+from src.database import AsyncSessionLocal
+from src.models.database import Customer, Delivery
+from src.services.ollama_client import ollama
+
+LLM_TEXT = "".join(f"word{i} " for i in range(5))
+
+
+@pytest.fixture(scope="module")
+def fake_ollama():
+    fake = FakeOllama(latency=0.02, tokens=5).start()
+    base_url = ollama.base_url
+    ollama.base_url, ollama._client, ollama._semaphore = fake.url, None, None
+    yield fake
+    # The pool belonged to the test client's event loop
+    ollama.base_url, ollama._client, ollama._semaphore = base_url, None, None
+    fake.stop()
+
+
+@pytest.fixture(scope="module")
+def deliveries(client):
+    """IDs of three delayed deliveries (two customers) plus one whose customer is gone"""
+    async def insert():
+        async with AsyncSessionLocal() as db:
+            customers = [Customer(name=name, email=f"{name.lower()}@notifications.test", phone="555-0100",
+                                  address="1 Main St", communication_preferences={"email": True})
+                         for name in ("Ada", "Grace")]
+            db.add_all(customers)
+            await db.flush()
+            rows = [Delivery(customer_id=customers[i % 2].id, status="delayed-test",
+                             estimated_delivery_time=datetime(2026, 10, 18, 9, 0), delay_reason=f"reason {i}")
+                    for i in range(3)]
+            rows.append(Delivery(customer_id=999999, status="delayed-test", delay_reason="orphan"))
+            db.add_all(rows)
+            await db.commit()
+            return [row.id for row in rows]
+
+    return asyncio.run(insert())
+
+
+def sse_events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def stream(client, delivery_id, **params):
+    return client.post("/api/v1/customer-communications/delay_notification",
+                       params={"delivery_id": delivery_id, "stream": True, **params})
+
+
+def test_single_notification(client, deliveries):
+    response = client.post("/api/v1/customer-communications/delay_notification",
+                           params={"delivery_id": deliveries[0], "personalize": False})
+    assert response.status_code == 200
+    message = response.json()["message"]
+    assert message.startswith("Dear Ada,") and "reason 0" in message
+
+
+def test_sse_streams_tokens_then_metrics(client, deliveries, fake_ollama):
+    before = fake_ollama.requests
+    response = stream(client, deliveries[1], bypass_cache=True)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    events = sse_events(response)
+    assert [event for event, _ in events] == ["token"] * 5 + ["done"]
+    assert "".join(data["token"] for _, data in events[:-1]) == LLM_TEXT
+    done = events[-1][1]
+    assert (done["cached"], done["personalized"]) == (False, True)
+    assert done["time_to_first_token"] > 0
+    assert fake_ollama.requests == before + 1
+
+    # The finished stream was cached: replayed as one chunk without calling Ollama
+    events = sse_events(stream(client, deliveries[1]))
+    assert events == [("token", {"token": LLM_TEXT}), ("done", events[1][1])]
+    assert events[1][1]["cached"] is True
+    assert fake_ollama.requests == before + 1
+
+
+def test_sse_without_personalization(client, deliveries, fake_ollama):
+    before = fake_ollama.requests
+    events = sse_events(stream(client, deliveries[2], personalize=False))
+    assert [event for event, _ in events] == ["token", "done"]
+    assert events[0][1]["token"].startswith("Dear Ada,")
+    assert events[1][1]["personalized"] is False
+    assert fake_ollama.requests == before
+
+
+def test_sse_errors_are_sent_in_band(client, deliveries, monkeypatch):
+    async def broken(*args, **kwargs):
+        yield "partial "
+        raise RuntimeError("generation failed")
+
+    monkeypatch.setattr(endpoints.document_generator, "stream_customer_notification", broken)
+    events = sse_events(stream(client, deliveries[0]))
+    assert events == [("token", {"token": "partial "}), ("error", {"detail": "generation failed"})]
+
+
+def test_notification_errors(client, deliveries):
+    unknown_type = client.post("/api/v1/customer-communications/birthday", params={"delivery_id": deliveries[0]})
+    assert unknown_type.status_code == 400
+    assert stream(client, 999999).status_code == 404
+    assert stream(client, deliveries[3]).status_code == 404
+
+
+def bulk(client, **kwargs):
+    response = client.post("/api/v1/customer-communications/delay_notification/bulk", **kwargs)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return {line["delivery_id"]: line for line in map(json.loads, response.text.splitlines())}
+
+
+def test_bulk_ndjson_by_status(client, deliveries):
+    lines = bulk(client, params={"status": "delayed-test", "personalize": False})
+    assert sorted(lines) == sorted(deliveries)
+    for i, delivery_id in enumerate(deliveries[:3]):
+        assert f"reason {i}" in lines[delivery_id]["message"]
+    assert lines[deliveries[3]] == {"delivery_id": deliveries[3], "error": "Customer not found"}
+
+
+def test_bulk_ndjson_by_ids_through_the_llm(client, deliveries, fake_ollama):
+    lines = bulk(client, json=deliveries[:2], params={"bypass_cache": True})
+    assert sorted(lines) == deliveries[:2]
+    assert all(line["message"] == LLM_TEXT for line in lines.values())
+
+
+def test_bulk_needs_a_selection(client):
+    response = client.post("/api/v1/customer-communications/delay_notification/bulk")
+    assert response.status_code == 400
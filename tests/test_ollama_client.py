@@ -0,0 +1,129 @@
+"""
+Pooled Ollama client against a local stand-in server and scripted transports
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from src.services.ollama_client import OllamaClient, OllamaError, OllamaOverloadedError
+from src.services.tracing import collect
+
+
+@pytest.fixture(scope="module")
+def fake_ollama():
+    fake = FakeOllama(latency=0.05, tokens=5).start()
+    yield fake
+    fake.stop()
+
+
+def with_client(scenario, **kwargs):
+    async def run():
+        client = OllamaClient(**kwargs)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def scripted(client: OllamaClient, responses):
+    """Serve /api/generate from a list of status codes or exceptions, in order"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        outcome = responses[min(len(requests), len(responses)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"response": "ok", "done": True})
+
+    client._client = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    return requests
+
+
+def test_generate_text_records_span(fake_ollama):
+    async def scenario(client):
+        with collect() as spans:
+            text = await client.generate_text("hello")
+        return text, [name for name, _ in spans]
+
+    text, spans = with_client(scenario, base_url=fake_ollama.url)
+    assert text == "".join(f"word{i} " for i in range(5))
+    assert "ollama.generate" in spans
+
+
+def test_stream_text_yields_tokens_and_metrics(fake_ollama):
+    async def scenario(client):
+        metrics = {}
+        tokens = [token async for token in client.stream_text("hello", metrics=metrics)]
+        return tokens, metrics, client.stats()
+
+    tokens, metrics, stats = with_client(scenario, base_url=fake_ollama.url)
+    assert tokens == [f"word{i} " for i in range(5)]
+    assert metrics["tokens"] == 5
+    assert metrics["time_to_first_token"] >= 0.05
+    assert stats["in_flight"] == 0
+
+
+def test_concurrent_generations_respect_in_flight_cap(fake_ollama):
+    async def scenario(client):
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, client.in_flight)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.ensure_future(watch())
+        results = await asyncio.gather(*(client.generate_text(f"p{i}") for i in range(6)))
+        watcher.cancel()
+        return results, peak
+
+    results, peak = with_client(scenario, base_url=fake_ollama.url, max_in_flight=2)
+    assert len(results) == 6
+    assert peak <= 2
+
+
+def test_queue_limit_rejects_overflow(fake_ollama):
+    async def scenario(client):
+        return await asyncio.gather(*(client.generate_text(f"p{i}") for i in range(3)), return_exceptions=True)
+
+    results = with_client(scenario, base_url=fake_ollama.url, max_in_flight=1, max_queue=1)
+    assert sum(isinstance(r, OllamaOverloadedError) for r in results) == 1
+    assert sum(isinstance(r, str) for r in results) == 2
+
+
+def test_busy_and_unreachable_server_is_retried(monkeypatch):
+    monkeypatch.setattr("src.config.settings.OLLAMA_RETRY_BASE_DELAY_SECONDS", 0.0)
+
+    async def scenario(client):
+        await client.start()
+        requests = scripted(client, [503, httpx.ConnectError("refused"), 200])
+        return await client.generate_text("hello"), len(requests)
+
+    assert with_client(scenario, max_retries=3) == ("ok", 3)
+
+
+def test_errors_after_retries_or_on_bad_request(monkeypatch):
+    monkeypatch.setattr("src.config.settings.OLLAMA_RETRY_BASE_DELAY_SECONDS", 0.0)
+
+    async def exhausted(client):
+        await client.start()
+        requests = scripted(client, [503])
+        with pytest.raises(OllamaError):
+            await client.generate_text("hello")
+        return len(requests)
+
+    async def bad_request(client):
+        await client.start()
+        requests = scripted(client, [400])
+        with pytest.raises(OllamaError):
+            await client.generate_text("hello")
+        return len(requests)
+
+    assert with_client(exhausted, max_retries=2) == 3
+    assert with_client(bad_request, max_retries=2) == 1
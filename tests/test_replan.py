@@ -0,0 +1,125 @@
+"""
+Incremental stop changes: replan_route and PATCH /routes/{route_id}
+"""
+import numpy as np
+import pytest
+
+from src.services.route_optimizer import plan_route, plan_state, replan_route
+
+POINTS = np.random.default_rng(11).uniform([40.0, -75.0], [40.5, -74.5], (40, 2)).tolist()
+CONSTRAINTS = {"departure_time": "2026-10-17T08:00:00"}
+
+
+def initial_state(n: int = 12):
+    locations = [f"stop {i}" for i in range(n)]
+    coordinates = POINTS[:n]
+    stop_indices = list(range(n))
+    route_plan = plan_route(locations, coordinates, stop_indices, {}, CONSTRAINTS)
+    return route_plan, plan_state(locations, coordinates, stop_indices, route_plan)
+
+
+def visited(route_plan):
+    return [stop["location"] for stop in route_plan["optimized_route"]]
+
+
+def test_plan_state_round_trips_without_changes():
+    route_plan, state = initial_state()
+    replanned, new_state = replan_route(state, {}, CONSTRAINTS)
+    assert visited(replanned) == visited(route_plan)
+    assert new_state == state
+
+
+def test_add_and_remove_stops():
+    route_plan, state = initial_state()
+    replanned, new_state = replan_route(state, {}, CONSTRAINTS,
+                                        add=["stop 20", "nowhere"], add_coordinates=[POINTS[20], None],
+                                        remove=["stop 3", 5])
+    stops = visited(replanned)
+    assert "stop 20" in stops
+    assert "nowhere" not in stops
+    assert {"stop 3", "stop 5"}.isdisjoint(stops)
+    assert stops[0] == "stop 0"
+    assert len(stops) == 11
+    assert replanned["solver"]["mode"] == "incremental"
+    # The new state describes the new tour and can be changed again
+    assert len(new_state["coordinates"]) == len(new_state["stop_indices"]) == 11
+    assert sorted(new_state["tour"]) == list(range(11))
+    again, _ = replan_route(new_state, {}, CONSTRAINTS, remove=["stop 20"])
+    assert "stop 20" not in visited(again)
+
+
+def test_fixed_order():
+    _, state = initial_state(5)
+    order = ["stop 0", 4, "stop 2", 1, "stop 3"]
+    replanned, new_state = replan_route(state, {}, CONSTRAINTS, order=order)
+    assert visited(replanned) == ["stop 0", "stop 4", "stop 2", "stop 1", "stop 3"]
+    assert replanned["solver"]["mode"] == "fixed_order"
+    assert new_state["tour"] == [0, 4, 2, 1, 3]
+
+
+def test_fixed_order_must_cover_every_stop():
+    _, state = initial_state(5)
+    with pytest.raises(ValueError):
+        replan_route(state, {}, CONSTRAINTS, order=["stop 0", "stop 1"])
+
+
+def test_unknown_stop_is_rejected():
+    _, state = initial_state(5)
+    with pytest.raises(ValueError):
+        replan_route(state, {}, CONSTRAINTS, remove=["stop 99"])
+
+
+def test_removing_every_stop_leaves_no_plan():
+    _, state = initial_state(3)
+    replanned, new_state = replan_route(state, {}, CONSTRAINTS, remove=[0, 1, 2])
+    assert replanned == {}
+    assert new_state["tour"] == []
+
+
+def test_patch_route(client):
+    body = {"locations": [f"stop {i}" for i in range(8)], "cargo_details": {}, "time_constraints": CONSTRAINTS}
+    created = client.post("/api/v1/routes/optimize", json=body)
+    assert created.status_code == 200
+    route_id = created.json()["route_id"]
+
+    response = client.patch(f"/api/v1/routes/{route_id}",
+                            json={"add": ["stop 30"], "remove": ["stop 2"],
+                                  "cargo_details": {"stop 30": {"weight": 5}}})
+    assert response.status_code == 200
+    stops = visited(response.json()["route_plan"])
+    assert "stop 30" in stops and "stop 2" not in stops
+
+    # Changes persist: the next change starts from the stored plan
+    response = client.patch(f"/api/v1/routes/{route_id}", json={"remove": ["stop 30"]})
+    assert response.status_code == 200
+    assert "stop 30" not in visited(response.json()["route_plan"])
+
+    # The modified route is no longer replayed for the original request
+    replay = client.post("/api/v1/routes/optimize", json=body)
+    assert replay.headers["X-Route-Plan-Cache"] == "miss"
+    assert replay.json()["route_id"] != route_id
+
+
+
+def test_idempotent_retry_after_patch(client):
+    body = {"locations": [f"stop {i}" for i in range(6)], "cargo_details": {}, "time_constraints": CONSTRAINTS}
+    headers = {"Idempotency-Key": "patch-then-retry"}
+    route_id = client.post("/api/v1/routes/optimize", json=body, headers=headers).json()["route_id"]
+
+    patched = client.patch(f"/api/v1/routes/{route_id}", json={"remove": ["stop 3"]})
+    assert patched.status_code == 200
+
+    # The retry replays the route, as modified, instead of creating another
+    retry = client.post("/api/v1/routes/optimize", json=body, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["X-Route-Plan-Cache"] == "hit"
+    assert retry.json()["route_id"] == route_id
+    assert retry.json()["route_plan"] == patched.json()["route_plan"]
+
+def test_patch_errors(client):
+    assert client.patch("/api/v1/routes/999999", json={"remove": [1]}).status_code == 404
+
+    body = {"locations": ["stop 0", "stop 1", "stop 2"], "cargo_details": {}, "time_constraints": CONSTRAINTS}
+    route_id = client.post("/api/v1/routes/optimize", json=body).json()["route_id"]
+    assert client.patch(f"/api/v1/routes/{route_id}", json={"remove": ["stop 9"]}).status_code == 400
+    assert client.patch(f"/api/v1/routes/{route_id}", json={"order": ["stop 1"]}).status_code == 400
@@ -0,0 +1,110 @@
+"""
+Fan-out, dispatch and failure handling of the LLM request coalescer
+"""
+import asyncio
+import time
+
+import pytest
+
+from src.services.request_coalescer import RequestCoalescer
+
+
+class FakeClient:
+    """Echoes the prompt after the delay given as its first word; prompts containing "fail" raise"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate_text(self, prompt, model, options):
+        self.calls.append(prompt)
+        await asyncio.sleep(float(prompt.split()[0]))
+        if "fail" in prompt:
+            raise RuntimeError(f"failed: {prompt}")
+        return f"reply to {prompt}"
+
+
+def run(coro_factory):
+    async def scenario():
+        client = FakeClient()
+        coalescer = RequestCoalescer(client)
+        return await coro_factory(coalescer), client, coalescer
+
+    return asyncio.run(scenario())
+
+
+def test_identical_prompts_share_one_generation():
+    async def scenario(coalescer):
+        return await asyncio.gather(*(coalescer.generate_text("0.05 same") for _ in range(10)))
+
+    results, client, coalescer = run(scenario)
+    assert results == ["reply to 0.05 same"] * 10
+    assert client.calls == ["0.05 same"]
+    stats = coalescer.stats()
+    assert (stats["requests"], stats["upstream_calls"], stats["calls_saved"]) == (10, 1, 9)
+    assert stats["in_flight"] == 0
+
+
+def test_whitespace_variants_are_coalesced():
+    async def scenario(coalescer):
+        return await asyncio.gather(coalescer.generate_text("0.01 a  b"), coalescer.generate_text("0.01 a\nb"))
+
+    results, client, _ = run(scenario)
+    assert len(client.calls) == 1
+    assert results[0] == results[1]
+
+
+def test_distinct_prompts_go_upstream_immediately():
+    async def scenario(coalescer):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(coalescer.generate_text(f"0 prompt {i}") for i in range(5)))
+        return results, time.perf_counter() - started
+
+    (results, elapsed), client, coalescer = run(scenario)
+    assert results == [f"reply to 0 prompt {i}" for i in range(5)]
+    assert len(client.calls) == 5
+    assert coalescer.stats()["calls_saved"] == 0
+    assert elapsed < 0.05
+
+
+def test_each_caller_returns_when_its_own_generation_does():
+    async def scenario(coalescer):
+        started = time.perf_counter()
+
+        async def timed(prompt):
+            await coalescer.generate_text(prompt)
+            return time.perf_counter() - started
+
+        return await asyncio.gather(timed("0.05 fast"), timed("1.0 slow"))
+
+    (fast, slow), _, _ = run(scenario)
+    assert fast < 0.5
+    assert slow >= 1.0
+
+
+def test_errors_reach_every_waiter_and_are_not_shared_later():
+    async def scenario(coalescer):
+        results = await asyncio.gather(*(coalescer.generate_text("0.01 fail") for _ in range(3)),
+                                       coalescer.generate_text("0.01 ok"), return_exceptions=True)
+        # The failed key is released; a retry goes upstream again
+        with pytest.raises(RuntimeError):
+            await coalescer.generate_text("0.01 fail")
+        return results
+
+    results, client, _ = run(scenario)
+    assert all(isinstance(r, RuntimeError) for r in results[:3])
+    assert results[3] == "reply to 0.01 ok"
+    assert client.calls.count("0.01 fail") == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_generation():
+    async def scenario(coalescer):
+        first = asyncio.ensure_future(coalescer.generate_text("0.1 shared"))
+        second = asyncio.ensure_future(coalescer.generate_text("0.1 shared"))
+        await asyncio.sleep(0.03)
+        first.cancel()
+        return await second, first.cancelled()
+
+    (result, cancelled), client, _ = run(scenario)
+    assert cancelled
+    assert result == "reply to 0.1 shared"
+    assert client.calls == ["0.1 shared"]
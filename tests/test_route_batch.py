@@ -0,0 +1,44 @@
+"""
+POST /routes/optimize/batch: per-route results, validation and shared geocoding
+"""
+from src.config import settings
+
+
+def route(*stops, **extra):
+    return {"locations": [f"stop {i}" for i in stops], "cargo_details": {}, "time_constraints": {}, **extra}
+
+
+def test_batch_plans_every_route_in_order(client):
+    response = client.post("/api/v1/routes/optimize/batch", json={"routes": [route(0, 1, 2, 3), route(2, 3, 4, 5, 6)]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["index"] for r in body["routes"]] == [0, 1]
+    assert all(r["status"] == "ok" and r["route_id"] for r in body["routes"])
+    assert len({r["route_id"] for r in body["routes"]}) == 2
+    # stop 2 and stop 3 are shared, so seven distinct locations are geocoded
+    assert body["summary"]["unique_locations"] == 7
+    assert (body["summary"]["succeeded"], body["summary"]["failed"]) == (2, 0)
+
+
+def test_invalid_routes_fail_alone(client):
+    routes = [
+        route(0, 1, 2),
+        {"locations": ["stop 0", 7, None, {"street": "Main"}]},
+        {"locations": []},
+        route(3, 4, solver="simulated_annealing"),
+        route(5, 6, time_constraints="tomorrow"),
+        {"locations": ["stop 1", "   "]},
+        route(7, 8, 9),
+    ]
+    response = client.post("/api/v1/routes/optimize/batch", json={"routes": routes})
+    assert response.status_code == 200
+    results = response.json()["routes"]
+    assert [r["status"] for r in results] == ["ok", "failed", "failed", "failed", "failed", "failed", "ok"]
+    assert all(r["error"] for r in results[1:6])
+    assert "strings" in results[1]["error"]
+
+
+def test_batch_size_limits(client):
+    assert client.post("/api/v1/routes/optimize/batch", json={"routes": []}).status_code == 400
+    too_many = [route(0, 1)] * (settings.ROUTE_BATCH_MAX_ROUTES + 1)
+    assert client.post("/api/v1/routes/optimize/batch", json={"routes": too_many}).status_code == 400
@@ -0,0 +1,86 @@
+"""
+Span histograms (the /metrics exposition) and per-request Server-Timing headers
+"""
+import asyncio
+import re
+
+from src.services.tracing import (SpanRegistry, collect, record, registry, replay, run_captured, server_timing,
+                                  span)
+
+
+def parse_server_timing(header):
+    return {name: float(duration) for name, duration in re.findall(r"([^,;\s]+);dur=([0-9.]+)", header)}
+
+
+def test_prometheus_histogram():
+    spans = SpanRegistry(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.05, 2.0):
+        spans.observe("route.plan", seconds)
+    spans.observe('odd "name"', 0.001)
+    lines = spans.prometheus("latency_seconds").splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Duration of named pipeline spans",
+                         "# TYPE latency_seconds histogram"]
+    # Buckets are cumulative and end with +Inf == count
+    assert 'latency_seconds_bucket{span="route.plan",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{span="route.plan",le="0.1"} 3' in lines
+    assert 'latency_seconds_bucket{span="route.plan",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{span="route.plan"} 4' in lines
+    assert 'latency_seconds_sum{span="route.plan"} 2.105' in lines
+    assert 'latency_seconds_count{span="odd \\"name\\""} 1' in lines
+
+
+def test_server_timing_sums_repeated_spans_and_sanitizes_names():
+    header = server_timing([("db.commit", 0.002), ("http GET /x", 0.001), ("db.commit", 0.003)])
+    assert header == "db.commit;dur=5.0, http_GET__x;dur=1.0"
+
+
+def test_spans_are_collected_per_context():
+    async def handler(name):
+        with collect() as spans:
+            with span(name):
+                await asyncio.sleep(0.01)
+            # Threads started from the context record into it too
+            await asyncio.to_thread(record, f"{name}.thread", 0.5)
+            return spans
+
+    async def scenario():
+        return await asyncio.gather(handler("a"), handler("b"))
+
+    a, b = asyncio.run(scenario())
+    assert [name for name, _ in a] == ["a", "a.thread"]
+    assert [name for name, _ in b] == ["b", "b.thread"]
+    assert a[0][1] >= 0.01
+    # Outside a request only the histograms see a span
+    record("outside", 0.1)
+
+
+def test_worker_spans_are_shipped_back():
+    def work(x):
+        with span("worker.step"):
+            return x * 2
+
+    result, spans = run_captured(work, (21,), {})
+    assert result == 42
+    assert [name for name, _ in spans] == ["worker.step"]
+    with collect() as collected:
+        replay(spans)
+    assert collected == spans
+
+
+def test_request_server_timing_and_metrics(client):
+    body = {"locations": ["stop 0", "stop 1", "stop 2", "stop 3"], "cargo_details": {}, "time_constraints": {}}
+    response = client.post("/api/v1/routes/optimize", json=body)
+    assert response.status_code == 200
+    timings = parse_server_timing(response.headers["server-timing"])
+    # route.distance_matrix runs in the routing pool and is replayed into the request
+    assert {"route.geocode", "route.plan", "route.distance_matrix", "db.commit", "total"} <= set(timings)
+    assert timings["total"] >= timings["route.plan"]
+
+    # Errors are timed as well
+    assert "total;dur=" in client.patch("/api/v1/routes/999999", json={}).headers["server-timing"]
+
+    metrics = registry.prometheus()
+    # Labeled by route template; whether it includes the router prefix depends on the FastAPI version
+    assert re.search(r'_count\{span="http POST (/api/v1)?/routes/optimize"\} [1-9]', metrics)
+    assert re.search(r'_count\{span="http PATCH (/api/v1)?/routes/\{route_id\}"\} [1-9]', metrics)
+    assert 'logisync_span_duration_seconds_bucket{span="route.distance_matrix",le="+Inf"}' in metrics
@@ -0,0 +1,64 @@
+"""
+Time windows and service times with solver="vrp"
+"""
+from datetime import datetime, timedelta
+
+from src.services.route_optimizer import plan_route
+
+DEPARTURE = datetime(2026, 10, 17, 8, 0)
+KM_EAST = 0.01178  # degrees of longitude per km at 40N
+
+
+def line_stops(kilometers):
+    """Stops on an east-west line through (40, -74), x km from the start"""
+    return [(40.0, -74.0 + km * KM_EAST) for km in kilometers]
+
+
+def plan(coordinates, time_constraints, solver="vrp"):
+    locations = [f"stop {i}" for i in range(len(coordinates))]
+    constraints = {"departure_time": DEPARTURE.isoformat(), **time_constraints}
+    return plan_route(locations, coordinates, list(range(len(coordinates))), {}, constraints,
+                      solver=solver, time_limit_seconds=0.5)
+
+
+def arrivals(route_plan):
+    return {stop["location"]: datetime.fromisoformat(str(stop["arrival_time"]))
+            for stop in route_plan["optimized_route"]}
+
+
+def test_window_forces_detour_greedy_would_miss():
+    # Three stops east, one 5 km west that must be reached within 7 minutes
+    coordinates = line_stops([0, 1, 2, 3, -5])
+    constraints = {"time_windows": {"4": [0, 7]}}
+
+    greedy = arrivals(plan(coordinates, constraints, solver="greedy"))
+    assert greedy["stop 4"] > DEPARTURE + timedelta(minutes=7)
+
+    route_plan = plan(coordinates, constraints)
+    assert route_plan["solver"]["status"] == "solved"
+    assert route_plan["stop_order"][0] == 0
+    assert sorted(route_plan["stop_order"]) == list(range(5))
+    assert arrivals(route_plan)["stop 4"] <= DEPARTURE + timedelta(minutes=7)
+
+
+def test_early_arrival_waits_for_window_to_open():
+    coordinates = line_stops([0, 1, 2])
+    route_plan = plan(coordinates, {"time_windows": {"stop 2": ["08:30", "09:00"]}})
+    eta = arrivals(route_plan)["stop 2"]
+    assert DEPARTURE + timedelta(minutes=30) <= eta <= DEPARTURE + timedelta(minutes=60)
+
+
+def test_service_time_delays_later_stops():
+    coordinates = line_stops([0, 1, 2])
+    without = arrivals(plan(coordinates, {}))
+    with_service = arrivals(plan(coordinates, {"service_times": {"1": 20}}))
+    order_delay = with_service["stop 2"] - without["stop 2"]
+    assert timedelta(minutes=20) - timedelta(seconds=2) <= order_delay <= timedelta(minutes=20) + timedelta(seconds=2)
+
+
+def test_infeasible_windows_keep_greedy_tour():
+    # 100 km away cannot be reached within 5 minutes at any order
+    coordinates = line_stops([0, 1, 100])
+    route_plan = plan(coordinates, {"time_windows": {"2": [0, 5]}})
+    assert route_plan["solver"]["status"] == "infeasible"
+    assert sorted(route_plan["stop_order"]) == [0, 1, 2]